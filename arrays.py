@@ -0,0 +1,258 @@
+import operator
+from array import array
+from itertools import repeat
+from typing import Any
+
+try:
+    import numpy
+except ImportError: # elementwise operations fall back to the array module
+    numpy = None
+
+# Element type of an `array<T>` -> its array module type code
+TYPECODES = {
+    "int8": "b", "uint8": "B",
+    "int16": "h", "uint16": "H",
+    "int32": "i", "uint32": "I",
+    "int64": "q", "uint64": "Q",
+    "float32": "f", "float64": "d",
+}
+ELEMENT_TYPES = {typecode: element for element, typecode in TYPECODES.items()}
+FLOAT_TYPECODES = frozenset("fd")
+
+
+def _shift_left(value: int, count: int) -> int:
+    # operator.lshift on one element, for arrays without NumPy: a shift count past 64 leaves no
+    # int64 but 0, so it fails instead of building a huge int (the optimizer's folding limit too)
+    if count > 64:
+        if value:
+            raise OverflowError
+        return 0
+    return value << count
+
+
+# Elementwise operators: symbol -> (operation, kind). Comparisons give an array<uint8> of 0s and 1s, `/`
+# an array<float64>, and arithmetic and bitwise operators an array<int64> for integer operands and
+# an array<float64> for float ones. Bitwise operators and shifts need integers.
+ELEMENTWISE: dict[str, tuple[Any, str]] = {
+    "+": (operator.add, "arithmetic"), "-": (operator.sub, "arithmetic"), "*": (operator.mul, "arithmetic"),
+    "/": (operator.truediv, "division"), "%": (operator.mod, "arithmetic"),
+    "&": (operator.and_, "bitwise"), "|": (operator.or_, "bitwise"), "^": (operator.xor, "bitwise"),
+    "<<": (operator.lshift, "bitwise"), ">>": (operator.rshift, "bitwise"),
+    "==": (operator.eq, "comparison"), "!=": (operator.ne, "comparison"),
+    "<": (operator.lt, "comparison"), "<=": (operator.le, "comparison"),
+    ">": (operator.gt, "comparison"), ">=": (operator.ge, "comparison"),
+}
+ZERO_DIVISION_ERRORS = {"/": "Division by zero", "%": "Modulo by zero"} # as for numbers (see interpreter.py)
+# Integer operations whose result can leave the int64 range, and how to estimate it in floating point
+OVERFLOWING = {"+": operator.add, "-": operator.sub, "*": operator.mul, "<<": lambda left, right: left * numpy.exp2(right)}
+
+
+def elementwise(symbol: str, left: Any, right: Any) -> "TypedArray":
+    """`left <symbol> right` element by element, in one batched operation: with NumPy when it's
+    installed, otherwise by mapping the operator over the array buffers. One side is a TypedArray;
+    the other is a TypedArray of the same length, a list of numbers or a number. Anything else is
+    NotImplemented, so Python reports the operand types. A result the result type can't hold fails
+    either way, rather than wrapping around as NumPy's integers do."""
+    operation, kind = ELEMENTWISE[symbol]
+    left, right = _operand(left), _operand(right)
+    if left is NotImplemented or right is NotImplemented:
+        return NotImplemented
+    arrays = [operand for operand in (left, right) if isinstance(operand, array)]
+    if len(arrays) == 2 and len(left) != len(right):
+        raise Exception(f"Elementwise '{symbol}' on arrays of different lengths ({len(left)} and {len(right)})")
+    floats = any(_is_float(operand) for operand in (left, right))
+    if kind == "bitwise" and floats:
+        raise Exception(f"Elementwise '{symbol}' needs integer arrays")
+    if symbol in ZERO_DIVISION_ERRORS and (0 in right if isinstance(right, array) else right == 0):
+        raise Exception(ZERO_DIVISION_ERRORS[symbol])
+    if symbol in ("<<", ">>") and (any(count < 0 for count in right) if isinstance(right, array) else right < 0):
+        raise Exception("negative shift count")
+    calculation = "d" if floats or kind == "division" else "q" # the type code the operation is done in
+    typecode = "B" if kind == "comparison" else calculation
+    if not len(arrays[0]):
+        return TypedArray(typecode)
+    try:
+        # uint64 elements may not fit in an int64, which NumPy would calculate them in
+        if numpy is not None and not any(operand.typecode == "Q" for operand in arrays):
+            left, right = (numpy.frombuffer(operand, operand.typecode) if isinstance(operand, array) else operand
+                           for operand in (left, right))
+            # No RuntimeWarnings: integer overflow is checked for below, and floats overflow to inf as
+            # Python's do
+            with numpy.errstate(all="ignore"):
+                calculated = operation(*(operand.astype(calculation) if isinstance(operand, numpy.ndarray) else operand
+                                         for operand in (left, right)))
+                if calculation == "q" and symbol in OVERFLOWING:
+                    # Wrapping around is off by a multiple of 2**64; a float estimate is off by far less
+                    estimate = OVERFLOWING[symbol](*(operand.astype("d") if isinstance(operand, numpy.ndarray)
+                                                     else float(operand) for operand in (left, right)))
+                    if numpy.any(numpy.abs(estimate - calculated.astype("d")) > 2.0 ** 32):
+                        raise OverflowError
+            result = TypedArray(typecode)
+            result.frombytes(memoryview(calculated.astype(typecode)).cast("B"))
+            return result
+        if symbol == "<<":
+            operation = _shift_left
+        if not isinstance(right, array):
+            return TypedArray(typecode, map(operation, left, repeat(right)))
+        if not isinstance(left, array):
+            return TypedArray(typecode, map(operation, repeat(left), right))
+        return TypedArray(typecode, map(operation, left, right))
+    except OverflowError:
+        raise Exception(f"Result of elementwise '{symbol}' doesn't fit in an array<{ELEMENT_TYPES[typecode]}>")
+
+
+def equals(left: Any, right: Any) -> Any:
+    # Gravox's `==`: elementwise when either side is a typed array, otherwise Python's. Python's
+    # own `==` compares two arrays as whole values, so containers holding arrays still compare.
+    if left.__class__ is TypedArray or right.__class__ is TypedArray:
+        if (result := elementwise("==", left, right)) is not NotImplemented:
+            return result
+    return left == right
+
+
+def not_equals(left: Any, right: Any) -> Any:
+    # Gravox's `!=` (see equals)
+    if left.__class__ is TypedArray or right.__class__ is TypedArray:
+        if (result := elementwise("!=", left, right)) is not NotImplemented:
+            return result
+    return left != right
+
+
+def _operand(value: Any) -> Any:
+    # A TypedArray or number as is, a list of numbers as a TypedArray
+    if isinstance(value, TypedArray) or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, list):
+        try:
+            return TypedArray("d" if any(item.__class__ is float for item in value) else "q", value)
+        except (TypeError, OverflowError):
+            pass
+    return NotImplemented
+
+
+def _is_float(operand: Any) -> bool:
+    return operand.typecode in FLOAT_TYPECODES if isinstance(operand, array) else operand.__class__ is float
+
+
+def _operator_methods(symbol: str):
+    # TypedArray.__add__ and __radd__ (and so on) for one operator
+    return (lambda self, other: elementwise(symbol, self, other),
+            lambda self, other: elementwise(symbol, other, self))
+
+
+class TypedArray(array):
+    """An `array<T>` value: numbers of one element type stored unboxed in an array.array buffer,
+    4 bytes per element of an `array<int32>` instead of a list slot and an int object. Prints like
+    a plain array. Storing a number the element type can't hold fails, as array.array does, and
+    float32 elements are rounded to single precision.
+
+    Operators apply element by element (see `elementwise`), in place of array.array's
+    concatenation and repetition. A comparison gives an array of 0s and 1s, so like NumPy's arrays
+    a TypedArray has no truth value: `if a == b` fails instead of taking the branch for any two
+    non-empty arrays. Only Gravox's `==` and `!=` are elementwise (see `equals`); Python's compare
+    whole arrays, as dicts, lists and struct instances holding arrays need."""
+    __slots__ = ("shared",)
+
+    def __init__(self, *_):
+        self.shared = 0 # see GravoxArray
+
+    __add__, __radd__ = _operator_methods("+")
+    __sub__, __rsub__ = _operator_methods("-")
+    __mul__, __rmul__ = _operator_methods("*")
+    __truediv__, __rtruediv__ = _operator_methods("/")
+    __mod__, __rmod__ = _operator_methods("%")
+    __and__, __rand__ = _operator_methods("&")
+    __or__, __ror__ = _operator_methods("|")
+    __xor__, __rxor__ = _operator_methods("^")
+    __lshift__, __rlshift__ = _operator_methods("<<")
+    __rshift__, __rrshift__ = _operator_methods(">>")
+    __lt__, __le__ = _operator_methods("<")[0], _operator_methods("<=")[0]
+    __gt__, __ge__ = _operator_methods(">")[0], _operator_methods(">=")[0]
+    __hash__ = None
+
+    def __bool__(self):
+        raise Exception("The truth value of an array is ambiguous. Compare its elements, or its len, instead")
+
+    @property
+    def type_name(self) -> str:
+        return f"array<{ELEMENT_TYPES[self.typecode]}>"
+
+    def __repr__(self) -> str:
+        return repr(self.tolist())
+
+    __str__ = __repr__
+
+
+class GravoxArray(list):
+    """A plain `array` value. Casting an array to an array type (assigning it, binding it to a
+    parameter, returning it) hands out the same object and counts one more holder in `shared`
+    instead of copying it; `writable_array` copies a shared array before it is changed, so arrays
+    still behave as values. A holder that takes its own copy counts itself off the original, so
+    once only one holder is left it changes the array in place again."""
+    __slots__ = ("shared",)
+
+    def __init__(self, items=()):
+        super().__init__(items)
+        self.shared = 0 # holders besides the first; may overcount, as holders that go away don't count off
+
+
+def element_type(data_type: str) -> str | None:
+    # "int32" for "array<int32>"; None for any other type
+    return data_type[6:-1] if data_type.startswith("array<") and data_type.endswith(">") else None
+
+
+def typed_array(data_type: str, value: Any) -> TypedArray:
+    """`value` as a `data_type` array, e.g. "array<float64>": an array of that element type is
+    shared (see GravoxArray), anything else (any iterable of numbers) is copied into a new one."""
+    element = element_type(data_type)
+    typecode = TYPECODES.get(element)
+    if typecode is None:
+        raise Exception(f"Arrays can't hold '{element}' elements. Expected one of: {', '.join(TYPECODES)}")
+    if value.__class__ is TypedArray and value.typecode == typecode:
+        value.shared += 1
+        return value
+    return TypedArray(typecode, value)
+
+
+def share_array(value: Any) -> GravoxArray | TypedArray:
+    # Casting to the generic `array` type: an array is shared, keeping a typed array's element
+    # type; anything else is copied into a new array
+    if value.__class__ is GravoxArray or value.__class__ is TypedArray:
+        value.shared += 1
+        return value
+    return GravoxArray(value)
+
+
+def copy_array(value: GravoxArray | TypedArray) -> GravoxArray | TypedArray:
+    # An unshared copy, of the same element type
+    if value.__class__ is TypedArray:
+        return TypedArray(value.typecode, value)
+    return GravoxArray(value)
+
+
+def writable_array(value: Any) -> Any:
+    """The array to change in place for `value`: an unshared array itself, or a copy of a shared
+    one, which then has one holder fewer. Anything else is returned as is. The caller stores the
+    copy where `value` came from (see `own_array`); a shared array that wasn't in a variable, e.g.
+    a call's result, is only changed in the copy the builtin returns."""
+    if (value.__class__ is GravoxArray or value.__class__ is TypedArray) and value.shared:
+        value.shared -= 1
+        return copy_array(value)
+    return value
+
+
+def own_array(cell: Any) -> Any:
+    # The array in `cell` (a variable, a memory cell or a FieldCell), to change in place: a shared
+    # one is replaced by the cell's own copy first
+    value = cell.value
+    array = writable_array(value)
+    if array is not value:
+        cell.value = array
+    return array
+
+
+def extend_array(target: list | TypedArray, items: Any):
+    # Appends all of `items` in one native call; array.array only extends from an array of its own type code
+    if isinstance(target, array) and isinstance(items, array) and items.typecode != target.typecode:
+        items = items.tolist()
+    target.extend(items)
@@ -0,0 +1,765 @@
+# Benchmarks and engine cross-checks. Usage: python bench.py <name> [scale]
+from collections import deque
+from subprocess import run
+from io import BytesIO, StringIO
+from pathlib import Path
+from sys import argv, executable
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from tracemalloc import get_traced_memory, start, stop
+
+import arrays
+from arrays import typed_array
+from grvast import ASTNode, BinaryOpNode, StructDefNode
+from modcache import cache_path, load_module
+from optimizer import optimize
+from structs import struct_class
+from lexing import LEXERS, SourceText, TokenRope, TokenType, relex, tokenize, tokenize_compact, tokenize_iter, tokenize_regex
+from parser import INFIX_ALIASES, Parser
+from gravox import ENGINES
+from interpreter import MEMORY_MODELS, Interpreter, VarCell
+
+ROOT = Path(__file__).parent
+
+
+def sample_sources() -> dict[str, str]:
+    return {str(path.relative_to(ROOT)): path.read_text() for path in sorted(ROOT.rglob("*.grv"))}
+
+
+def generated_source(scale: int) -> str:
+    # Stand-in for our generated data scripts: every sample concatenated `scale` times.
+    return "\n".join(sample_sources().values()) * scale
+
+
+def data_script(rows: int) -> str:
+    # Generated data scripts are mostly long runs of literal-heavy `let`s
+    return "".join(f'let row{i}: array = [{i}, {i * 2}.5, "name {i}", {i % 7}];\n' for i in range(rows))
+
+
+def expression_source(lines: int) -> str:
+    # Every binary level, unary operators, calls, indexing and field access, nested a few deep
+    exprs = [
+        "a + b - c / d % e",
+        "(a << 2) | (b >> 1) ^ c + -d",
+        "a == b != c < d > e <= f >= g",
+        "~a + f(b, c - 1)[2] / p.x - (q - (r + (s - t)))",
+        "<int32>(a) + g.h(1 + 2, 3) % 4 | 5 ^ 6",
+        "a * *b & c * d + &e",
+    ]
+    return "".join(f"let v{i}: int32 = {exprs[i % len(exprs)]};\n" for i in range(lines))
+
+
+def node_fields(node: ASTNode) -> list[str]:
+    # Nodes are slotted, so their fields come from __slots__ along the MRO rather than vars()
+    return sorted({name for cls in type(node).__mro__ for name in getattr(cls, "__slots__", ())} - {"line", "column"})
+
+
+def loop_scripts(iterations: int) -> dict[str, str]:
+    # Loop-heavy scripts where the interpreter's per-node overhead dominates
+    return {
+        "arithmetic": f"""
+            let i: int32 = 0;
+            let total: int64 = 0;
+            while i < {iterations} {{
+                total = total + (i % 7) - (i >> 1) ^ 3;
+                i = i + 1;
+            }}
+        """,
+        "calls": f"""
+            struct Counter {{
+                count: int32;
+                def bump(step: int32) -> int32 {{
+                    return step + 1;
+                }}
+            }}
+            let c: Counter;
+            let items: array = [1, 2, 3, 4];
+            let n: int32 = 0;
+            for (let i: int32 = 0; i < {iterations}; i = i + 1;) {{
+                n = c.bump(items[i % 4]);
+            }}
+        """,
+    }
+
+
+def recursion_script(global_count: int, depth: int) -> str:
+    # Call-heavy recursion in a program with `global_count` unrelated globals
+    globals_source = "".join(f"let g{i}: int32 = {i};\n" for i in range(global_count))
+    return globals_source + f"""
+        def fib(n: int32) -> int32 {{
+            let result: int32 = n;
+            if n > 1 {{
+                result = fib(n - 1) + fib(n - 2);
+            }}
+            return result;
+        }}
+        let answer: int32 = fib({depth});
+    """
+
+
+def fib_calls(depth: int) -> int:
+    return 1 if depth <= 1 else 1 + fib_calls(depth - 1) + fib_calls(depth - 2)
+
+
+def ast_dump(node):
+    # Structural dump including positions, for comparing parsers
+    if isinstance(node, ASTNode):
+        fields = [(name, getattr(node, name)) for name in node_fields(node)]
+        return type(node).__name__, node.line, node.column, tuple((k, ast_dump(v)) for k, v in fields)
+    if isinstance(node, (list, tuple)):
+        return tuple(ast_dump(item) for item in node)
+    return node
+
+
+class LadderParser(Parser):
+    # The precedence ladder Parser.parse_expression replaced: one method per level, from loosest to
+    # tightest. Kept as the reference the Pratt parser is checked against (see bench_parse).
+    def parse_expression(self, min_power=0):
+        return self.parse_bitwise_or()
+
+    def parse_bitwise_or(self):
+        left_expr = self.parse_bitwise_xor()
+        while self.current_token().type == TokenType.OR:
+            op_token = self.consume(TokenType.OR)
+            right_expr = self.parse_bitwise_xor()
+            left_expr = BinaryOpNode(op_token.type, left_expr, right_expr, op_token.line - 1, op_token.column - 1)
+        return left_expr
+
+    def parse_bitwise_xor(self):
+        left_expr = self.parse_bitwise_and()
+        while self.current_token().type == TokenType.XOR:
+            op_token = self.consume(TokenType.XOR)
+            right_expr = self.parse_bitwise_and()
+            left_expr = BinaryOpNode(op_token.type, left_expr, right_expr, op_token.line - 1, op_token.column - 1)
+        return left_expr
+
+    def parse_bitwise_and(self):
+        left_expr = self.parse_equality()
+        while self.current_token().type in (TokenType.AND, TokenType.POINTER_REF):
+            op_token = self.consume(self.current_token().type)
+            right_expr = self.parse_equality()
+            left_expr = BinaryOpNode(TokenType.AND, left_expr, right_expr, op_token.line - 1, op_token.column - 1)
+        return left_expr
+
+    def parse_equality(self):
+        left_expr = self.parse_comparison()
+        while self.current_token().type in (TokenType.EQUAL, TokenType.NOT_EQUAL):
+            op_token = self.consume(self.current_token().type)
+            right_expr = self.parse_comparison()
+            left_expr = BinaryOpNode(op_token.type, left_expr, right_expr, op_token.line - 1, op_token.column - 1)
+        return left_expr
+
+    def parse_comparison(self):
+        left_expr = self.parse_shift()
+        while self.current_token().type in (TokenType.GREATER_THAN, TokenType.LESS_THAN, TokenType.GREATER_EQUAL, TokenType.LESS_EQUAL):
+            op_token = self.consume(self.current_token().type)
+            right_expr = self.parse_shift()
+            left_expr = BinaryOpNode(op_token.type, left_expr, right_expr, op_token.line - 1, op_token.column - 1)
+        return left_expr
+
+    def parse_shift(self):
+        left_expr = self.parse_term()
+        while self.current_token().type in (TokenType.LSHIFT, TokenType.RSHIFT):
+            op_token = self.consume(self.current_token().type)
+            right_expr = self.parse_term()
+            left_expr = BinaryOpNode(op_token.type, left_expr, right_expr, op_token.line - 1, op_token.column - 1)
+        return left_expr
+
+    def parse_term(self):
+        left_expr = self.parse_factor()
+        while self.current_token().type in (TokenType.PLUS, TokenType.MINUS):
+            op_token = self.consume(self.current_token().type)
+            right_expr = self.parse_factor()
+            left_expr = BinaryOpNode(op_token.type, left_expr, right_expr, op_token.line - 1, op_token.column - 1)
+        return left_expr
+
+    def parse_factor(self):
+        left_expr = self.parse_unary()
+        while self.current_token().type in (TokenType.MULTIPLY, TokenType.DIVIDE, TokenType.MODULO, TokenType.POINTER_DEREF):
+            op_token = self.consume(self.current_token().type)
+            right_expr = self.parse_unary()
+            op_type = INFIX_ALIASES.get(op_token.type, op_token.type)
+            left_expr = BinaryOpNode(op_type, left_expr, right_expr, op_token.line - 1, op_token.column - 1)
+        return left_expr
+
+
+def peak_memory(fn, *args):
+    start()
+    try:
+        result = fn(*args)
+        return get_traced_memory()[1], result
+    finally:
+        stop()
+
+
+def timed(fn, *args, repeat=5):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = perf_counter()
+        result = fn(*args)
+        best = min(best, perf_counter() - start)
+    return best, result
+
+
+def _lex_outcome(lexer, code, lsp_mode=False):
+    try:
+        return [(t.type, t.value, t.line, t.column, t.offset) for t in lexer(code, lsp_mode)]
+    except Exception as e:
+        return type(e), str(e)
+
+
+# Tiny odd-sized chunks so that tokens get cut at every possible place
+STREAM_LEXERS = {
+    "stream/text": lambda code, lsp_mode: tokenize_iter(StringIO(code), lsp_mode, chunk_size=7),
+    "stream/bytes": lambda code, lsp_mode: tokenize_iter(BytesIO(code.encode()), lsp_mode, chunk_size=5),
+}
+UNICODE_SAMPLES = {
+    "<unicode>": 'let naïve: string = "héllo ✓";\nlet x²: int8 = 1²3 + ½;\u00a0print(naïve);',
+    "<digits>": "let a: int8 = ²3;\n'é' \u2028 x",
+}
+
+
+def check_lexers() -> int:
+    """Token-for-token comparison of every lexer engine against `tokenize`, including truncated
+    sources so that the error paths (and their lsp_mode JSON) are exercised too."""
+    failures = 0
+    for name, code in {**sample_sources(), **UNICODE_SAMPLES}.items():
+        cases = [code] + [code[:cut] for cut in range(0, len(code), max(1, len(code) // 50))]
+        for case in cases:
+            for lsp_mode in (False, True):
+                expected = _lex_outcome(tokenize, case, lsp_mode)
+                for engine, lexer in {**LEXERS, **STREAM_LEXERS}.items():
+                    if _lex_outcome(lexer, case, lsp_mode) != expected:
+                        print(f"MISMATCH {engine} on {name} ({len(case)} chars, lsp_mode={lsp_mode})")
+                        failures += 1
+    print("all lexers agree" if not failures else f"{failures} mismatches")
+    return failures
+
+
+def bench_lex(scale: int):
+    literals = f'let s: string = "{"x" * 10_000 * scale}";\nlet n: int64 = {"1" * 1_000 * scale};\n'
+    for label, code in (("samples", generated_source(scale)), ("long literals", literals)):
+        print(f"{label}: {len(code)} chars, {code.count(chr(10))} lines")
+        for engine, lexer in LEXERS.items():
+            seconds, tokens = timed(lambda: list(lexer(code)))
+            print(f"  {engine:>6}: {seconds * 1000:8.1f} ms ({len(tokens)} tokens)")
+
+
+def bench_stream(scale: int):
+    with TemporaryDirectory() as tmp:
+        path = Path(tmp) / "data.grv"
+        path.write_text(data_script(1_000 * scale))
+        print(f"data script: {path.stat().st_size} bytes")
+
+        def lex_list():
+            with open(path) as f:
+                return len(tokenize(f.read()))
+
+        def lex_stream():
+            with open(path) as f:
+                return len(deque(tokenize_iter(f), maxlen=0)) # drain without keeping tokens
+
+        def parse_list():
+            with open(path) as f:
+                return Parser(tokenize(f.read())).parse_program()
+
+        def parse_stream():
+            with open(path) as f:
+                return Parser(tokenize_iter(f)).parse_program()
+
+        for label, fn in (("lex, read + list", lex_list), ("lex, streamed", lex_stream),
+                          ("parse, read + list", parse_list), ("parse, streamed", parse_stream)):
+            peak, _ = peak_memory(fn)
+            seconds, _ = timed(fn, repeat=3)
+            print(f"  {label:>18}: peak {peak / 1e6:8.2f} MB, {seconds * 1000:8.1f} ms")
+
+
+def bench_tokens(scale: int):
+    code = generated_source(scale)
+    print(f"samples: {len(code)} chars")
+    for label, lexer in (("list[Token]", tokenize_regex), ("TokenStream", tokenize_compact)):
+        peak, tokens = peak_memory(lexer, code)
+        lex_seconds, _ = timed(lexer, code, repeat=3)
+        parse_seconds, _ = timed(lambda: Parser(tokens).parse_program(), repeat=3)
+        print(f"  {label:>12}: peak {peak / 1e6:7.2f} MB ({peak / len(tokens):5.1f} B/token), "
+              f"lex {lex_seconds * 1000:7.1f} ms, parse {parse_seconds * 1000:7.1f} ms")
+
+
+def bench_relex(scale: int):
+    code = generated_source(scale)
+    print(f"document: {len(code)} chars")
+    middle = code.index("\n", len(code) // 2) # start of a line halfway down
+    full, _ = timed(tokenize_regex, code, repeat=3)
+    print(f"  full re-lex: {full * 1000:8.2f} ms")
+    for label, text in (("type one char", "x"), ("paste a line", "let y: int32 = 42;\n")):
+        edited = code[:middle] + text + code[middle:]
+        best = float("inf")
+        for _ in range(3):
+            # relex updates tokens and the text in place, so start fresh each time
+            tokens, source = TokenRope(tokenize_regex(code)), SourceText(code)
+            start = perf_counter()
+            source.replace(middle, middle, text)
+            relex(tokens, source, middle, middle, middle + len(text))
+            best = min(best, perf_counter() - start)
+        assert [(t.type, t.value, t.line, t.column, t.offset) for t in tokens] == \
+               [(t.type, t.value, t.line, t.column, t.offset) for t in tokenize_regex(edited)]
+        print(f"  relex, {label:>13}: {best * 1000:8.2f} ms")
+
+
+def count_nodes(node) -> int:
+    if isinstance(node, ASTNode):
+        return 1 + sum(count_nodes(getattr(node, name)) for name in node_fields(node))
+    if isinstance(node, (list, tuple)):
+        return sum(count_nodes(item) for item in node)
+    return 0
+
+
+def bench_ast(scale: int):
+    # Memory held by parsed programs: the tokens are dropped, so what's left traced is the AST
+    for name in ("todo.grv", "stdlib.grv"):
+        code = (ROOT / name).read_text() * scale
+        tokens = tokenize_regex(code)
+        start()
+        try:
+            program = Parser(tokens).parse_program()
+            held = get_traced_memory()[0]
+        finally:
+            stop()
+        nodes = count_nodes(program)
+        print(f"{name} x{scale}: {nodes} nodes, {held / 1e6:7.2f} MB held ({held / nodes:5.1f} B/node)")
+
+
+def bench_parse(scale: int):
+    sources = {**sample_sources(), "<expressions>": expression_source(200)}
+    for name, code in sources.items():
+        try:
+            expected = ast_dump(LadderParser(tokenize(code)).parse_program())
+        except Exception as e:
+            expected = str(e)
+        try:
+            got = ast_dump(Parser(tokenize(code)).parse_program())
+        except Exception as e:
+            got = str(e)
+        if got != expected:
+            raise SystemExit(f"Pratt and ladder parsers disagree on {name}")
+    print("parsers agree")
+    tokens = tokenize_regex(expression_source(500 * scale))
+    print(f"expressions: {len(tokens)} tokens")
+    for label, parser in (("ladder", LadderParser), ("pratt", Parser)):
+        seconds, _ = timed(lambda: parser(tokens).parse_program(), repeat=3)
+        print(f"  {label:>6}: {seconds * 1000:8.1f} ms ({len(tokens) / seconds / 1e6:.2f} M tokens/s)")
+
+
+def bench_dispatch(scale: int):
+    for label, code in loop_scripts(100 * scale).items():
+        program = Parser(tokenize_regex(code)).parse_program()
+        statements = 0
+        for engine, interpreter_class in ENGINES.items():
+            def execute():
+                interpreter = interpreter_class(8_000_000)
+                interpreter.interpret(program)
+                return interpreter.last_updated_index
+
+            seconds, executed = timed(execute, repeat=3)
+            statements = executed or statements # the python engine doesn't count statements
+            print(f"{label:>10} {engine:>7}: {seconds * 1000:8.1f} ms, {statements} statements "
+                  f"({seconds / statements * 1e6:.2f} us/statement)")
+
+
+def call_times(global_count: int, depth: int, memory_model="dict"):
+    # (engine, seconds, seconds per call) for running fib(depth) in a program with `global_count` globals
+    programs = [Parser(tokenize_regex(recursion_script(global_count, n))).parse_program() for n in (1, depth)]
+    for engine, interpreter_class in ENGINES.items():
+        # fib(1) is the same program with a single call: subtracting it leaves just the calls
+        setup, recursion = (timed(lambda: interpreter_class(8_000_000, memory_model).interpret(program), repeat=5)[0]
+                            for program in programs)
+        yield engine, recursion, (recursion - setup) / (fib_calls(depth) - 1)
+
+
+def bench_calls(scale: int):
+    # Per-call cost should depend on the callee's locals, not on how many globals exist
+    depth = 10 + scale.bit_length()
+    for global_count in (10, 100, 1000):
+        for engine, seconds, per_call in call_times(global_count, depth):
+            print(f"{global_count:>5} globals {engine:>7}: {seconds * 1000:8.1f} ms, {per_call * 1e6:.2f} us/call")
+
+
+def bench_cells(scale: int):
+    # Variables as VarCells against the {"type", "value", "address"} dicts they replaced: making
+    # one per `let` and parameter, and reading and writing its value, then the call-heavy script
+    count = scale * 1000
+
+    def update_entries(entries):
+        for entry in entries:
+            entry["value"] = entry["value"] + 1
+
+    def update_cells(cells):
+        for cell in cells:
+            cell.value = cell.value + 1
+
+    kinds = {
+        "dict entries": (lambda i: {"type": "int32", "value": i, "address": i}, update_entries),
+        "VarCells": (lambda i: VarCell("int32", i, i), update_cells),
+    }
+    for kind, (make, update) in kinds.items():
+        create_seconds, entries = timed(lambda: [make(i) for i in range(count)])
+        update_seconds, _ = timed(update, entries)
+        size, _ = peak_memory(lambda: [make(i) for i in range(count)])
+        print(f"{kind:>12}: create {create_seconds * 1e9 / count:6.1f} ns, read + write {update_seconds * 1e9 / count:6.1f} ns, "
+              f"{size / count:6.1f} bytes per variable")
+    for engine, seconds, per_call in call_times(10, 10 + scale.bit_length()):
+        print(f"{'calls':>12} {engine:>7}: {seconds * 1000:8.1f} ms, {per_call * 1e6:.2f} us/call")
+
+
+def bench_casts(scale: int):
+    # Interpreter.cast_value_to_type through the interned TypeDescriptors, per type; the cast to a
+    # struct and to "Missing" (which fails) look the name up among the user's types
+    count = scale * 1000
+    interpreter = Interpreter()
+    interpreter.execute_struct_def(StructDefNode("Vec", [("x", "int32")], []))
+    cast = interpreter.cast_value_to_type
+
+    def cast_all(value, type_name):
+        for _ in range(count):
+            try:
+                cast(value, type_name)
+            except Exception:
+                pass
+
+    for type_name, value in (("int32", 5), ("uint64", 5), ("float64", 1.5), ("char", "c"), ("string", 5),
+                             ("any", 5), ("array", []), ("array<int32>", []), ("Vec", {}), ("Missing", 5)):
+        seconds, _ = timed(cast_all, value, type_name)
+        print(f"{type_name:>12}: {seconds * 1e9 / count:6.1f} ns per cast")
+
+
+def bench_arrays(scale: int):
+    # Plain arrays (lists) against array<int32>/array<float64>: building one from a list of numbers,
+    # its footprint, and iterating over it
+    count = scale * 1000
+    for element, make in (("int32", lambda i: i), ("float64", lambda i: i * 0.5)):
+        values = [make(i) for i in range(count)]
+        kinds = {"array": list, f"array<{element}>": lambda items: typed_array(f"array<{element}>", items)}
+        for kind, build in kinds.items():
+            build_seconds, built = timed(build, values)
+            size, _ = peak_memory(lambda: build(make(i) for i in range(count))) # elements included
+            iterate_seconds, _ = timed(sum, built)
+            print(f"{kind:>15}: build {build_seconds * 1000:6.2f} ms, {size / count:5.1f} bytes per element, "
+                  f"sum {iterate_seconds * 1000:6.2f} ms")
+
+
+def elementwise_scripts(count: int, repeat: int) -> dict[str, str]:
+    # out = xs * ys + 1.0 over two array<float64>s: element by element in Gravox, and `repeat` times
+    # as one vectorized expression. "setup" is what both start with.
+    setup = f"""
+        let base: array<float64> = [{', '.join(f'{i}.5' for i in range(100))}];
+        let xs: array<float64> = [];
+        let ys: array<float64> = [];
+        let j: int32 = 0;
+        while j < {count // 100} {{
+            _array_extend(xs, base);
+            _array_extend(ys, base * 3);
+            j = j + 1;
+        }}
+    """
+    return {
+        "setup": setup,
+        "loop": setup + f"""
+            let out: array = [];
+            let i: int32 = 0;
+            while i < {count} {{
+                _array_push(out, _get_nth_element(xs, i) * _get_nth_element(ys, i) + 1.0);
+                i = i + 1;
+            }}
+        """,
+        "vectorized": setup + f"""
+            let out: array<float64> = [];
+            let k: int32 = 0;
+            while k < {repeat} {{
+                out = xs * ys + 1.0;
+                k = k + 1;
+            }}
+        """,
+    }
+
+
+def bench_elementwise(scale: int):
+    count, repeat = scale * 100, 50
+    print(f"{count} elements, elementwise operations {'with NumPy' if arrays.numpy else 'with the array module'}")
+    programs = {name: Parser(tokenize_regex(source)).parse_program()
+                for name, source in elementwise_scripts(count, repeat).items()}
+    for engine, interpreter_class in ENGINES.items():
+        setup, loop, vectorized = (timed(lambda: interpreter_class(8_000_000).interpret(program))[0]
+                                   for program in programs.values())
+        loop, vectorized = loop - setup, (vectorized - setup) / repeat
+        print(f"{engine:>7}: loop {loop * 1000:8.2f} ms, vectorized {vectorized * 1000:6.3f} ms ({loop / vectorized:.0f}x)")
+
+
+def sharing_script(size: int, calls: int) -> str:
+    # An array of `size` elements passed to a function and returned `calls` times
+    return f"""
+        def pass_on(items: array) -> array {{
+            return items;
+        }}
+        let items: array = [];
+        _array_extend(items, [{', '.join(map(str, range(100)))}]);
+        let j: int32 = 0;
+        while j < {size // 100 - 1} {{
+            _array_extend(items, [{', '.join(map(str, range(100)))}]);
+            j = j + 1;
+        }}
+        let copy: array = [];
+        let i: int32 = 0;
+        while i < {calls} {{
+            copy = pass_on(items);
+            i = i + 1;
+        }}
+    """
+
+
+def bench_sharing(scale: int):
+    # Arrays are shared by assignment, binding and return and only copied when changed (see
+    # arrays.GravoxArray), so passing a big one around costs what passing a small one does
+    calls = scale * 100
+    for engine, interpreter_class in ENGINES.items():
+        times = []
+        for size in (100, scale * 1000):
+            setup, run = (Parser(tokenize_regex(sharing_script(size, count))).parse_program() for count in (0, calls))
+            seconds = timed(lambda: interpreter_class().interpret(run))[0] - timed(lambda: interpreter_class().interpret(setup))[0]
+            times.append(f"{size:>7} elements {seconds * 1e6 / calls:7.2f} us/call")
+        print(f"{engine:>7}: {', '.join(times)}")
+
+
+def optimizer_script(count: int) -> str:
+    # A loop full of constant expressions, a constant global and branches on constants
+    return f"""
+        let DEBUG: int32 = 0;
+        let RATE: float64 = 1.5;
+        let total: float64 = 0.0;
+        let i: int32 = 0;
+        while i < {count} {{
+            total = total + 60 * 60 * 1000 * RATE + <float64>(1 << 4) - -2;
+            if DEBUG {{
+                total = 0.0;
+            }} elif 2 > 1 {{
+                total = total + 1;
+            }}
+            i = i + 1;
+        }}
+    """
+
+
+def bench_optimize(scale: int):
+    # optimizer.optimize: what it removes from each sample, then a constant-heavy loop run with
+    # and without it
+    for name, source in sample_sources().items():
+        report = optimize(Parser(tokenize_regex(source)).parse_program())
+        print(f"{name:>20}: removed {report['removed']:4} of {report['nodes']:5} nodes ({report['folded']} folded, "
+              f"{report['branches']} branches, {report['propagated']} propagated)")
+    source = optimizer_script(scale * 100)
+    for engine, interpreter_class in ENGINES.items():
+        times = {}
+        for optimized in (False, True):
+            program = Parser(tokenize_regex(source)).parse_program()
+            if optimized:
+                optimize(program)
+            times[optimized] = timed(lambda: interpreter_class().interpret(program))[0]
+        print(f"{engine:>7}: {times[False] * 1000:8.2f} ms, optimized {times[True] * 1000:8.2f} ms "
+              f"({times[False] / times[True]:.2f}x)")
+
+
+def struct_script(count: int) -> str:
+    # `count` writes and reads of a struct's fields
+    return f"""
+        struct Particle {{
+            x: float64;
+            y: float64;
+            mass: float64;
+            id: int32;
+        }}
+        let p: Particle;
+        let i: int32 = 0;
+        while i < {count} {{
+            p.x = p.x + 1.5;
+            p.id = i;
+            i = i + 1;
+        }}
+    """
+
+
+def bench_structs(scale: int):
+    # Struct instances as slotted records (see structs.struct_class) against the {field: value}
+    # dicts they were: footprint and field writes, then a field-heavy loop on each engine
+    count = scale * 100
+    struct_def = StructDefNode("Particle", [("x", "float64"), ("y", "float64"), ("mass", "float64"), ("id", "int32")], [])
+    record = struct_class(struct_def)
+    layout = record.__layout__
+    kinds = {"dict": lambda: {name: 0.0 for name, _ in struct_def.fields}, "record": record}
+    for kind, make in kinds.items():
+        size, instances = peak_memory(lambda: [make() for _ in range(count)])
+        instance = instances[0]
+        if kind == "dict":
+            def write(value):
+                # as the interpreter did: check the field, then find its type among the struct's fields
+                if "x" in instance:
+                    _, field_type = next(filter(lambda x: x[0] == "x", struct_def.fields))
+                    instance["x"] = float(value)
+        else:
+            def write(value):
+                attribute, _ = layout["x"]
+                setattr(instance, attribute, float(value))
+        seconds, _ = timed(lambda: [write(i) for i in range(count)])
+        print(f"{kind:>7}: {size / count:6.1f} bytes per instance, {seconds * 1e9 / count:6.1f} ns per field write")
+    program = Parser(tokenize_regex(struct_script(count))).parse_program()
+    for engine, interpreter_class in ENGINES.items():
+        seconds, _ = timed(lambda: interpreter_class().interpret(program))
+        print(f"{engine:>7}: {seconds * 1e6 / count:6.2f} us per iteration")
+
+
+def enum_script(count: int) -> str:
+    # A switch-like `if`/`elif` chain over an enum's members, run `count` times
+    return f"""
+        enum Direction {{ North, East, South, West, }}
+        let d: Direction = Direction.West;
+        let x: int32 = 0;
+        let i: int32 = 0;
+        while i < {count} {{
+            if d == Direction.North {{
+                x = x + 1;
+            }} elif d == Direction.East {{
+                x = x + 2;
+            }} elif d == Direction.South {{
+                x = x + 3;
+            }} elif d == Direction.West {{
+                x = x + 4;
+            }}
+            i = i + 1;
+        }}
+    """
+
+
+def bench_enums(scale: int):
+    # Enum members are resolved by the resolver to ints (see enums.EnumMember), so the chain compares
+    # small ints and loads them as constants
+    count = scale * 100
+    program = Parser(tokenize_regex(enum_script(count))).parse_program()
+    for engine, interpreter_class in ENGINES.items():
+        seconds, _ = timed(lambda: interpreter_class().interpret(program))
+        print(f"{engine:>7}: {seconds * 1e6 / count:6.2f} us per iteration")
+
+
+def bench_memory(scale: int):
+    # The memory models (see interpreter.MEMORY_MODELS): storing `count` int64 variables, reading
+    # and writing each, and copying the first half of them over the second, then the call-heavy script
+    count = scale * 1000
+    for model_name, model in MEMORY_MODELS.items():
+        memory = model(count * 8)
+
+        def fill():
+            for address in range(0, count * 8, 8):
+                memory[address] = memory.cell("int64", address, address)
+            return list(memory.values())
+
+        size, cells = peak_memory(fill)
+        update_seconds, _ = timed(lambda: [setattr(cell, "value", cell.value + 1) for cell in cells])
+        copy_seconds, _ = timed(memory.copy, count * 4, 0, count * 4)
+        print(f"{model_name:>5}: {size / count:6.1f} bytes per variable, read + write {update_seconds * 1e9 / count:6.1f} ns, "
+              f"copy {count * 4} bytes {copy_seconds * 1000:7.3f} ms")
+        for engine, seconds, per_call in call_times(10, 10 + scale.bit_length(), model_name):
+            print(f"{'calls':>12} {engine:>7}: {seconds * 1000:8.1f} ms, {per_call * 1e6:.2f} us/call")
+
+
+# Answers for the interactive samples (calcrepl, todo)
+SAMPLE_INPUT = "5\nadd foo\nlist\nlog\nexit\ny\n"
+# Engines that don't track which statement is running, so their error reports aren't comparable
+UNTRACKED_ENGINES = {"python"}
+
+
+def check_engines() -> int:
+    """Runs every sample through gravox.py on each engine and compares the output with the
+    tree-walking interpreter's, error messages included."""
+    failures = 0
+    with TemporaryDirectory() as tmp: # samples write files (todo saves); keep them out of the tree
+        for path in sorted(ROOT.glob("*.grv")):
+            (Path(tmp) / path.name).write_text(path.read_text())
+        for path in sorted(ROOT.glob("*.grv")):
+            outputs = {}
+            for engine in ENGINES:
+                outputs[engine] = run([executable, ROOT / "gravox.py", path.name, f"--engine={engine}"], cwd=tmp,
+                                      input=SAMPLE_INPUT, capture_output=True, text=True, timeout=60).stdout
+            for engine, output in outputs.items():
+                expected = outputs["tree"]
+                if engine in UNTRACKED_ENGINES: # same output, up to the error report
+                    output, expected = output.split("error at ")[0], expected.split("error at ")[0]
+                if output != expected:
+                    print(f"MISMATCH {engine} on {path.name}")
+                    failures += 1
+    print("all engines agree" if not failures else f"{failures} mismatches")
+    return failures
+
+
+def bench_import(scale: int):
+    with TemporaryDirectory() as tmp:
+        for name in ("stdlib.grv", "todo.grv"):
+            path = Path(tmp) / name
+            path.write_text((ROOT / name).read_text())
+
+            def cold():
+                cache_path(path).unlink(missing_ok=True)
+                return load_module(path)
+
+            cold_seconds, parsed = timed(cold, repeat=scale)
+            warm_seconds, cached = timed(load_module, path, repeat=scale)
+            assert ast_dump(cached) == ast_dump(parsed)
+            print(f"{name}: parse + write {cold_seconds * 1000:6.2f} ms, cached {warm_seconds * 1000:6.2f} ms "
+                  f"({cache_path(path).stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    command = argv[1] if len(argv) > 1 else "lex"
+    scale = int(argv[2]) if len(argv) > 2 else 200
+    match command:
+        case "lex":
+            if check_lexers():
+                raise SystemExit(1)
+            bench_lex(scale)
+        case "tokens":
+            bench_tokens(scale)
+        case "parse":
+            bench_parse(scale)
+        case "dispatch":
+            bench_dispatch(scale)
+        case "engines":
+            if check_engines():
+                raise SystemExit(1)
+            bench_dispatch(scale)
+        case "calls":
+            bench_calls(scale)
+        case "cells":
+            bench_cells(scale)
+        case "memory":
+            bench_memory(scale)
+        case "casts":
+            bench_casts(scale)
+        case "arrays":
+            bench_arrays(scale)
+        case "elementwise":
+            bench_elementwise(scale)
+        case "sharing":
+            bench_sharing(scale)
+        case "optimize":
+            bench_optimize(scale)
+        case "structs":
+            bench_structs(scale)
+        case "enums":
+            bench_enums(scale)
+        case "import":
+            bench_import(scale)
+        case "ast":
+            bench_ast(scale)
+        case "relex":
+            bench_relex(scale)
+        case "stream":
+            bench_stream(scale)
+        case _:
+            raise SystemExit(f"Unknown benchmark '{command}'")
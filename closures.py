@@ -0,0 +1,352 @@
+from typing import Any, Callable
+
+from arrays import TypedArray
+from grvast import ArrayLiteralNode, BinaryOpNode, BlockNode, CharLiteralNode, FloatLiteralNode, \
+    ForLoopNode, FunctionCallNode, FunctionDefNode, IdentifierNode, IfStatementNode, IntLiteralNode, \
+    MethodCallNode, NullLiteralNode, ProgramNode, ReturnNode, StringLiteralNode, StructFieldAccessNode, TypeCastNode, \
+    UnaryOpNode, VarAssignNode, WhileLoopNode
+from interpreter import BINARY_OPERATIONS, UNARY_OPERATIONS, ZERO_DIVISION_ERRORS, Frame, Interpreter, VarCell
+from resolver import resolve
+from stdlib import IN_PLACE_BUILTINS
+
+Thunk = Callable[[], Any]
+
+
+class ClosureInterpreter(Interpreter):
+    """Runs programs by compiling each node once into a nested Python closure, with operators and
+    constant operands resolved up front, instead of re-dispatching on the AST every time it runs.
+
+    Runtime state (globals and call frames, memory, struct and function tables) is shared with
+    `Interpreter`, and any node without a specialised compiler falls back to the tree-walking
+    handler for it, so the two engines behave identically. Compiled code is cached per node (nodes hash by identity),
+    and function bodies are compiled the first time they are called. A call is bound to the
+    function or builtin it runs when it's compiled, and rebound when a `def` or an import changes
+    what the name refers to."""
+
+    def __init__(self, heap_size=1024, memory_model="dict"):
+        super().__init__(heap_size, memory_model)
+        self.compiled_statements: dict[Any, Thunk] = {}
+        self.compiled_expressions: dict[Any, Thunk] = {}
+        self.compiled_functions: dict[FunctionDefNode, Thunk] = {}
+        self.call_targets: dict[str, list[FunctionDefNode | Callable[[list], Any]]] = {} # see call_target
+        self.statement_compilers: dict[type, Callable[[Any], Thunk]] = {
+            ProgramNode: self.compile_block,
+            BlockNode: self.compile_block,
+            VarAssignNode: self.compile_variable_assignment,
+            FunctionCallNode: self.compile_function_call,
+            ReturnNode: self.compile_return,
+            IfStatementNode: self.compile_if_statement,
+            WhileLoopNode: self.compile_while_loop,
+            ForLoopNode: self.compile_for_loop,
+        }
+        self.expression_compilers: dict[type, Callable[[Any], Thunk]] = {
+            IntLiteralNode: self.compile_literal,
+            FloatLiteralNode: self.compile_literal,
+            CharLiteralNode: self.compile_literal,
+            StringLiteralNode: self.compile_literal,
+            NullLiteralNode: self.compile_null,
+            ArrayLiteralNode: self.compile_array_literal,
+            IdentifierNode: self.compile_identifier,
+            BinaryOpNode: self.compile_binary_op,
+            UnaryOpNode: self.compile_unary_op,
+            FunctionCallNode: self.compile_function_call,
+            MethodCallNode: self.compile_method_call,
+            StructFieldAccessNode: self.compile_struct_field_access,
+            TypeCastNode: self.compile_type_cast,
+        }
+
+    # --- Entry points: everything the tree-walking code calls ends up in compiled code ---
+    def interpret(self, program_node):
+        resolve(program_node)
+        self.frame = Frame(program_node)
+        self.compile_block(program_node)()
+        return None
+
+    def execute_statement(self, node):
+        run = self.compiled_statements.get(node) or self.compile_statement(node)
+        return run()
+
+    def evaluate_expression(self, node):
+        run = self.compiled_expressions.get(node) or self.compile_expression(node)
+        return run()
+
+    def _run_function_body(self, func_def: FunctionDefNode):
+        body = self.compiled_functions.get(func_def) or self.compile_function(func_def)
+        return body()
+
+    # --- Statements ---
+    def compile_statement(self, node) -> Thunk:
+        run = self._compile_statement_body(node)
+
+        def statement():
+            self.last_updated_index += 1
+            self.last_node = node
+            return run()
+
+        self.compiled_statements[node] = statement
+        return statement
+
+    def _compile_statement_body(self, node) -> Thunk:
+        # The statement itself, without the last_updated_index/last_node bookkeeping
+        if compiler := self.statement_compilers.get(type(node)):
+            return compiler(node)
+        if handler := self.statement_handlers.get(type(node)):
+            return lambda: handler(node)
+        expression = self.compile_expression(node) # Expression statement: value is discarded
+
+        def expression_statement():
+            expression()
+
+        return expression_statement
+
+    def compile_block(self, node) -> Thunk:
+        steps = [(statement, self._compile_statement_body(statement)) for statement in node.statements]
+
+        def block():
+            for statement, run in steps:
+                self.last_updated_index += 1
+                self.last_node = statement
+                run()
+
+        if isinstance(node, BlockNode) and node.owns_storage:
+            release_storage = self.release_storage
+
+            def scope():
+                mark = len(self.owned)
+                try:
+                    block()
+                finally:
+                    release_storage(mark) # also when unwinding to a `try`
+
+            return scope
+        return block
+
+    def compile_function(self, func_def: FunctionDefNode) -> Thunk:
+        # Only a `return` directly in the function body ends the call (as in Interpreter._execute_callable)
+        steps = [(statement, self._compile_statement_body(statement),
+                  self.compile_expression(statement.return_expr) if isinstance(statement, ReturnNode) else None)
+                 for statement in func_def.body.statements]
+
+        def body():
+            for statement, run, return_expr in steps:
+                self.last_updated_index += 1
+                self.last_node = statement
+                if return_expr:
+                    return return_expr()
+                run()
+            return None
+
+        self.compiled_functions[func_def] = body
+        return body
+
+    def compile_return(self, node) -> Thunk:
+        return lambda: node # Handled by the enclosing function body; a no-op anywhere else
+
+    def compile_variable_assignment(self, node) -> Thunk:
+        var_name = node.var_name
+        slot = node.slot
+        value = self.compile_expression(node.value_expr)
+        assign = self._handle_variable_assignment
+        return lambda: assign(var_name, value(), slot)
+
+    def compile_if_statement(self, node) -> Thunk:
+        condition = self.compile_expression(node.condition)
+        then_block = self.compile_statement(node.then_block)
+        elif_blocks = [(self.compile_expression(c), self.compile_statement(b)) for c, b in node.elif_blocks or ()]
+        else_block = self.compile_statement(node.else_block) if node.else_block else None
+
+        def if_statement():
+            if condition():
+                then_block()
+            else:
+                for elif_condition, elif_block in elif_blocks:
+                    if elif_condition():
+                        elif_block()
+                        return # Exit after executing elif
+                if else_block:
+                    else_block()
+
+        return if_statement
+
+    def compile_while_loop(self, node) -> Thunk:
+        condition = self.compile_expression(node.condition)
+        loop_block = self.compile_statement(node.loop_block)
+
+        def while_loop():
+            while condition():
+                loop_block()
+
+        return while_loop
+
+    def compile_for_loop(self, node) -> Thunk:
+        init_stmt = self.compile_statement(node.init_stmt)
+        condition = self.compile_expression(node.condition_expr)
+        loop_block = self.compile_statement(node.loop_block)
+        increment_stmt = self.compile_statement(node.increment_stmt)
+
+        def for_loop():
+            mark = len(self.owned)
+            try:
+                init_stmt()
+                while condition():
+                    loop_block()
+                    increment_stmt()
+            finally:
+                if node.owns_storage:
+                    self.release_storage(mark) # the loop variable's
+
+        return for_loop
+
+    # --- Expressions ---
+    def compile_expression(self, node) -> Thunk:
+        if compiler := self.expression_compilers.get(type(node)):
+            run = compiler(node)
+        elif handler := self.expression_handlers.get(type(node)):
+            run = lambda: handler(node)
+        else:
+            run = lambda: None # Default return if not handled.
+        self.compiled_expressions[node] = run
+        return run
+
+    def compile_literal(self, node) -> Thunk:
+        value = node.value
+        return lambda: value
+
+    def compile_struct_field_access(self, node) -> Thunk:
+        if (member := node.member) is not None: # `Enum.member`, resolved by the resolver
+            return lambda: member
+        return lambda: self.evaluate_struct_field_access(node)
+
+    def compile_null(self, node) -> Thunk:
+        return lambda: None
+
+    def compile_array_literal(self, node) -> Thunk:
+        elements = [self.compile_expression(element) for element in node.elements]
+        return lambda: [element() for element in elements]
+
+    def compile_identifier(self, node) -> Thunk:
+        var_name = node.name
+        slow_path = self.evaluate_identifier # pretty-printing, enums, errors and undeclared locals
+        if (slot := node.slot) >= 0:
+            def local():
+                entry = self.frame.slots[slot]
+                if entry is not None and self.resolving_context != "pretty":
+                    return entry.value
+                return slow_path(node)
+
+            return local
+
+        def identifier():
+            symbols = self.symbol_table
+            if var_name in symbols and self.resolving_context != "pretty":
+                return symbols[var_name].value
+            return slow_path(node)
+
+        return identifier
+
+    def compile_binary_op(self, node) -> Thunk:
+        left = self.compile_expression(node.left_expr)
+        right = self.compile_expression(node.right_expr)
+        operation = BINARY_OPERATIONS.get(node.op)
+        if zero_division_error := ZERO_DIVISION_ERRORS.get(node.op):
+            def checked_binary_op():
+                left_value = left()
+                right_value = right()
+                if right_value.__class__ is not TypedArray and right_value == 0: # arrays check their own
+                    raise Exception(zero_division_error)
+                return operation(left_value, right_value)
+
+            return checked_binary_op
+        if operation is None:
+            return lambda: (left(), right(), None)[-1]
+        return lambda: operation(left(), right())
+
+    def compile_unary_op(self, node) -> Thunk:
+        if operation := UNARY_OPERATIONS.get(node.op):
+            expr = self.compile_expression(node.expr)
+            return lambda: operation(expr())
+        return lambda: self.evaluate_unary_op(node) # Pointers: need the operand node, not just its value
+
+    def compile_function_call(self, node) -> Thunk:
+        if not isinstance(node.func_name, IdentifierNode):
+            return lambda: self.execute_function_call(node) # Reports the bad callee when it runs
+        func_name = node.func_name.name
+        args = [self.compile_expression(arg) for arg in node.args]
+        if func_name in IN_PLACE_BUILTINS and node.args:
+            array = node.args[0]
+            args[0] = lambda: self.evaluate_in_place_argument(array)
+        target = self.call_target(func_name)
+        execute_callable = self._execute_callable
+
+        def function_call():
+            arg_values = [arg() for arg in args]
+            run = target[0]
+            if run.__class__ is FunctionDefNode:
+                return execute_callable(run, arg_values)
+            return run(arg_values)
+
+        return function_call
+
+    def call_target(self, func_name: str) -> list[FunctionDefNode | Callable[[list], Any]]:
+        # What a call to `func_name` runs, bound when the first call to it is compiled, in a
+        # one-item list shared by all its call sites so rebinding the name updates them all
+        target = self.call_targets.get(func_name)
+        if target is None:
+            target = self.call_targets[func_name] = [None]
+            self.bind_call_target(func_name)
+        return target
+
+    def bind_call_target(self, func_name: str):
+        # The function defined as `func_name`, or else the builtin; as in Interpreter.execute_function_call
+        if (run := self.function_table.get(func_name)) is None and not (run := self.stdlib[func_name]):
+            def run(_):
+                raise Exception(f"Function '{func_name}' not defined")
+        self.call_targets[func_name][0] = run
+
+    def execute_function_def(self, node):
+        super().execute_function_def(node)
+        if str(node.func_name) in self.call_targets:
+            self.bind_call_target(str(node.func_name))
+
+    def execute_import(self, node):
+        super().execute_import(node)
+        for func_name in self.call_targets:
+            self.bind_call_target(func_name)
+
+    def compile_method_call(self, node) -> Thunk:
+        # The method is found through the call site's cache (see Interpreter.lookup_method)
+        instance = node.instance_expr
+        args = [self.compile_expression(arg) for arg in node.args]
+        lookup_method = self.lookup_method
+        if isinstance(instance, IdentifierNode): # a variable: its cell has both the type and the value
+            var_name, slot = instance.name, instance.slot
+            lookup_variable = self.lookup_variable
+            slow_path = self.evaluate_method_call # enums and undeclared variables
+
+            def variable_method_call():
+                cell = lookup_variable(var_name, slot)
+                if cell is None:
+                    return slow_path(node)
+                instance_type, instance_value = cell.type or "*unknown*", cell.value
+                method_def = lookup_method(node, instance_type)
+                return self._execute_callable(method_def, [arg() for arg in args],
+                                              self_instance=VarCell(instance_type, instance_value, -1))
+
+            return variable_method_call
+        value = self.compile_expression(instance)
+        expression_type = self._get_expression_type
+
+        def method_call():
+            instance_type = expression_type(instance)
+            instance_value = value()
+            method_def = lookup_method(node, instance_type)
+            return self._execute_callable(method_def, [arg() for arg in args],
+                                          self_instance=VarCell(instance_type, instance_value, -1))
+
+        return method_call
+
+    def compile_type_cast(self, node) -> Thunk:
+        expression = self.compile_expression(node.expression)
+        target_type = node.target_type
+        cast = self.cast_value_to_type
+        return lambda: cast(expression(), target_type)
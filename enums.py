@@ -0,0 +1,33 @@
+from grvast import EnumDefNode
+
+
+class EnumMember(int):
+    """A member of an enum: its ordinal, the position it's declared at, so members compare, hash
+    and cast to ints as small ints do. It keeps its enum's and its own name, and prints as the
+    name, as members did when they were kept as name strings."""
+
+    def __new__(cls, ordinal: int, enum_name: str, name: str) -> "EnumMember":
+        member = super().__new__(cls, ordinal)
+        member.enum_name = enum_name
+        member.name = name
+        return member
+
+    def __getnewargs__(self):
+        return int(self), self.enum_name, self.name
+
+    def __repr__(self) -> str:
+        return repr(self.name)
+
+    def __str__(self) -> str:
+        return self.name
+
+    def __format__(self, format_spec: str) -> str:
+        return format(self.name, format_spec)
+
+
+def enum_members(enum_def: EnumDefNode) -> dict[str, EnumMember]:
+    # {member name: member} of an enum; a member declared twice keeps its first ordinal
+    members: dict[str, EnumMember] = {}
+    for ordinal, name in enumerate(enum_def.members):
+        members.setdefault(name, EnumMember(ordinal, enum_def.enum_name, name))
+    return members
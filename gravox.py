@@ -1,6 +1,10 @@
+from closures import ClosureInterpreter
 from interpreter import Interpreter
-from lexing import tokenize
+from lexing import LEXERS
+from optimizer import optimize
 from parser import Parser
+from transpiler import PythonRuntime, transpile
+from vm import VirtualMachine
 
 # --- 2. Parser (Simplified - Expression parsing and basic statements) ---
 # [MOVED]
@@ -11,23 +15,48 @@ from parser import Parser
 interpreter = None
 ast_tree = None
 
+# --engine=<name>: how the parsed program is executed
+ENGINES = {"tree": Interpreter, "closure": ClosureInterpreter, "vm": VirtualMachine, "python": PythonRuntime}
+
 # --- 4. Example Execution ---
-def run_gravox_code(code, debug = False):
+def run_gravox_code(code, debug = False, lexer = "stream", engine = "tree", emit_python = False, memory = "dict",
+                    optimized = True):
+    # `code` is source text, or an open file that the stream lexer reads chunk by chunk.
+    # With emit_python the program is transpiled and the Python module printed instead of run.
+    # `memory` picks the memory model (see interpreter.MEMORY_MODELS). Unless `optimized` is
+    # False, the program is simplified first (see optimizer.optimize).
     global interpreter, ast_tree
     try:
-        tokens = tokenize(code)
+        if lexer != "stream" and not isinstance(code, str):
+            code = code.read()
+        tokens = LEXERS[lexer](code)
         if debug:
+            tokens = list(tokens)
             print("\nTokens:")
             for token in tokens:
                 print(token)
 
         parser = Parser(tokens)
         ast_tree = parser.parse_program()
+        if optimized:
+            report = optimize(ast_tree)
+            if debug:
+                print(f"\nOptimizer: removed {report['removed']} of {report['nodes']} nodes ({report['folded']} folded, "
+                      f"{report['branches']} branches eliminated, {report['propagated']} constants propagated)")
         if debug:
             print("\nAST Tree:")
             print(ast_tree)
+        if emit_python:
+            print(transpile(ast_tree, getattr(code, "name", "<string>")), end="")
+            return None
 
-        interpreter = Interpreter(8_000_000)
+        interpreter = ENGINES[engine](8_000_000, memory)
+        if debug and isinstance(interpreter, VirtualMachine):
+            print("\nBytecode:")
+            print(interpreter.disassemble(ast_tree))
+        if debug and isinstance(interpreter, PythonRuntime):
+            print("\nPython:")
+            print(transpile(ast_tree))
         interpreter.interpret(ast_tree)
         # if debug:
         #     print("\nInterpretation Result:", result)
@@ -40,7 +69,15 @@ def run_gravox_code(code, debug = False):
         print(f"error at {interpreter.last_updated_index} ({interpreter.last_node}): {e}")
         return None
 
+def get_option(argv, name, default):
+    # --name=value style flags
+    for arg in argv:
+        if arg.startswith(f"--{name}="):
+            return arg.split("=", 1)[1]
+    return default
+
 if __name__ == "__main__":
     from sys import argv
     with open(argv[1]) as f:
-        run_gravox_code(f.read(), "-d" in argv)
+        run_gravox_code(f, "-d" in argv, get_option(argv, "lexer", "stream"), get_option(argv, "engine", "tree"),
+                        "--emit-python" in argv, get_option(argv, "memory", "dict"), "--no-optimize" not in argv)
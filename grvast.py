@@ -1,50 +1,108 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
+
 
 class ASTNode:
-    line: int = 0
-    column: int = 0
+    # Nodes are slotted: no per-instance __dict__. Every subclass lists its own fields in
+    # __slots__ and takes its position as trailing `line`/`column` constructor arguments.
+    __slots__ = ("line", "column")
+
+    def __init__(self, line: int = 0, column: int = 0) -> None:
+        self.line = line
+        self.column = column
+
+
+def iter_child_nodes(node: ASTNode) -> Iterator[ASTNode]:
+    """Direct children of `node` in field order, looking inside list/tuple fields (like
+    ast.iter_child_nodes). Fields holding names, types or tokens are skipped."""
+    for cls in type(node).__mro__[-3::-1]: # base class fields first
+        for field in cls.__dict__.get("__slots__", ()):
+            yield from _nodes_in(getattr(node, field, None))
+
+
+def _nodes_in(value) -> Iterator[ASTNode]:
+    if isinstance(value, ASTNode):
+        yield value
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _nodes_in(item)
+
+
+def walk(node: ASTNode) -> Iterator[ASTNode]:
+    """`node` and all of its descendants, parents before children."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(list(iter_child_nodes(node))))
 
 
 class ProgramNode(ASTNode):
-    def __init__(self, statements: list[ASTNode]) -> None:
+    __slots__ = ("statements", "local_names")
+
+    def __init__(self, statements: list[ASTNode], line: int = 0, column: int = 0) -> None:
         self.statements = statements
+        self.line = line
+        self.column = column
+        self.local_names: tuple[str, ...] = () # variables declared in top-level blocks (see resolver.py)
 
     def __repr__(self) -> str:
         return f'<ProgramNode statements={self.statements}>'
 
 
 class BlockNode(ASTNode):
-    def __init__(self, statements: list[ASTNode]) -> None:
+    __slots__ = ("statements", "owns_storage")
+
+    def __init__(self, statements: list[ASTNode], line: int = 0, column: int = 0) -> None:
         self.statements = statements
+        self.line = line
+        self.column = column
+        self.owns_storage = False # declares variables whose storage is freed when it ends (see resolver.py)
 
     def __repr__(self) -> str:
         return f'<BlockNode statements={self.statements}>'
 
 
 class VarDeclarationNode(ASTNode):
-    def __init__(self, var_name: str, data_type: str, value_expr: ASTNode | None = None) -> None:
+    __slots__ = ("var_name", "data_type", "value_expr", "slot", "owned")
+
+    def __init__(self, var_name: str, data_type: str, value_expr: ASTNode | None = None, line: int = 0, column: int = 0) -> None:
         self.var_name = var_name
         self.data_type = data_type
         self.value_expr = value_expr
+        self.line = line
+        self.column = column
+        self.slot = -1 # frame slot of the variable, or -1 for a global (see resolver.py)
+        self.owned = False # its storage is freed when its scope ends
 
     def __repr__(self) -> str:
         return f'<VarDeclarationNode name={self.var_name}, type={self.data_type}, value={self.value_expr}>'
 
 
 class VarAssignNode(ASTNode):
-    def __init__(self, var_name: str, value_expr: ASTNode) -> None:
+    __slots__ = ("var_name", "value_expr", "slot")
+
+    def __init__(self, var_name: str, value_expr: ASTNode, line: int = 0, column: int = 0) -> None:
         self.var_name = var_name
         self.value_expr = value_expr
+        self.line = line
+        self.column = column
+        self.slot = -1 # frame slot of the variable, or -1 for a global (see resolver.py)
 
     def __repr__(self) -> str:
         return f'<VarAssignNode name={self.var_name}, value={self.value_expr}>'
 
 
 class IdentifierNode(ASTNode):
-    def __init__(self, name: str) -> None:
+    __slots__ = ("name", "slot")
+
+    def __init__(self, name: str, line: int = 0, column: int = 0) -> None:
         self.name = name
-    
+        self.line = line
+        self.column = column
+        self.slot = -1 # frame slot of the variable, or -1 for a global (see resolver.py)
+
     def __str__(self):
         return self.name
 
@@ -53,96 +111,141 @@ class IdentifierNode(ASTNode):
 
 
 class IntLiteralNode(ASTNode):
-    def __init__(self, value: str | int) -> None:
+    __slots__ = ("value",)
+
+    def __init__(self, value: str | int, line: int = 0, column: int = 0) -> None:
         self.value = int(value)
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f'<IntLiteralNode value={self.value}>'
 
 
 class FloatLiteralNode(ASTNode):
-    def __init__(self, value: str | float) -> None:
+    __slots__ = ("value",)
+
+    def __init__(self, value: str | float, line: int = 0, column: int = 0) -> None:
         self.value = float(value)
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f'<FloatLiteralNode value={self.value}>'
 
 
 class CharLiteralNode(ASTNode):
-    def __init__(self, value: str) -> None:
+    __slots__ = ("value",)
+
+    def __init__(self, value: str, line: int = 0, column: int = 0) -> None:
         self.value = value
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f'<CharLiteralNode value={self.value}>'
 
 
 class StringLiteralNode(ASTNode):
-    def __init__(self, value: str) -> None:
+    __slots__ = ("value",)
+
+    def __init__(self, value: str, line: int = 0, column: int = 0) -> None:
         self.value = str(value)
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f"<StringLiteralNode value={self.value}>"
 
 
 class ArrayLiteralNode(ASTNode):
-    def __init__(self, elements: list[ASTNode]) -> None:
+    __slots__ = ("elements",)
+
+    def __init__(self, elements: list[ASTNode], line: int = 0, column: int = 0) -> None:
         self.elements = elements
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f"<ArrayLiteralNode elements={self.elements}>"
 
 
 class ArrayIndexNode(ASTNode):
-    def __init__(self, array_name: str | ASTNode, index_expr: ASTNode) -> None:
+    __slots__ = ("array_name", "index_expr")
+
+    def __init__(self, array_name: str | ASTNode, index_expr: ASTNode, line: int = 0, column: int = 0) -> None:
         self.array_name = array_name
         self.index_expr = index_expr
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f"<ArrayIndexNode array={self.array_name}, index={self.index_expr}>"
 
 
 class NullLiteralNode(ASTNode):
-    def __init__(self) -> None:
-        pass
+    __slots__ = ()
+
+    def __init__(self, line: int = 0, column: int = 0) -> None:
+        self.line = line
+        self.column = column
     
     def __repr__(self) -> str:
         return "<NullLiteralNode>"
 
 
 class BinaryOpNode(ASTNode):
-    def __init__(self, op: str, left_expr: ASTNode, right_expr: ASTNode) -> None:
+    __slots__ = ("op", "left_expr", "right_expr")
+
+    def __init__(self, op: str, left_expr: ASTNode, right_expr: ASTNode, line: int = 0, column: int = 0) -> None:
         self.op = op
         self.left_expr = left_expr
         self.right_expr = right_expr
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f'<BinaryOpNode op={self.op}, left={self.left_expr}, right={self.right_expr}>'
 
 
 class UnaryOpNode(ASTNode):  # For bitwise NOT, pointer dereference etc.
-    def __init__(self, op: str, expr: ASTNode) -> None:
+    __slots__ = ("op", "expr")
+
+    def __init__(self, op: str, expr: ASTNode, line: int = 0, column: int = 0) -> None:
         self.op = op
         self.expr = expr
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f'<UnaryOpNode op={self.op}, expr={self.expr}>'
 
 
 class FunctionDefNode(ASTNode):
-    def __init__(self, func_name: IdentifierNode, params: list[tuple[str, str]], return_type: str, body: BlockNode) -> None:
+    __slots__ = ("func_name", "params", "return_type", "body", "local_names", "escaping")
+
+    def __init__(self, func_name: IdentifierNode, params: list[tuple[str, str]], return_type: str, body: BlockNode, line: int = 0, column: int = 0) -> None:
         self.func_name = func_name
         self.params = params  # list of (param_name, param_type) tuples
         self.return_type = return_type
         self.body = body
+        self.line = line
+        self.column = column
+        self.local_names: tuple[str, ...] = () # variable in each frame slot (see resolver.py)
+        self.escaping: frozenset[int] = frozenset() # slots whose storage outlives the call
 
     def __repr__(self) -> str:
         return f'<FunctionDefNode name={self.func_name}, params={self.params}, return_type={self.return_type}, body={self.body}>'
 
 
 class FunctionCallNode(ASTNode):
-    def __init__(self, func_name: IdentifierNode, args: list[ASTNode]) -> None:
+    __slots__ = ("func_name", "args")
+
+    def __init__(self, func_name: IdentifierNode, args: list[ASTNode], line: int = 0, column: int = 0) -> None:
         self.func_name = func_name
         self.args = args
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f'<FunctionCallNode name={self.func_name}, args={self.args}>'
@@ -152,7 +255,9 @@ class MethodCallNode(ASTNode):
     """
     Represents a method call on an instance, e.g., `my_vector.push(10)`.
     """
-    def __init__(self, instance_expr: ASTNode, method_name: str, args: list[ASTNode]) -> None:
+    __slots__ = ("instance_expr", "method_name", "args", "cache")
+
+    def __init__(self, instance_expr: ASTNode, method_name: str, args: list[ASTNode], line: int = 0, column: int = 0) -> None:
         """
         Initializes a MethodCallNode.
 
@@ -160,10 +265,15 @@ class MethodCallNode(ASTNode):
                               (e.g., an IdentifierNode for 'my_vector').
         :param method_name: The string name of the method (e.g., 'push').
         :param args: A list of nodes representing the arguments passed to the method.
+        :param line: Source line of the call, for error reporting.
+        :param column: Source column of the call.
         """
         self.instance_expr = instance_expr
         self.method_name = method_name
         self.args = args
+        self.line = line
+        self.column = column
+        self.cache = None # the method last called here, for the type it was called on (see Interpreter.lookup_method)
 
     def __repr__(self) -> str:
         """
@@ -173,188 +283,279 @@ class MethodCallNode(ASTNode):
 
 
 class ReturnNode(ASTNode):
-    def __init__(self, return_expr: ASTNode | None) -> None:
+    __slots__ = ("return_expr",)
+
+    def __init__(self, return_expr: ASTNode | None, line: int = 0, column: int = 0) -> None:
         self.return_expr = return_expr
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f'<ReturnNode expr={self.return_expr}>'
 
 
 class IfStatementNode(ASTNode):
-    def __init__(self, condition: ASTNode, then_block: BlockNode, else_block: BlockNode | None = None, elif_blocks: list[tuple[ASTNode, BlockNode]] | None = None) -> None:
+    __slots__ = ("condition", "then_block", "elif_blocks", "else_block")
+
+    def __init__(self, condition: ASTNode, then_block: BlockNode, else_block: BlockNode | None = None, elif_blocks: list[tuple[ASTNode, BlockNode]] | None = None, line: int = 0, column: int = 0) -> None:
         self.condition = condition
         self.then_block = then_block
         self.elif_blocks = elif_blocks if elif_blocks else []  # list of (condition, block)
         self.else_block = else_block
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f'<IfStatementNode condition={self.condition}, then={self.then_block}, elifs={self.elif_blocks}, else={self.else_block}>'
 
 
 class WhileLoopNode(ASTNode):
-    def __init__(self, condition: ASTNode, loop_block: BlockNode) -> None:
+    __slots__ = ("condition", "loop_block")
+
+    def __init__(self, condition: ASTNode, loop_block: BlockNode, line: int = 0, column: int = 0) -> None:
         self.condition = condition
         self.loop_block = loop_block
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f'<WhileLoopNode condition={self.condition}, body={self.loop_block}>'
 
 
 class ForLoopNode(ASTNode):  # Simple for i = 0; i < 10; i++ style
-    def __init__(self, init_stmt: ASTNode, condition_expr: ASTNode, increment_stmt: ASTNode, loop_block: BlockNode) -> None:
+    __slots__ = ("init_stmt", "condition_expr", "increment_stmt", "loop_block", "owns_storage")
+
+    def __init__(self, init_stmt: ASTNode, condition_expr: ASTNode, increment_stmt: ASTNode, loop_block: BlockNode, line: int = 0, column: int = 0) -> None:
         self.init_stmt = init_stmt
         self.condition_expr = condition_expr
         self.increment_stmt = increment_stmt
         self.loop_block = loop_block
+        self.line = line
+        self.column = column
+        self.owns_storage = False # the loop variable's storage is freed when the loop ends (see resolver.py)
 
     def __repr__(self) -> str:
         return f'<ForLoopNode init={self.init_stmt}, condition={self.condition_expr}, increment={self.increment_stmt}, body={self.loop_block}>'
 
 
 class TypeCastNode(ASTNode):
-    def __init__(self, target_type: str, expression: ASTNode) -> None:
+    __slots__ = ("target_type", "expression")
+
+    def __init__(self, target_type: str, expression: ASTNode, line: int = 0, column: int = 0) -> None:
         self.target_type = target_type
         self.expression = expression
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f'<TypeCastNode type={self.target_type}, expr={self.expression}>'
 
 
 class StructDefNode(ASTNode):
-    def __init__(self, struct_name: str, fields: list[tuple[str, str]], functions: list[FunctionDefNode]) -> None:
+    __slots__ = ("struct_name", "fields", "functions")
+
+    def __init__(self, struct_name: str, fields: list[tuple[str, str]], functions: list[FunctionDefNode], line: int = 0, column: int = 0) -> None:
         self.struct_name = struct_name
         self.fields = fields  # list of (field_name, field_type) tuples
         self.functions = functions
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f'<StructDefNode name={self.struct_name}, fields={self.fields} functions={self.functions}>'
 
 
 class StructInstantiationNode(ASTNode):  # let struct_var : StructName;
-    def __init__(self, var_name: str, struct_type: str) -> None:
+    __slots__ = ("var_name", "struct_type")
+
+    def __init__(self, var_name: str, struct_type: str, line: int = 0, column: int = 0) -> None:
         self.var_name = var_name
         self.struct_type = struct_type
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f'<StructInstantiationNode name={self.var_name}, type={self.struct_type}>'
 
 
 class StructFieldAccessNode(ASTNode):  # struct_var.field
-    def __init__(self, struct_var_name: str | ASTNode, field_name: str) -> None:
+    __slots__ = ("struct_var_name", "field_name", "slot", "member")
+
+    def __init__(self, struct_var_name: str | ASTNode, field_name: str, line: int = 0, column: int = 0) -> None:
         self.struct_var_name = struct_var_name
         self.field_name = field_name
+        self.line = line
+        self.column = column
+        self.slot = -1 # frame slot of the variable, or -1 for a global (see resolver.py)
+        self.member = None # the enums.EnumMember `Enum.member` is, when the resolver can tell
 
     def __repr__(self) -> str:
         return f'<StructFieldAccessNode struct={self.struct_var_name}, field={self.field_name}>'
 
 
 class EnumDefNode(ASTNode):
-    def __init__(self, enum_name: str, members: list[str]) -> None:
+    __slots__ = ("enum_name", "members")
+
+    def __init__(self, enum_name: str, members: list[str], line: int = 0, column: int = 0) -> None:
         self.enum_name = enum_name
         self.members: list[str] = members  # list of enum member names
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f'<EnumDefNode name={self.enum_name}, members={self.members}>'
 
 
 class EnumMemberNode(ASTNode):  # For referencing enum members like ErrorCode.DivisionByZero
-    def __init__(self, enum_name: str, member_name: str) -> None:
+    __slots__ = ("enum_name", "member_name")
+
+    def __init__(self, enum_name: str, member_name: str, line: int = 0, column: int = 0) -> None:
         self.enum_name = enum_name
         self.member_name = member_name
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f'<EnumMemberNode enum={self.enum_name}, member={self.member_name}>'
 
 
 class ResultTypeNode(ASTNode):  # Result<int32, ErrorCode> - represent the type
-    def __init__(self, ok_type: str, err_type: str) -> None:
+    __slots__ = ("ok_type", "err_type")
+
+    def __init__(self, ok_type: str, err_type: str, line: int = 0, column: int = 0) -> None:
         self.ok_type = ok_type
         self.err_type = err_type
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f'<ResultTypeNode ok_type={self.ok_type}, err_type={self.err_type}>'
 
 
 class OkResultNode(ASTNode):  # Ok(value)
-    def __init__(self, value_expr: ASTNode) -> None:
+    __slots__ = ("value_expr",)
+
+    def __init__(self, value_expr: ASTNode, line: int = 0, column: int = 0) -> None:
         self.value_expr = value_expr
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f'<OkResultNode value={self.value_expr}>'
 
 
 class ErrResultNode(ASTNode):  # Err(ErrorCode.DivisionByZero)
-    def __init__(self, error_expr: ASTNode) -> None:
+    __slots__ = ("error_expr",)
+
+    def __init__(self, error_expr: ASTNode, line: int = 0, column: int = 0) -> None:
         self.error_expr = error_expr
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f'<ErrResultNode error={self.error_expr}>'
 
 
 class LetMemoryNode(ASTNode):  # let var : int32 = 128;
-    def __init__(self, var_name: str, data_type: str, value_expr: ASTNode | None = None) -> None:
+    __slots__ = ("var_name", "data_type", "value_expr", "slot", "owned")
+
+    def __init__(self, var_name: str, data_type: str, value_expr: ASTNode | None = None, line: int = 0, column: int = 0) -> None:
         self.var_name = var_name
         self.data_type = data_type
         self.value_expr = value_expr
+        self.line = line
+        self.column = column
+        self.slot = -1 # frame slot of the variable, or -1 for a global (see resolver.py)
+        self.owned = False # its storage is freed when its scope ends
 
     def __repr__(self) -> str:
         return f'<LetMemoryNode name={self.var_name}, type={self.data_type}, value={self.value_expr}>'
 
 
 class FreeMemoryNode(ASTNode):  # free var;
-    def __init__(self, var_name: str) -> None:
+    __slots__ = ("var_name", "slot")
+
+    def __init__(self, var_name: str, line: int = 0, column: int = 0) -> None:
         self.var_name = var_name
+        self.line = line
+        self.column = column
+        self.slot = -1 # frame slot of the variable, or -1 for a global (see resolver.py)
 
     def __repr__(self) -> str:
         return f'<FreeMemoryNode name={self.var_name}>'
 
 
 class PointerRefNode(ASTNode):  # &var
-    def __init__(self, var_name: str | ASTNode) -> None:
+    __slots__ = ("var_name",)
+
+    def __init__(self, var_name: str | ASTNode, line: int = 0, column: int = 0) -> None:
         self.var_name = var_name
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f'<PointerRefNode var={self.var_name}>'
 
 
 class PointerDerefNode(ASTNode):  # *ptr
-    def __init__(self, pointer_expr: ASTNode) -> None:
+    __slots__ = ("pointer_expr",)
+
+    def __init__(self, pointer_expr: ASTNode, line: int = 0, column: int = 0) -> None:
         self.pointer_expr = pointer_expr
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f'<PointerDerefNode pointer={self.pointer_expr}>'
 
 
 class PrintStatementNode(ASTNode):  # print(expr1, expr2, ...)
-    def __init__(self, expressions: list[ASTNode]) -> None:
+    __slots__ = ("expressions",)
+
+    def __init__(self, expressions: list[ASTNode], line: int = 0, column: int = 0) -> None:
         self.expressions = expressions
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f'<PrintStatementNode expressions={self.expressions}>'
 
 
 class SpawnTaskNode(ASTNode):  # spawn task fetchData(...) { ... }
-    def __init__(self, task_name: str, params: list[tuple[str, str]], body: BlockNode) -> None:
+    __slots__ = ("task_name", "params", "body")
+
+    def __init__(self, task_name: str, params: list[tuple[str, str]], body: BlockNode, line: int = 0, column: int = 0) -> None:
         self.task_name = task_name
         self.params = params
         self.body = body
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f'<SpawnTaskNode name={self.task_name}, params={self.params}, body={self.body}>'
 
 
 class ImportNode(ASTNode):
-    def __init__(self, module_name: str) -> None:
+    __slots__ = ("module_name",)
+
+    def __init__(self, module_name: str, line: int = 0, column: int = 0) -> None:
         self.module_name = module_name
+        self.line = line
+        self.column = column
 
     def __repr__(self) -> str:
         return f'<ImportNode name={self.module_name}>'
 
 
 class TryNode(ASTNode):
-    def __init__(self, try_block: BlockNode, catch_block: BlockNode | None) -> None:
+    __slots__ = ("try_block", "catch_block", "slot")
+
+    def __init__(self, try_block: BlockNode, catch_block: BlockNode | None, line: int = 0, column: int = 0) -> None:
         self.try_block = try_block
         self.catch_block = catch_block
+        self.line = line
+        self.column = column
+        self.slot = -1 # frame slot of the caught error `e`, or -1 for a global (see resolver.py)
 
     def __repr__(self) -> str:
         return f'<TryNode try={self.try_block}, catch={self.catch_block}>'
\ No newline at end of file
@@ -0,0 +1,103 @@
+from typing import Any
+
+
+class Heap:
+    """Address allocator for the interpreter's simulated heap of `size` bytes.
+
+    Fresh blocks are carved off the top of the used region. Freed blocks are merged with any free
+    neighbours, and kept in free lists by size class (class k holds blocks of 2**k up to
+    2**(k + 1) - 1 bytes), from which later allocations are served before the heap grows: the
+    smallest class that fits, most recently freed first, splitting off what isn't needed. A free
+    block that reaches the top is given back to it. Running out of room is a "segmentation fault",
+    as writing past the end of `CappedMemoryDict` is."""
+    __slots__ = ("size", "top", "live", "live_bytes", "free", "free_ends", "free_bytes", "bins",
+                 "allocations", "reused")
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.top = 0 # everything from here up is untouched
+        self.live: dict[int, int] = {} # {address: size} of allocated blocks
+        self.live_bytes = 0
+        self.free: dict[int, int] = {} # {address: size} of free blocks below the top
+        self.free_ends: dict[int, int] = {} # {end address: address} of the same blocks, for merging
+        self.free_bytes = 0
+        # Free block addresses per size class. Entries go stale when their block is merged or
+        # reused; they're dropped when they come up.
+        self.bins: list[list[int]] = [[] for _ in range(max(size, 1).bit_length())]
+        self.allocations = 0
+        self.reused = 0
+
+    def allocate(self, size: int) -> int:
+        self.allocations += 1
+        if self.free and (address := self._reuse(size)) >= 0:
+            self.reused += 1
+        else:
+            address = self.top
+            if address + size > self.size:
+                raise Exception("segmentation fault")
+            self.top = address + size
+        self.live[address] = size
+        self.live_bytes += size
+        return address
+
+    def _reuse(self, size: int) -> int:
+        bins = self.bins
+        for size_class in range((size - 1).bit_length(), len(bins)): # every block in these classes fits
+            free_list = bins[size_class]
+            while free_list:
+                address = free_list.pop()
+                block_size = self.free.get(address)
+                if block_size is None or block_size.bit_length() - 1 != size_class:
+                    continue # stale entry
+                del self.free[address]
+                del self.free_ends[address + block_size]
+                self.free_bytes -= block_size
+                if block_size > size:
+                    self._add_free(address + size, block_size - size)
+                return address
+        return -1
+
+    def release(self, address: int) -> bool:
+        """Frees the block at `address`; False if no block was allocated there."""
+        size = self.live.pop(address, None)
+        if size is None:
+            return False
+        self.live_bytes -= size
+        if address + size == self.top and not self.free: # the usual case: scopes end newest first
+            self.top = address
+            return True
+        if (left := self.free_ends.pop(address, None)) is not None: # merge with the free block below
+            left_size = self.free.pop(left)
+            self.free_bytes -= left_size
+            address, size = left, size + left_size
+        if (right_size := self.free.pop(address + size, None)) is not None: # and the one above
+            del self.free_ends[address + size + right_size]
+            self.free_bytes -= right_size
+            size += right_size
+        if address + size == self.top:
+            self.top = address
+        else:
+            self._add_free(address, size)
+        return True
+
+    def _add_free(self, address: int, size: int):
+        self.free[address] = size
+        self.free_ends[address + size] = address
+        self.free_bytes += size
+        self.bins[size.bit_length() - 1].append(address)
+
+    def stats(self) -> dict[str, Any]:
+        # Fragmentation: the share of free memory below the top that can't be handed out as one block
+        largest_free = max(self.free.values(), default=0)
+        return {
+            "live": self.live_bytes,
+            "free": self.free_bytes,
+            "top": self.top,
+            "size": self.size,
+            "blocks": len(self.live),
+            "free_blocks": len(self.free),
+            "largest_free": largest_free,
+            "fragmentation": 1 - largest_free / self.free_bytes if self.free_bytes else 0.0,
+            "allocations": self.allocations,
+            "reused": self.reused,
+        }
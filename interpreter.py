@@ -1,5 +1,7 @@
+import operator
 from pathlib import Path
-from typing import Any, cast
+from struct import Struct, error as struct_error
+from typing import Any, Callable, cast
 
 from grvast import EnumMemberNode, ErrResultNode, OkResultNode, StructFieldAccessNode, TypeCastNode, FunctionCallNode, \
     IdentifierNode, UnaryOpNode, BinaryOpNode, NullLiteralNode, StringLiteralNode, CharLiteralNode, FloatLiteralNode, \
@@ -7,22 +9,65 @@ from grvast import EnumMemberNode, ErrResultNode, OkResultNode, StructFieldAcces
     VarDeclarationNode, EnumDefNode, StructDefNode, ForLoopNode, WhileLoopNode, IfStatementNode, FunctionDefNode, \
     FreeMemoryNode, LetMemoryNode, BlockNode, ProgramNode, ImportNode, TryNode, ArrayLiteralNode, ArrayIndexNode, \
     MethodCallNode
-from lexing import TokenType, tokenize
-from parser import Parser
-from stdlib import Stdlib
+from arrays import TypedArray, equals, not_equals, own_array
+from enums import EnumMember, enum_members
+from heap import Heap
+from lexing import TokenType
+from modcache import load_module
+from resolver import resolve
+from stdlib import IN_PLACE_BUILTINS, Stdlib
+from structs import FieldCell, GravoxStruct, struct_class, struct_fields
+from typedesc import SCALAR_TYPES, TYPE_SIZES, TypeDescriptor, builtin_type, same, no_default, unknown_type
 
 
 def get_type_size(data_type): # Placeholder - needs proper size mapping.
-    if data_type in ["int8", "uint8", "char"]: return 1
-    elif data_type in ["int16", "uint16"]: return 2
-    elif data_type in ["int32", "uint32", "float32"]: return 4
-    elif data_type in ["int64", "uint64", "float64"]: return 8
-    return 4 # Default size if type not recognized
+    return TYPE_SIZES.get(data_type, 4) # Default size if type not recognized
+
+
+# Operator token -> implementation, for BinaryOpNode/UnaryOpNode
+BINARY_OPERATIONS: dict[TokenType, Callable[[Any, Any], Any]] = {
+    TokenType.PLUS: operator.add,
+    TokenType.MINUS: operator.sub,
+    TokenType.MULTIPLY: operator.mul,
+    TokenType.DIVIDE: operator.truediv,
+    TokenType.MODULO: operator.mod,
+    TokenType.EQUAL: equals, # elementwise for typed arrays
+    TokenType.NOT_EQUAL: not_equals,
+    TokenType.GREATER_THAN: operator.gt,
+    TokenType.LESS_THAN: operator.lt,
+    TokenType.GREATER_EQUAL: operator.ge,
+    TokenType.LESS_EQUAL: operator.le,
+    TokenType.AND: operator.and_, # Bitwise AND
+    TokenType.OR: operator.or_, # Bitwise OR
+    TokenType.XOR: operator.xor, # Bitwise XOR
+    TokenType.LSHIFT: operator.lshift, # Left Shift
+    TokenType.RSHIFT: operator.rshift, # Right Shift
+}
+ZERO_DIVISION_ERRORS = {TokenType.DIVIDE: "Division by zero", TokenType.MODULO: "Modulo by zero"}
+UNARY_OPERATIONS: dict[TokenType, Callable[[Any], Any]] = {
+    TokenType.MINUS: operator.neg,
+    TokenType.BIT_NOT: operator.invert, # Bitwise NOT
+}
 
 
 def execute_return(node):
     return node # Simply return the ReturnNode itself, function call execution will handle it.
 
+class VarCell:
+    """A variable: its declared type, its value and its heap address. Frames and the symbol table
+    hold cells, and `memory` maps each address to the cell that owns it, so an assignment updates
+    the value seen through a pointer too."""
+    __slots__ = ("type", "value", "address")
+
+    def __init__(self, type: str, value: Any, address: int) -> None:
+        self.type = type
+        self.value = value
+        self.address = address
+
+    def __repr__(self) -> str:
+        return f"VarCell({self.type!r}, {self.value!r}, {self.address})"
+
+
 class CappedMemoryDict[K, V](dict):
     def __init__(self, max_items: int, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -32,33 +77,271 @@ class CappedMemoryDict[K, V](dict):
             raise Exception(f"segmentation fault")
         super().__setitem__(key, value)
 
+    cell = VarCell # memory.cell(type, value, address) makes a variable; here its value lives in the cell
+
+    def load(self, type: str, address: int) -> Any:
+        if address not in self:
+            raise Exception(f"Invalid memory access at address {address}")
+        return self[address].value
+
+    def store(self, type: str, address: int, value: Any):
+        if address not in self:
+            raise Exception(f"Invalid memory access at address {address}")
+        self[address].value = value
+
+    def copy(self, destination: int, source: int, size: int):
+        # Value by value, for each variable in the source range with one at the same offset in the destination
+        for address in [address for address in self if source <= address < source + size]:
+            if (target := self.get(destination + address - source)) is not None:
+                target.value = self[address].value
+
+
+class MethodCache:
+    # A call site's inline cache (see Interpreter.lookup_method). Not a tuple, so that walking the
+    # AST doesn't go into the cached method.
+    __slots__ = ("version", "instance_type", "method_def")
+
+    def __init__(self, version: object, instance_type: str, method_def: FunctionDefNode) -> None:
+        self.version = version
+        self.instance_type = instance_type
+        self.method_def = method_def
+
+
+# Byte layout of the scalar types in ByteMemory, and the Python type their values have
+SCALAR_FORMATS: dict[str, tuple[Struct, type]] = {
+    "int8": (Struct("<b"), int), "uint8": (Struct("<B"), int),
+    "int16": (Struct("<h"), int), "uint16": (Struct("<H"), int),
+    "int32": (Struct("<i"), int), "uint32": (Struct("<I"), int),
+    "int64": (Struct("<q"), int), "uint64": (Struct("<Q"), int),
+    "float32": (Struct("<f"), float), "float64": (Struct("<d"), float),
+}
+
+
+class ByteMemory(dict):
+    """The `--memory=bytes` model: `size` bytes of real memory. Like CappedMemoryDict it maps each
+    address to the cell stored there, but the cells are `MemoryCell`s whose int8...uint64 and
+    float32/float64 values are encoded at their address in one preallocated bytearray. Anything
+    else - strings, arrays, struct instances, chars, unset variables and numbers that their type
+    can't hold exactly - is kept in the `objects` side table under its address, so a variable
+    reads back what was stored in it, as with CappedMemoryDict. `load`/`store` read and write any
+    address, and `copy` moves a range of bytes without building Python objects."""
+
+    def __init__(self, size: int) -> None:
+        super().__init__()
+        self.size = size
+        self.data = bytearray(size)
+        self.view = memoryview(self.data)
+        self.objects: dict[int, Any] = {} # {address: value} of values that aren't plain scalars
+
+    def cell(self, type: str, value: Any, address: int) -> "VarCell":
+        return MemoryCell(type, value, address, self)
+
+    def load(self, type: str, address: int) -> Any:
+        objects = self.objects
+        if address in objects:
+            return objects[address]
+        if (scalar := SCALAR_FORMATS.get(type)) is None:
+            raise Exception(f"Cannot load a '{type}' from address {address}")
+        if address < 0: # struct would count it back from the end of the memory
+            raise Exception("segmentation fault")
+        try:
+            return scalar[0].unpack_from(self.data, address)[0]
+        except struct_error:
+            raise Exception("segmentation fault")
+
+    def store(self, type: str, address: int, value: Any):
+        if address < 0:
+            raise Exception("segmentation fault")
+        scalar = SCALAR_FORMATS.get(type)
+        if scalar is not None and value.__class__ is scalar[1]:
+            layout = scalar[0]
+            try:
+                layout.pack_into(self.data, address, value)
+            except struct_error: # out of range for the type (or for the memory)
+                if address + layout.size > self.size:
+                    raise Exception("segmentation fault")
+            else:
+                if type != "float32" or layout.unpack_from(self.data, address)[0] == value:
+                    if self.objects:
+                        self.objects.pop(address, None)
+                    return
+        self.objects[address] = value
+
+    def copy(self, destination: int, source: int, size: int):
+        if min(destination, source) < 0 or max(destination, source) + size > self.size:
+            raise Exception("segmentation fault")
+        self.view[destination:destination + size] = self.view[source:source + size]
+        objects = self.objects
+        if objects: # the side table entries move with the bytes
+            moved = {destination + address - source: value for address, value in objects.items()
+                     if source <= address < source + size}
+            for address in [address for address in objects if destination <= address < destination + size]:
+                del objects[address]
+            objects.update(moved)
+
+    def __delitem__(self, address: int):
+        super().__delitem__(address)
+        self.objects.pop(address, None)
+
+    def pop(self, address: int, *default):
+        self.objects.pop(address, None)
+        return super().pop(address, *default)
+
+
+class MemoryCell(VarCell):
+    """A variable whose value is stored in a ByteMemory rather than in the cell."""
+    __slots__ = ("memory", "layout")
+
+    def __init__(self, type: str, value: Any, address: int, memory: ByteMemory) -> None:
+        self.memory = memory
+        self.layout = SCALAR_FORMATS[type][0] if type in SCALAR_FORMATS else None
+        self.type = type
+        self.address = address
+        self.value = value # stored at the address
+
+    @property
+    def value(self) -> Any:
+        # ByteMemory.load, with the layout looked up once
+        objects = self.memory.objects
+        if (address := self.address) in objects:
+            return objects[address]
+        if address < 0:
+            raise Exception("segmentation fault")
+        return self.layout.unpack_from(self.memory.data, address)[0]
+
+    @value.setter
+    def value(self, value: Any):
+        self.memory.store(self.type, self.address, value)
+
+
+# --memory=<name>: how variables' values are stored
+MEMORY_MODELS = {"dict": CappedMemoryDict, "bytes": ByteMemory}
+
+
+class Frame:
+    """Locals of a running function call (or of the module's top-level blocks), one per slot the
+    resolver gave the function."""
+    __slots__ = ("function", "slots")
+
+    def __init__(self, function: FunctionDefNode | ProgramNode) -> None:
+        self.function = function
+        self.slots: list[VarCell | None] = [None] * len(function.local_names) # None until the `let` runs
+
+
 class Interpreter:
-    def __init__(self, heap_size=1024):
-        self.symbol_table: dict[str, Any] = {} # {var_name: (data_type, value, memory_address)} - for variables
+    def __init__(self, heap_size=1024, memory_model="dict"):
+        self.symbol_table: dict[str, VarCell] = {} # global variables
+        self.frame: Frame | None = None # locals of the function call (or module) that's running
         self.function_table: dict[str, FunctionDefNode] = {} # {func_name: FunctionDefNode} - for functions
         self.struct_definitions: dict[str, StructDefNode] = {
             # "Result": StructDefNode("Result", [("success", "bool"), ("value", "any")], []),
         } # {struct_name: StructDefNode}
+        self.struct_classes: dict[str, type[GravoxStruct]] = {} # {struct_name: class its instances are made from}
         self.enum_definitions: dict[str, EnumDefNode] = {} # {enum_name: EnumDefNode}
-        self.memory: CappedMemoryDict[int, Any] = CappedMemoryDict(heap_size) # {memory_address: value} - simulate memory
-        self.next_memory_address = 0
+        self.enum_members: dict[str, dict[str, EnumMember]] = {} # {enum_name: {member name: EnumMember}}
+        # {type name: TypeDescriptor} of the types cast to so far; cleared when a struct or enum is defined
+        self.type_descriptors: dict[str, TypeDescriptor] = {}
+        # Identifies the methods defined so far; replaced when a struct is defined or a module
+        # imported, which invalidates the method caches on call sites (see lookup_method)
+        self.methods_version = object()
+        self.memory_model = memory_model
+        self.memory: CappedMemoryDict[int, Any] | ByteMemory = MEMORY_MODELS[memory_model](heap_size) # {memory_address: cell} - simulate memory
+        self.heap = Heap(heap_size) # which addresses are in use (see heap.py)
+        self.owned: list[int] = [] # addresses owned by the running calls and blocks, newest last
         self.resolving_context = "normal" # figure this shit out yourself
         self.heap_size = heap_size
         self.stdlib = Stdlib(self)
         self.last_updated_index = 0
         self.last_node = None
-
-    def letate_memory(self, data_type): # Simple memory letation
-        address = self.next_memory_address
-        size = get_type_size(data_type) # Placeholder for size calculation
-        self.next_memory_address += size # Increment for next letation. In real scenario, more sophisticated approach
+        # Dispatch tables keyed by exact node class. Statements not listed here are evaluated as
+        # expressions; expressions not listed evaluate to None.
+        self.statement_handlers: dict[type, Callable[[Any], Any]] = {
+            ProgramNode: self.execute_block,
+            BlockNode: self.execute_block,
+            LetMemoryNode: self.execute_let_memory,
+            FreeMemoryNode: self.execute_free_memory,
+            VarAssignNode: self.execute_variable_assignment,
+            FunctionDefNode: self.execute_function_def,
+            FunctionCallNode: self.execute_function_call,
+            ReturnNode: execute_return,
+            IfStatementNode: self.execute_if_statement,
+            WhileLoopNode: self.execute_while_loop,
+            ForLoopNode: self.execute_for_loop,
+            StructDefNode: self.execute_struct_def,
+            EnumDefNode: self.execute_enum_def,
+            VarDeclarationNode: self.execute_variable_declaration, # Deprecated - use LetMemoryNode
+            PrintStatementNode: self.execute_print_statement,
+            StructInstantiationNode: self.execute_struct_instantiation,
+            SpawnTaskNode: self.execute_spawn_task,
+            ImportNode: self.execute_import,
+            TryNode: self.execute_try,
+        }
+        self.expression_handlers: dict[type, Callable[[Any], Any]] = {
+            IntLiteralNode: self.evaluate_literal,
+            FloatLiteralNode: self.evaluate_literal,
+            CharLiteralNode: self.evaluate_literal,
+            StringLiteralNode: self.evaluate_literal,
+            NullLiteralNode: self.evaluate_null,
+            ArrayLiteralNode: self.evaluate_array_literal,
+            IdentifierNode: self.evaluate_identifier,
+            BinaryOpNode: self.evaluate_binary_op,
+            UnaryOpNode: self.evaluate_unary_op,
+            FunctionCallNode: self.execute_function_call,
+            TypeCastNode: self.evaluate_type_cast,
+            StructFieldAccessNode: self.evaluate_struct_field_access,
+            ArrayIndexNode: self.evaluate_array_index,
+            OkResultNode: self.evaluate_ok_result,
+            ErrResultNode: self.evaluate_err_result,
+            EnumMemberNode: self.evaluate_enum_member,
+            MethodCallNode: self.evaluate_method_call,
+        }
+
+    def letate_memory(self, data_type):
+        return self.heap.allocate(TYPE_SIZES.get(data_type, 4)) # inlined get_type_size
+
+    def free_memory(self, address): # The address can be handed out again by letate_memory
+        self.heap.release(address)
+        self.memory.pop(address, None)
+
+    def own_memory(self, data_type):
+        # letate_memory for a variable whose storage is freed with its scope (see release_storage)
+        address = self.heap.allocate(TYPE_SIZES.get(data_type, 4))
+        self.owned.append(address)
         return address
 
-    def free_memory(self, address): # Simple free - for now just remove from memory dict if needed. More complex in real
-        if address in self.memory:
-            del self.memory[address]
+    def release_storage(self, mark):
+        # Frees the storage owned by the calls and blocks that have ended: everything owned since
+        # `mark` (the length of `owned` when they started), newest first
+        owned, release, memory = self.owned, self.heap.release, self.memory
+        while len(owned) > mark: # inlined free_memory
+            address = owned.pop()
+            release(address)
+            memory.pop(address, None)
+
+    def lookup_variable(self, var_name, slot=-1):
+        # A local lives in the running call's frame; any other name (or a local whose `let` hasn't
+        # run yet) is a global
+        if slot >= 0:
+            entry = self.frame.slots[slot]
+            if entry is not None:
+                return entry
+        return self.symbol_table.get(var_name)
+
+    def bind_variable(self, var_name, slot, entry):
+        if slot >= 0:
+            self.frame.slots[slot] = entry
+        else:
+            self.symbol_table[var_name] = entry
+
+    def unbind_variable(self, var_name, slot):
+        if slot >= 0 and self.frame.slots[slot] is not None:
+            self.frame.slots[slot] = None
+        else:
+            del self.symbol_table[var_name]
 
     def interpret(self, program_node):
+        resolve(program_node)
+        self.frame = Frame(program_node)
         for statement in program_node.statements:
             self.execute_statement(statement)
         return None # Or return something meaningful at the end
@@ -66,55 +349,52 @@ class Interpreter:
     def execute_statement(self, node):
         self.last_updated_index += 1
         self.last_node = node
-        if isinstance(node, ProgramNode) or isinstance(node, BlockNode):
-            for statement in node.statements:
-                self.execute_statement(statement)
-        elif isinstance(node, LetMemoryNode):
-            self.execute_let_memory(node)
-        elif isinstance(node, FreeMemoryNode):
-            self.execute_free_memory(node)
-        elif isinstance(node, VarAssignNode):
-            self.execute_variable_assignment(node)
-        elif isinstance(node, FunctionDefNode):
-            self.function_table[str(node.func_name)] = node
-        elif isinstance(node, FunctionCallNode):
-            return self.execute_function_call(node)
-        elif isinstance(node, ReturnNode):
-            return execute_return(node)
-        elif isinstance(node, IfStatementNode):
-            self.execute_if_statement(node)
-        elif isinstance(node, WhileLoopNode):
-            self.execute_while_loop(node)
-        elif isinstance(node, ForLoopNode):
-            self.execute_for_loop(node)
-        elif isinstance(node, StructDefNode):
-            self.struct_definitions[node.struct_name] = node
-            for function in node.functions:
-                self.function_table[node.struct_name + "::" + str(function.func_name)] = function
-        elif isinstance(node, EnumDefNode):
-            self.enum_definitions[node.enum_name] = node
-        elif isinstance(node, VarDeclarationNode): # Deprecated - use LetMemoryNode
-            self.execute_variable_declaration(node)
-        elif isinstance(node, PrintStatementNode):
-            self.execute_print_statement(node)
-        elif isinstance(node, StructInstantiationNode): # Not directly executable, handled by LetMemoryNode if struct type
-            pass # Handled in execute_let_memory when type is struct
-        elif isinstance(node, VarAssignNode): # already handled above, check again
-            self.execute_variable_assignment(node)
-        elif isinstance(node, SpawnTaskNode):
-            self.execute_spawn_task(node)
-        elif isinstance(node, ImportNode):
-            self.execute_import(node)
-        elif isinstance(node, TryNode):
+        handler = self.statement_handlers.get(type(node))
+        if handler:
+            return handler(node)
+        self.evaluate_expression(node) # For expression statements (e.g., function call returning value and ignoring it for now)
+
+    def execute_block(self, node):
+        if node.owns_storage:
+            mark = len(self.owned)
             try:
-                # print("trying")
-                self.execute_statement(node.try_block)
-            except Exception as e:
-                # print("caught")
-                self.symbol_table["e"] = {"type": "any", "value": e, "address": self.next_memory_address}
-                self.execute_statement(node.catch_block)
+                for statement in node.statements:
+                    self.execute_statement(statement)
+            finally:
+                self.release_storage(mark) # also when unwinding to a `try`
         else:
-            self.evaluate_expression(node) # For expression statements (e.g., function call returning value and ignoring it for now)
+            for statement in node.statements:
+                self.execute_statement(statement)
+
+    def execute_function_def(self, node):
+        self.function_table[str(node.func_name)] = node
+
+    def execute_struct_def(self, node):
+        self.struct_definitions[node.struct_name] = node
+        self.struct_classes[node.struct_name] = struct_class(node)
+        self.type_descriptors.clear()
+        self.methods_version = object()
+        for function in node.functions:
+            self.function_table[node.struct_name + "::" + str(function.func_name)] = function
+
+    def execute_enum_def(self, node):
+        self.enum_definitions[node.enum_name] = node
+        self.enum_members[node.enum_name] = enum_members(node)
+        self.type_descriptors.clear()
+
+    def execute_struct_instantiation(self, node): # Not directly executable, handled by LetMemoryNode if struct type
+        pass # Handled in execute_let_memory when type is struct
+
+    def execute_try(self, node):
+        mark = len(self.owned)
+        try:
+            # print("trying")
+            self.execute_statement(node.try_block)
+        except Exception as e:
+            # print("caught")
+            self.release_storage(mark) # what the failed blocks owned, whichever engine ran them
+            self.bind_variable("e", node.slot, VarCell("any", e, self.heap.top))
+            self.execute_statement(node.catch_block)
 
     def execute_import(self, node: ImportNode):
         if node.module_name.endswith('_py'):
@@ -123,58 +403,68 @@ class Interpreter:
         path = Path(node.module_name + ".grv")
         if not path.exists():
             raise Exception(f"Module '{node.module_name}' not found")
-        with open(path, 'r') as f:
-            source_code = f.read()
-        parser = Parser(tokenize(source_code))
-        program_node = parser.parse_program()
+        program_node = load_module(path)
         # print("Imported AST Tree (Debug):")
         # print(program_node)
-        interpreter = Interpreter(self.heap_size)
-        interpreter.next_memory_address = self.next_memory_address
+        interpreter = type(self)(self.heap_size, self.memory_model) # imported modules run on the same engine
+        interpreter.heap, interpreter.memory = self.heap, self.memory # ... in the same memory
         interpreter.interpret(program_node)
         self.function_table.update(interpreter.function_table)
         self.symbol_table.update(interpreter.symbol_table)
         self.struct_definitions.update(interpreter.struct_definitions)
+        self.struct_classes.update(interpreter.struct_classes)
         self.enum_definitions.update(interpreter.enum_definitions)
-        self.memory.update(interpreter.memory)
-        self.next_memory_address = interpreter.next_memory_address
+        self.enum_members.update(interpreter.enum_members)
+        self.type_descriptors.clear()
+        self.methods_version = object()
 
     def _execute_callable(self, func_def: FunctionDefNode, args, self_instance=None):
         if len(args) != len(func_def.params):
             raise Exception(f"Incorrect number of arguments for function '{func_def.func_name}'. Expected {len(func_def.params)}, got {len(args)}")
 
-        # Create a new scope for the function/method call
-        prev_symbol_table = self.symbol_table
-        self.symbol_table = self.symbol_table.copy()
-
-        # If it's a method call, inject 'self' into the scope
+        # A new frame for the function/method call: sized by its locals, not by the globals
+        frame = Frame(func_def)
+        slots = frame.slots
+        slot = 0
+        # If it's a method call, 'self' is the first local
         if self_instance:
-            self.symbol_table['self'] = self_instance
+            slots[0] = self_instance
+            slot = 1
+        # Bind arguments to parameters. Their storage, and that of the locals, is the call's.
+        mark = len(self.owned)
+        escaping = func_def.escaping
+        new_cell = self.memory.cell
+        for (param_name, param_type), arg in zip(func_def.params, args):
+            typed_arg_value = self.cast_value_to_type(arg, param_type)
+            address = self.letate_memory(param_type) if slot in escaping else self.own_memory(param_type)
+            slots[slot] = new_cell(param_type, typed_arg_value, address)
+            slot += 1
+
+        prev_frame = self.frame
+        self.frame = frame
+        try:
+            return_value = self._run_function_body(func_def)
+        finally:
+            self.frame = prev_frame # also when unwinding to a `try` in a caller
+            self.release_storage(mark)
 
-        # Bind arguments to parameters in the new scope
-        for i, param in enumerate(func_def.params):
-            param_name, param_type = param
-            typed_arg_value = self.cast_value_to_type(args[i], param_type)
-            self.symbol_table[param_name] = {"type": param_type, "value": typed_arg_value, "address": self.letate_memory(param_type)}
+        return self.cast_value_to_type(return_value, func_def.return_type) if return_value is not None else None
 
-        # Execute the body
-        return_value = None
+    def _run_function_body(self, func_def: FunctionDefNode):
         for statement in func_def.body.statements:
             result = self.execute_statement(statement)
             if isinstance(result, ReturnNode):
-                return_value = self.evaluate_expression(result.return_expr)
-                break
-
-        # Restore the previous scope
-        self.symbol_table = prev_symbol_table
-
-        return self.cast_value_to_type(return_value, func_def.return_type) if return_value is not None else None
+                return self.evaluate_expression(result.return_expr)
+        return None
 
     def execute_function_call(self, node: FunctionCallNode):
         func_name = node.func_name.name # Assuming func_name is now an IdentifierNode
         # if isinstance(node.func_name, IdentifierNode):
         #     func_name = cast(IdentifierNode, node.func_name).name
-        args = [self.evaluate_expression(arg) for arg in node.args]
+        if func_name in IN_PLACE_BUILTINS and node.args:
+            args = [self.evaluate_in_place_argument(node.args[0]), *map(self.evaluate_expression, node.args[1:])]
+        else:
+            args = [self.evaluate_expression(arg) for arg in node.args]
 
         # print(f"fnc: {func_name}({args})")
 
@@ -188,32 +478,48 @@ class Interpreter:
         func_def = self.function_table[func_name]
         return self._execute_callable(func_def, args)
 
+    def evaluate_in_place_argument(self, node):
+        # The array a builtin in IN_PLACE_BUILTINS changes, taken out of the variable, pointer or
+        # struct field `node` names, which keeps its own copy if the array was shared (see own_array)
+        if isinstance(node, IdentifierNode):
+            if (cell := self.lookup_variable(node.name, node.slot)) is not None:
+                return own_array(cell)
+        elif isinstance(node, UnaryOpNode) and node.op == TokenType.POINTER_DEREF:
+            address = self.evaluate_expression(node.expr)
+            if not isinstance(address, int):
+                raise Exception("Pointer dereference expects a memory address (integer)")
+            if address not in self.memory:
+                raise Exception(f"Invalid memory access at address {address}")
+            return own_array(self.memory[address])
+        elif isinstance(node, StructFieldAccessNode) and isinstance(node.struct_var_name, str):
+            cell = self.lookup_variable(node.struct_var_name, node.slot)
+            if cell is not None and cell.type in self.struct_definitions \
+                    and isinstance(cell.value, (GravoxStruct, dict)) and node.field_name in cell.value:
+                return own_array(FieldCell(cell.value, node.field_name))
+        return self.evaluate_expression(node)
+
     def execute_let_memory(self, node):
         var_name = node.var_name
         data_type = node.data_type
-        memory_address = self.letate_memory(data_type)
+        memory_address = self.own_memory(data_type) if node.owned else self.letate_memory(data_type)
 
         if data_type in self.struct_definitions: # Struct letation
-            struct_def = self.struct_definitions[data_type]
-            struct_instance = {}
-            for field_name, field_type in struct_def.fields:
-                struct_instance[field_name] = self.get_default_value_for_type(field_type) # Initialize fields to None or default value
-            initial_value = struct_instance
+            initial_value = self.new_struct(data_type)
         elif node.value_expr:
             initial_value = self.evaluate_expression(node.value_expr)
             initial_value = self.cast_value_to_type(initial_value, data_type) # Type casting on initialization
         else:
             initial_value = self.get_default_value_for_type(data_type) # Default if no initializer
 
-        self.symbol_table[var_name] = {"type": data_type, "address": memory_address, "value": initial_value, "data_type": data_type}
-        self.memory[memory_address] = initial_value # Store in memory
+        cell = self.memory.cell(data_type, initial_value, memory_address)
+        self.bind_variable(var_name, node.slot, cell)
+        self.memory[memory_address] = cell # Store in memory
 
     def execute_free_memory(self, node):
         var_name = node.var_name
-        if var_name in self.symbol_table:
-            memory_address = self.symbol_table[var_name]["address"]
-            self.free_memory(memory_address)
-            del self.symbol_table[var_name]
+        if (entry := self.lookup_variable(var_name, node.slot)) is not None:
+            self.free_memory(entry.address)
+            self.unbind_variable(var_name, node.slot)
         else:
             raise Exception(f"Cannot free undeclared variable '{var_name}'")
 
@@ -223,19 +529,18 @@ class Interpreter:
         initial_value = self.evaluate_expression(node.value_expr) if node.value_expr else self.get_default_value_for_type(data_type)
 
         # Create symbol table entry with memory letation
-        self.symbol_table[var_name] = {"type": data_type, "value": initial_value, "address": self.next_memory_address}
-        self.letate_memory(data_type)
+        address = self.own_memory(data_type) if node.owned else self.letate_memory(data_type)
+        self.bind_variable(var_name, node.slot, self.memory.cell(data_type, initial_value, address))
 
         # If there's an initial value, use the same assignment logic as regular assignments
         if node.value_expr:
-            self._handle_variable_assignment(var_name, initial_value)
+            self._handle_variable_assignment(var_name, initial_value, node.slot)
 
     def _get_expression_type(self, node):
         """Helper to find the data type of an expression result."""
         if isinstance(node, IdentifierNode):
-            if node.name in self.symbol_table:
-                x = self.symbol_table[node.name]
-                return x.get("type") or x.get("data_type") or "*unknown*"
+            if (x := self.lookup_variable(node.name, node.slot)) is not None:
+                return x.type or "*unknown*"
         elif isinstance(node, FunctionCallNode):
             if node.func_name in self.function_table:
                 return self.function_table[str(node.func_name)].return_type
@@ -250,35 +555,44 @@ class Interpreter:
     def execute_variable_assignment(self, node):
         var_name = node.var_name
         new_value = self.evaluate_expression(node.value_expr)
-        self._handle_variable_assignment(var_name, new_value)
+        self._handle_variable_assignment(var_name, new_value, node.slot)
 
-    def _handle_variable_assignment(self, var_name, new_value):
+    def _handle_variable_assignment(self, var_name, new_value, slot=-1):
         if '.' in var_name:  # Struct field assignment e.g., vec.x = 10;
             struct_var_name, field_name = var_name.split('.', 1)
-            if struct_var_name in self.symbol_table:
-                if self.symbol_table[struct_var_name]["type"] in self.struct_definitions:
-                    if field_name in self.symbol_table[struct_var_name]["value"]:  # Check if field exists in struct instance
-                        field_type = next(filter(lambda x: x[0] == field_name, self.struct_definitions[self.symbol_table[struct_var_name]["type"]].fields), 'null')[1]
+            if (struct_var := self.lookup_variable(struct_var_name, slot)) is not None:
+                if struct_var.type in self.struct_definitions:
+                    current_struct_value = struct_var.value
+                    if isinstance(current_struct_value, GravoxStruct):
+                        # The field's attribute and type were worked out with the struct's class
+                        if (field := current_struct_value.__layout__.get(field_name)) is None:
+                            raise Exception(f"Struct '{struct_var.type}' does not have field '{field_name}'")
+                        setattr(current_struct_value, field[0], self.cast_value_to_type(new_value, field[1]))
+                        if struct_var.address not in self.memory:
+                            self.memory[struct_var.address] = struct_var
+                        return
+                    if field_name in current_struct_value:  # Check if field exists in struct instance
+                        field_type = next(filter(lambda x: x[0] == field_name, self.struct_definitions[struct_var.type].fields), 'null')[1]
                         typed_value = self.cast_value_to_type(new_value, field_type)
-                        current_struct_value = self.symbol_table[struct_var_name]["value"]
                         current_struct_value[field_name] = typed_value  # Assign new value to struct field
-                        self.symbol_table[struct_var_name]["value"] = current_struct_value  # Update symbol table with modified struct
-                        memory_address = self.symbol_table[struct_var_name]["address"]
-                        self.memory[memory_address] = current_struct_value  # Update memory as well
+                        if struct_var.address not in self.memory:
+                            self.memory[struct_var.address] = struct_var
                         return
                     else:
-                        raise Exception(f"Struct '{self.symbol_table[struct_var_name]['type']}' does not have field '{field_name}'")
+                        raise Exception(f"Struct '{struct_var.type}' does not have field '{field_name}'")
                 else:
                     raise Exception(f"'{struct_var_name}' is not a struct variable")
             else:
                 raise Exception(f"Struct variable '{struct_var_name}' not declared")
 
-        if var_name in self.symbol_table:
-            declared_type = self.symbol_table[var_name]["type"]
+        if slot < 0 or (var := self.frame.slots[slot]) is None: # inlined lookup_variable
+            var = self.symbol_table.get(var_name)
+        if var is not None:
+            declared_type = var.type
             typed_value = self.cast_value_to_type(new_value, declared_type)  # Type casting on assignment
-            self.symbol_table[var_name]["value"] = typed_value  # Update symbol table
-            memory_address = self.symbol_table[var_name]["address"]
-            self.memory[memory_address] = typed_value  # Update memory
+            var.value = typed_value  # Update the variable (and memory, which holds the same cell)
+            if var.address not in self.memory: # first store to a parameter or `var` declaration
+                self.memory[var.address] = var
         else:
             raise Exception(f"Variable '{var_name}' not declared")
 
@@ -351,14 +665,16 @@ class Interpreter:
             self.execute_statement(node.loop_block)
 
     def execute_for_loop(self, node):
-        # self.symbol_table["i"] = {"type": "int32", "value": 0, "address": self.next_memory_address}
-        # self.letate_memory("int32")
-        self.execute_statement(node.init_stmt) # Initialization statement
-        # print("st", self.symbol_table)
-        while self.evaluate_expression(node.condition_expr): # Condition
-            self.execute_statement(node.loop_block) # Loop body
-            self.execute_statement(node.increment_stmt) # Increment statement
-        # self.free_memory(self.symbol_table["i"]["address"])
+        mark = len(self.owned)
+        try:
+            self.execute_statement(node.init_stmt) # Initialization statement
+            # print("st", self.symbol_table)
+            while self.evaluate_expression(node.condition_expr): # Condition
+                self.execute_statement(node.loop_block) # Loop body
+                self.execute_statement(node.increment_stmt) # Increment statement
+        finally:
+            if node.owns_storage:
+                self.release_storage(mark) # the loop variable's
 
     def execute_print_statement(self, node):
         values = [self.evaluate_expression(expr) for expr in node.expressions]
@@ -371,200 +687,205 @@ class Interpreter:
         self.execute_statement(node.body) # For simulation, execute in current thread directly.
 
     def evaluate_expression(self, node):
-        if isinstance(node, IntLiteralNode):
-            return node.value
-        elif isinstance(node, FloatLiteralNode):
-            return node.value
-        elif isinstance(node, CharLiteralNode):
-            return node.value
-        elif isinstance(node, StringLiteralNode):
-            return node.value
-        elif isinstance(node, NullLiteralNode):
-            return None
-        elif isinstance(node, ArrayLiteralNode):
-            return [self.evaluate_expression(i) for i in node.elements]
-        elif isinstance(node, IdentifierNode):
-            # print("ident", node)
-            var_name = node.name
-            if var_name in self.symbol_table:
-                x = self.symbol_table[var_name]
-                # print(self.resolving_context, type(x["value"]))
-                if isinstance(x["value"], dict) and self.resolving_context == "pretty":
-                    self.resolving_context = "normal"
-                    x = f"{x.get('data_type') or '*unknown*'} {{ {", ".join([f'{k}: {v if v is not None else 'null'}' for k, v in x['value'].items()])} }}"
-                    # print("pretty", x)
-                    return x
-                return x["value"]
-            elif var_name in self.enum_definitions: # Check if identifier is an enum
-                return var_name # Return enum name itself for now
-            else:
-                raise Exception(f"Variable '{var_name}' not declared")
-        elif isinstance(node, BinaryOpNode):
-            left_value = self.evaluate_expression(node.left_expr)
-            right_value = self.evaluate_expression(node.right_expr)
-            op_type = node.op
-
-            if op_type == TokenType.PLUS: return left_value + right_value
-            elif op_type == TokenType.MINUS: return left_value - right_value
-            elif op_type == TokenType.MULTIPLY: return left_value * right_value
-            elif op_type == TokenType.DIVIDE:
-                if right_value == 0: raise Exception("Division by zero")
-                return left_value / right_value
-            elif op_type == TokenType.MODULO:
-                if right_value == 0: raise Exception("Modulo by zero")
-                return left_value % right_value
-            elif op_type == TokenType.EQUAL: return left_value == right_value
-            elif op_type == TokenType.NOT_EQUAL: return left_value != right_value
-            elif op_type == TokenType.GREATER_THAN: return left_value > right_value
-            elif op_type == TokenType.LESS_THAN: return left_value < right_value
-            elif op_type == TokenType.GREATER_EQUAL: return left_value >= right_value
-            elif op_type == TokenType.LESS_EQUAL: return left_value <= right_value
-            elif op_type == TokenType.AND: return left_value & right_value # Bitwise AND
-            elif op_type == TokenType.OR: return left_value | right_value  # Bitwise OR
-            elif op_type == TokenType.XOR: return left_value ^ right_value # Bitwise XOR
-            elif op_type == TokenType.LSHIFT: return left_value << right_value # Left Shift
-            elif op_type == TokenType.RSHIFT: return left_value >> right_value # Right Shift
-
-        elif isinstance(node, UnaryOpNode):
-            value = self.evaluate_expression(node.expr)
-            op_type = node.op
-            if op_type == TokenType.MINUS: return -value
-            elif op_type == TokenType.BIT_NOT: return ~value # Bitwise NOT
-            elif op_type == TokenType.POINTER_DEREF: # *ptr
-                if isinstance(value, int): # Address should be an integer address
-                    if value in self.memory:
-                        return self.memory[value] # Dereference memory address
-                    else:
-                        raise Exception(f"Invalid memory access at address {value}")
-                else:
-                    raise Exception("Pointer dereference expects a memory address (integer)")
-            elif op_type == TokenType.POINTER_REF: # &var
-                if isinstance(node.expr, IdentifierNode):
-                    var_name = node.expr.name
-                    # print("pointer")
-                    if var_name in self.symbol_table:
-                        # print(var_name, self.symbol_table[var_name])
-                        return self.symbol_table[var_name]["address"] # Return memory address of variable
-                    else:
-                        raise Exception(f"Variable '{var_name}' not declared")
-                else:
-                    raise Exception("Pointer reference '&' can only be applied to variables")
+        handler = self.expression_handlers.get(type(node))
+        if handler:
+            return handler(node)
+        return None # Default return if not handled.
 
-        elif isinstance(node, FunctionCallNode):
-            return self.execute_function_call(node)
-        elif isinstance(node, TypeCastNode):
-            expression_value = self.evaluate_expression(node.expression)
-            return self.cast_value_to_type(expression_value, node.target_type)
-        elif isinstance(node, StructFieldAccessNode):
-            struct_var_name = str(node.struct_var_name)
-            field_name = node.field_name
-            if struct_var_name in self.symbol_table:
-                if (sv := self.symbol_table[struct_var_name])["type"] in self.struct_definitions:
-                    struct_instance = self.symbol_table[struct_var_name]["value"]
-                    if field_name in struct_instance:
-                        # print(struct_instance)
-                        try:
-                            return struct_instance[field_name]
-                        except Exception as e:
-                            print(self.symbol_table[struct_var_name], struct_instance, e)
-                    else:
-                        raise Exception(f"Struct '{self.symbol_table[struct_var_name]['type']}' does not have field '{field_name}'")
+    def evaluate_literal(self, node):
+        return node.value
+
+    def evaluate_null(self, node):
+        return None
+
+    def evaluate_array_literal(self, node):
+        return [self.evaluate_expression(i) for i in node.elements]
+
+    def evaluate_identifier(self, node):
+        # print("ident", node)
+        var_name = node.name
+        if (slot := node.slot) < 0 or (x := self.frame.slots[slot]) is None: # inlined lookup_variable
+            x = self.symbol_table.get(var_name)
+        if x is not None:
+            # print(self.resolving_context, type(x["value"]))
+            if isinstance(x.value, (dict, GravoxStruct)) and self.resolving_context == "pretty":
+                self.resolving_context = "normal"
+                fields = struct_fields(x.value) if isinstance(x.value, GravoxStruct) else x.value
+                x = f"{x.type or '*unknown*'} {{ {", ".join([f'{k}: {v if v is not None else 'null'}' for k, v in fields.items()])} }}"
+                # print("pretty", x)
+                return x
+            return x.value
+        elif var_name in self.enum_definitions: # Check if identifier is an enum
+            return var_name # Return enum name itself for now
+        else:
+            raise Exception(f"Variable '{var_name}' not declared")
+
+    def evaluate_binary_op(self, node):
+        left_value = self.evaluate_expression(node.left_expr)
+        right_value = self.evaluate_expression(node.right_expr)
+        op_type = node.op
+        # (an array compares elementwise, and checks for zeros itself)
+        if op_type in ZERO_DIVISION_ERRORS and right_value.__class__ is not TypedArray and right_value == 0:
+            raise Exception(ZERO_DIVISION_ERRORS[op_type])
+        operation = BINARY_OPERATIONS.get(op_type)
+        return operation(left_value, right_value) if operation else None
+
+    def evaluate_unary_op(self, node):
+        value = self.evaluate_expression(node.expr)
+        op_type = node.op
+        if operation := UNARY_OPERATIONS.get(op_type):
+            return operation(value)
+        elif op_type == TokenType.POINTER_DEREF: # *ptr
+            if isinstance(value, int): # Address should be an integer address
+                if value in self.memory:
+                    return self.memory[value].value # Dereference memory address
                 else:
-                    if sv["type"] == "array":
-                        return sv["value"][int(field_name)]
-                    if sv["type"] == "any":
-                        try:
-                            return sv["value"][field_name]
-                        except KeyError as e:
-                            raise KeyError(f"Key not found: {e}")
-                    raise Exception(f"'{struct_var_name}' is not a struct variable")
+                    raise Exception(f"Invalid memory access at address {value}")
             else:
-                if enum_item := self.enum_definitions.get(struct_var_name):
-                    return next(filter(lambda y: y == field_name, enum_item.members))
-                    # return None
-                raise Exception(f"Struct variable '{struct_var_name}' not declared")
-        elif isinstance(node, ArrayIndexNode):
-            array_name = str(node.array_name)
-            index = self.evaluate_expression(node.index_expr)
-            if array_name in self.symbol_table:
-                array_value = self.symbol_table[array_name]["value"]
-                try:
-                    index = int(index)
-                    if isinstance(array_value, list) and 0 <= index < len(array_value):
-                        return array_value[index]
-                    else:
-                        raise Exception(f"Array '{array_name}' index out of range")
-                except ValueError:
-                    raise Exception("Array index expression must be an integer literal")
+                raise Exception("Pointer dereference expects a memory address (integer)")
+        elif op_type == TokenType.POINTER_REF: # &var
+            if isinstance(node.expr, IdentifierNode):
+                var_name = node.expr.name
+                # print("pointer")
+                if (var := self.lookup_variable(var_name, node.expr.slot)) is not None:
+                    # print(var_name, var)
+                    return var.address # Return memory address of variable
+                else:
+                    raise Exception(f"Variable '{var_name}' not declared")
             else:
-                raise Exception(f"Array '{array_name}' not declared")
-        elif isinstance(node, OkResultNode):
-            return {"type": "Ok", "value": self.evaluate_expression(node.value_expr)}
-        elif isinstance(node, ErrResultNode):
-            error_value = self.evaluate_expression(node.error_expr) # Could be enum member etc.
-            return {"type": "Err", "error": error_value}
-        elif isinstance(node, EnumMemberNode): # Referencing enum member value - for now return string name itself.
-            return node.member_name # Could be improved to store enum values if needed
-        elif isinstance(node, MethodCallNode):
-            instance_type = self._get_expression_type(node.instance_expr)
-            instance_value = self.evaluate_expression(node.instance_expr)
+                raise Exception("Pointer reference '&' can only be applied to variables")
+
+    def evaluate_type_cast(self, node):
+        expression_value = self.evaluate_expression(node.expression)
+        return self.cast_value_to_type(expression_value, node.target_type)
+
+    def evaluate_struct_field_access(self, node):
+        if (member := node.member) is not None: # `Enum.member` (see resolver.py)
+            return member
+        struct_var_name = str(node.struct_var_name)
+        field_name = node.field_name
+        if (sv := self.lookup_variable(struct_var_name, node.slot)) is not None:
+            if sv.type in self.struct_definitions:
+                struct_instance = sv.value
+                if isinstance(struct_instance, GravoxStruct) and (field := struct_instance.__layout__.get(field_name)):
+                    return getattr(struct_instance, field[0])
+                if field_name in struct_instance:
+                    # print(struct_instance)
+                    try:
+                        return struct_instance[field_name]
+                    except Exception as e:
+                        print(sv, struct_instance, e)
+                else:
+                    raise Exception(f"Struct '{sv.type}' does not have field '{field_name}'")
+            else:
+                if sv.type == "array" or sv.type[:6] == "array<":
+                    return sv.value[int(field_name)]
+                if sv.type == "any":
+                    try:
+                        return sv.value[field_name]
+                    except KeyError as e:
+                        raise KeyError(f"Key not found: {e}")
+                raise Exception(f"'{struct_var_name}' is not a struct variable")
+        else:
+            if struct_var_name in self.enum_members: # one the resolver didn't resolve (e.g. an imported enum)
+                return self.enum_member(struct_var_name, field_name)
+            raise Exception(f"Struct variable '{struct_var_name}' not declared")
+
+    def evaluate_array_index(self, node):
+        array_name = node.array_name
+        return self._index_array(str(array_name), self.evaluate_expression(node.index_expr),
+                                 array_name.slot if isinstance(array_name, IdentifierNode) else -1)
+
+    def _index_array(self, array_name, index, slot=-1):
+        if (array_var := self.lookup_variable(array_name, slot)) is not None:
+            array_value = array_var.value
+            try:
+                index = int(index)
+                if isinstance(array_value, (list, TypedArray)) and 0 <= index < len(array_value):
+                    return array_value[index]
+                else:
+                    raise Exception(f"Array '{array_name}' index out of range")
+            except ValueError:
+                raise Exception("Array index expression must be an integer literal")
+        else:
+            raise Exception(f"Array '{array_name}' not declared")
 
-            method_key = f"{instance_type}::{node.method_name}"
-            if method_key not in self.function_table:
-                # print(self.function_table)
-                raise Exception(f"Method '{node.method_name}' not found for type '{instance_type}'")
+    def evaluate_ok_result(self, node):
+        return {"type": "Ok", "value": self.evaluate_expression(node.value_expr)}
 
-            method_def = self.function_table[method_key]
-            args = [self.evaluate_expression(arg) for arg in node.args]
+    def evaluate_err_result(self, node):
+        error_value = self.evaluate_expression(node.error_expr) # Could be enum member etc.
+        return {"type": "Err", "error": error_value}
 
-            self_context = {"type": instance_type, "value": instance_value, "address": -1} # address is tricky here
-            return self._execute_callable(method_def, args, self_instance=self_context)
+    def evaluate_enum_member(self, node): # Referencing enum member value
+        return self.enum_member(node.enum_name, node.member_name)
 
+    def enum_member(self, enum_name: str, member_name: str) -> EnumMember:
+        if (member := self.enum_members.get(enum_name, {}).get(member_name)) is None:
+            raise Exception(f"Enum '{enum_name}' has no member '{member_name}'")
+        return member
 
-        return None # Default return if not handled.
+    def evaluate_method_call(self, node):
+        instance = node.instance_expr
+        if instance.__class__ is IdentifierNode and (cell := self.lookup_variable(instance.name, instance.slot)) is not None:
+            instance_type, instance_value = cell.type or "*unknown*", cell.value # one lookup for both
+        else:
+            instance_type = self._get_expression_type(instance)
+            instance_value = self.evaluate_expression(instance)
+
+        method_def = self.lookup_method(node, instance_type)
+        args = [self.evaluate_expression(arg) for arg in node.args]
 
-    def cast_value_to_type(self, value, target_type): # Simple type casting. Needs more robust logic.
+        self_context = VarCell(instance_type, instance_value, -1) # address is tricky here
+        return self._execute_callable(method_def, args, self_instance=self_context)
+
+    def lookup_method(self, node, instance_type):
+        """The method `node` calls on an instance of `instance_type`. Each call site caches the last
+        one it found (a monomorphic inline cache), valid while it's called on the same type and no
+        struct has been defined since, so repeated calls skip building the "Type::method" key."""
+        cache = node.cache
+        if cache is not None and cache.version is self.methods_version and cache.instance_type == instance_type:
+            return cache.method_def
+        method_def = self.function_table.get(f"{instance_type}::{node.method_name}")
+        if method_def is None:
+            raise Exception(f"Method '{node.method_name}' not found for type '{instance_type}'")
+        node.cache = MethodCache(self.methods_version, instance_type, method_def)
+        return method_def
+
+    def cast_value_to_type(self, value, target_type):
         try:
-            if target_type in ["int8", "int16", "int32", "int64"]:
-                return int(value)
-            elif target_type in ["uint8", "uint16", "uint32", "uint64"]:
-                return int(value) # Unsigned is treated same as signed for now in casting, needs proper uint handling
-            elif target_type in ["float32", "float64"]:
-                return float(value)
-            elif target_type == "char":
-                return str(value)[0] if str(value) else '\0' # Get first char or null char if empty
-            elif target_type in self.struct_definitions: # Casting to struct type? Not directly supported in Gravox spec example, may need to handle struct instantiation instead.
-                return value # Return original value if type is struct (no direct cast, might need constructor)
-            elif target_type in self.enum_definitions:
-                return value
-            elif target_type == "Result": # Result type is more of a return type specifier, not really a type to cast to in value context.
-                raise DeprecationWarning("Use try/catch instead.")
-                # return value # Return original value if type is Result
-            elif target_type == "string":
-                return str(value)
-            elif target_type == "any":
-                return value
-            elif target_type == "array":
-                return list(value)
-            else:
-                raise Exception(f"Cannot cast value of type '{type(value)}' to type '{target_type}'")
-        except ValueError:
-            raise Exception(f"Cannot cast value '{value}' to type '{target_type}'")
-        except TypeError:
+            return (self.type_descriptors.get(target_type) or self.describe_type(target_type)).cast(value)
+        except (ValueError, TypeError, OverflowError):
             raise Exception(f"Cannot cast value '{value}' to type '{target_type}'")
 
     def get_default_value_for_type(self, data_type):
-        if data_type in ["int8", "int16", "int32", "int64", "uint8", "uint16", "uint32", "uint64"]:
-            return 0
-        elif data_type in ["float32", "float64"]:
-            return 0.0
-        elif data_type == "char":
-            return '\0'
-        elif data_type in self.struct_definitions: # Default struct instance? For now, initialize all fields to default of their types in struct_def
-            struct_def = self.struct_definitions[data_type]
-            struct_instance = {}
-            print("sd", struct_def)
-            for field_name, field_type in struct_def.fields:
-                struct_instance[field_name] = self.get_default_value_for_type(field_type) # Recursive default for nested structs?
-            return struct_instance
-        return None
\ No newline at end of file
+        return (self.type_descriptors.get(data_type) or self.describe_type(data_type)).default()
+
+    def describe_type(self, type_name) -> TypeDescriptor:
+        """The TypeDescriptor for `type_name`, made on first use. Structs and enums come after the
+        scalar types and before the other builtin types; casting to either leaves the value as it is."""
+        descriptor = SCALAR_TYPES.get(type_name)
+        if descriptor is None:
+            if type_name in self.struct_definitions:
+                descriptor = TypeDescriptor(type_name, same, lambda: self.default_struct(type_name))
+            elif type_name in self.enum_definitions:
+                descriptor = TypeDescriptor(type_name, same, no_default)
+            else:
+                descriptor = builtin_type(type_name) or unknown_type(type_name)
+        self.type_descriptors[type_name] = descriptor
+        return descriptor
+
+    def default_struct(self, struct_name):
+        # Default struct instance: every field initialized to the default of its type
+        struct_def = self.struct_definitions[struct_name]
+        print("sd", struct_def)
+        return self.new_struct(struct_name) # Recursive default for nested structs?
+
+    def new_struct(self, struct_name) -> GravoxStruct:
+        # A new instance of the struct, its fields set to the defaults of their types in the order
+        # they're declared (a field declared twice gets the default of its last type, as before)
+        instance = self.struct_classes[struct_name]()
+        layout = instance.__layout__
+        for field_name, field_type in self.struct_definitions[struct_name].fields:
+            setattr(instance, layout[field_name][0], self.get_default_value_for_type(field_type))
+        return instance
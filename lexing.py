@@ -1,6 +1,13 @@
 # --- 1. Lexer ---
+import re
+from codecs import getincrementaldecoder
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
 from enum import Enum
+from itertools import islice
 from json import dumps
+from mmap import mmap
+from typing import BinaryIO, TextIO
 
 
 class TokenType(Enum):
@@ -80,13 +87,20 @@ class TokenType(Enum):
     EOF = "EOF"
     ARROW = "ARROW"
 
+    # Members are singletons, so identity hashing is valid and keeps the many dicts/sets keyed by
+    # TokenType off Enum's Python-level __hash__
+    __hash__ = object.__hash__
+
 
 class Token:
-    def __init__(self, token_type, value, line, column):
+    __slots__ = ("type", "value", "line", "column", "offset")
+
+    def __init__(self, token_type, value, line, column, offset = -1):
         self.type = token_type
         self.value = value
         self.line = line
         self.column = column
+        self.offset = offset # index of the token's first character in the source
 
     def __repr__(self):
         return f'<Token {self.type}: {self.value} at {self.line}:{self.column}>'
@@ -130,6 +144,7 @@ def tokenize(code: str, lsp_mode = False) -> list[Token]:
     i = 0
     while i < len(code):
         char = code[i]
+        start = i
 
         # Whitespace
         if char.isspace():
@@ -157,7 +172,7 @@ def tokenize(code: str, lsp_mode = False) -> list[Token]:
                 num_str += code[i]
                 i += 1
             token_type = TokenType.FLOAT_LITERAL if is_float else TokenType.INT_LITERAL
-            tokens.append(Token(token_type, num_str, line_num, col_num))
+            tokens.append(Token(token_type, num_str, line_num, col_num, start))
             col_num += len(num_str)
             continue
 
@@ -166,7 +181,7 @@ def tokenize(code: str, lsp_mode = False) -> list[Token]:
             i += 1
             char_val = code[i]
             i += 2  # Skip char and closing quote
-            tokens.append(Token(TokenType.CHAR_LITERAL, char_val, line_num, col_num))
+            tokens.append(Token(TokenType.CHAR_LITERAL, char_val, line_num, col_num, start))
             col_num += 3
             continue
 
@@ -178,7 +193,7 @@ def tokenize(code: str, lsp_mode = False) -> list[Token]:
                 i += 1
             if i < len(code) and code[i] == '"':  # Check for closing quote
                 i += 1  # Consume closing quote
-                tokens.append(Token(TokenType.STRING_LITERAL, string_val, line_num, col_num))
+                tokens.append(Token(TokenType.STRING_LITERAL, string_val, line_num, col_num, start))
                 col_num += len(string_val) + 2  # +2 for the double quotes
                 continue
             else:
@@ -194,36 +209,36 @@ def tokenize(code: str, lsp_mode = False) -> list[Token]:
                 i += 1
 
             if identifier in KEYWORDS:
-                tokens.append(Token(KEYWORDS[identifier], identifier, line_num, col_num))
+                tokens.append(Token(KEYWORDS[identifier], identifier, line_num, col_num, start))
             elif identifier in DATA_TYPES:
-                tokens.append(Token(DATA_TYPES[identifier], identifier, line_num, col_num))
+                tokens.append(Token(DATA_TYPES[identifier], identifier, line_num, col_num, start))
             elif identifier == 'Result':  # Special case Result type
-                tokens.append(Token(TokenType.RESULT, identifier, line_num, col_num))
+                tokens.append(Token(TokenType.RESULT, identifier, line_num, col_num, start))
             else:
-                tokens.append(Token(TokenType.IDENTIFIER, identifier, line_num, col_num))
+                tokens.append(Token(TokenType.IDENTIFIER, identifier, line_num, col_num, start))
             col_num += len(identifier)
             continue
 
         op = code[i:i + 2]
         if op == "->":  # ARROW OPERATOR CHECK - ADDED HERE
-            tokens.append(Token(TokenType.ARROW, op, line_num, col_num))
+            tokens.append(Token(TokenType.ARROW, op, line_num, col_num, start))
             i += 2
             col_num += 2
             continue
         if op in OPERATORS and op != '=' and op != '<' and op != '>':  # avoid misinterpreting ==, >=, <=, !=
-            tokens.append(Token(OPERATORS[op], op, line_num, col_num))
+            tokens.append(Token(OPERATORS[op], op, line_num, col_num, start))
             i += 2
             col_num += 2
             continue
 
         op = code[i]
         if op in OPERATORS:
-            tokens.append(Token(OPERATORS[op], op, line_num, col_num))
+            tokens.append(Token(OPERATORS[op], op, line_num, col_num, start))
             i += 1
             col_num += 1
             continue
         if op in BRACKETS:
-            tokens.append(Token(BRACKETS[op], op, line_num, col_num))
+            tokens.append(Token(BRACKETS[op], op, line_num, col_num, start))
             i += 1
             col_num += 1
             continue
@@ -231,5 +246,527 @@ def tokenize(code: str, lsp_mode = False) -> list[Token]:
         if lsp_mode:
             raise Exception(dumps({"cause": "unexpect", "char": char, "loc": {"line": line_num, "column": col_num}}))
         raise Exception(f"Unexpected character '{char}' at {line_num}:{col_num}")
-    tokens.append(Token(TokenType.EOF, None, line_num, col_num))
+    tokens.append(Token(TokenType.EOF, None, line_num, col_num, len(code)))
+    return tokens
+
+
+
+# Master-regex engine. Every token class is one alternative of a single compiled pattern, so each
+# token costs one regex step instead of a Python-level loop per character. `\s` and `\w` match
+# exactly what `str.isspace`/`str.isalnum` accept; the only gap is digits outside `\d` (e.g. '²'),
+# which `_scan` patches up by hand so both engines agree.
+_MASTER_RE = re.compile(r"""
+    (?P<WS>\s+)
+  | (?P<COMMENT>//[^\n]*)
+  | (?P<NUMBER>\d[\d.]*)
+  | (?P<CHAR>'(?P<char_value>[\s\S])[\s\S]?)
+  | (?P<STRING>"(?P<string_value>[^"]*)")
+  | (?P<BADSTRING>")
+  | (?P<NAME>[^\W\d]\w*)
+  | (?P<OP>->|==|!=|>=|<=|<<|>>|[=+\-*/%><&|^~.])
+  | (?P<BRACKET>[(){}\[\];:,])
+  | (?P<OTHER>[\s\S])
+""", re.VERBOSE)
+_OP_TYPES = {**OPERATORS, "->": TokenType.ARROW}
+
+
+def _digits_end(text: str, pos: int) -> int:
+    while pos < len(text) and (text[pos].isdigit() or text[pos] == '.'):
+        pos += 1
+    return pos
+
+
+def _scan(chunks: Iterable[str], lsp_mode = False, line_num = 1, col_num = 1, base = 0) -> Iterator[Token]:
+    """Regex lexer over a sequence of text chunks. A match touching the end of a chunk may be cut
+    short (an identifier, a string, `=` of `==`...), so it is carried over and re-matched together
+    with the next chunk; line/column state simply continues across chunks. `line_num`, `col_num`
+    and `base` (source offset of the first chunk) allow resuming at a token boundary."""
+    finditer = _MASTER_RE.finditer
+    buffer = ""
+    chunks = iter(chunks)
+    chunk = next(chunks, None)
+    while chunk is not None:
+        buffer = buffer + chunk if buffer else chunk
+        chunk = next(chunks, None)
+        at_eof = chunk is None
+        end = len(buffer)
+        pos = 0
+        rescan = True
+        while rescan:  # Only repeated after a hand-lexed number, to realign the regex
+            rescan = False
+            for m in finditer(buffer, pos):
+                kind = m.lastgroup
+                value = m.group()
+                next_pos = m.end()
+                if kind == 'NUMBER' and next_pos < end and buffer[next_pos].isdigit() or kind == 'NAME' and value[0].isdigit():
+                    next_pos = _digits_end(buffer, pos)  # Digits that `\d` doesn't cover
+                    value = buffer[pos:next_pos]
+                    kind = 'NUMBER'
+                    rescan = True
+                if not at_eof and (next_pos == end or kind == 'BADSTRING'):
+                    rescan = False
+                    break  # Might continue in the next chunk
+                start = pos
+                pos = next_pos
+                if kind == 'NAME':
+                    if not (value[0].isalpha() or value[0] == '_'):  # Numeric non-digit such as '½'
+                        kind, value = 'OTHER', value[0]
+                    else:
+                        yield Token(KEYWORDS.get(value) or DATA_TYPES.get(value) or TokenType.IDENTIFIER, value, line_num, col_num, base + start)
+                        col_num += len(value)
+                        continue
+                if kind == 'WS':
+                    newlines = value.count('\n')
+                    if newlines:
+                        line_num += newlines
+                        col_num = len(value) - value.rfind('\n')
+                    else:
+                        col_num += len(value)
+                elif kind == 'OP':
+                    yield Token(_OP_TYPES[value], value, line_num, col_num, base + start)
+                    if at_eof and pos == end and value not in "=<>":
+                        col_num += 2  # `tokenize` reads a trailing operator as a (truncated) two-char one
+                    else:
+                        col_num += len(value)
+                elif kind == 'BRACKET':
+                    yield Token(BRACKETS[value], value, line_num, col_num, base + start)
+                    col_num += 1
+                elif kind == 'NUMBER':
+                    token_type = TokenType.FLOAT_LITERAL if '.' in value else TokenType.INT_LITERAL
+                    yield Token(token_type, value, line_num, col_num, base + start)
+                    col_num += len(value)
+                    if rescan:
+                        break
+                elif kind == 'STRING':
+                    yield Token(TokenType.STRING_LITERAL, m.group('string_value'), line_num, col_num, base + start)
+                    col_num += len(value)
+                elif kind == 'CHAR':
+                    yield Token(TokenType.CHAR_LITERAL, m.group('char_value'), line_num, col_num, base + start)
+                    col_num += 3  # The closing quote is skipped unchecked, same as `tokenize`
+                elif kind == 'COMMENT':
+                    continue  # Comments don't advance the column
+                elif kind == 'BADSTRING':
+                    if lsp_mode:
+                        raise Exception(dumps({"cause": "string", "loc": {"line": line_num, "column": col_num}}))
+                    raise Exception(f"Unterminated string literal starting at {line_num}:{col_num}")
+                elif value == "'":  # Lone quote at EOF
+                    raise IndexError("string index out of range")
+                else:
+                    if lsp_mode:
+                        raise Exception(dumps({"cause": "unexpect", "char": value, "loc": {"line": line_num, "column": col_num}}))
+                    raise Exception(f"Unexpected character '{value}' at {line_num}:{col_num}")
+        buffer = buffer[pos:]
+        base += pos
+    yield Token(TokenType.EOF, None, line_num, col_num, base + len(buffer))
+
+
+def _read_chunks(source: TextIO | BinaryIO | mmap, chunk_size: int) -> Iterator[str]:
+    decoder = None
+    while data := source.read(chunk_size):
+        if not isinstance(data, str):  # Binary handles and mmap
+            decoder = decoder or getincrementaldecoder("utf-8")()
+            data = decoder.decode(data)
+        if data:
+            yield data
+    if decoder and (tail := decoder.decode(b"", final=True)):
+        yield tail
+
+
+def tokenize_regex(code: str, lsp_mode = False) -> list[Token]:
+    return list(_scan((code,), lsp_mode))
+
+
+def tokenize_iter(source: str | TextIO | BinaryIO | mmap, lsp_mode = False, chunk_size = 1 << 16) -> Iterator[Token]:
+    """Lazily lexes `source` (a string, a text or binary file handle, or an mmap) `chunk_size`
+    characters/bytes at a time. Binary sources are decoded as UTF-8 without newline translation."""
+    if isinstance(source, str):
+        return _scan((source,), lsp_mode)
+    return _scan(_read_chunks(source, chunk_size), lsp_mode)
+
+
+def _token_end(token: Token) -> int:
+    if token.value is None:
+        return token.offset
+    if token.type == TokenType.STRING_LITERAL:
+        return token.offset + len(token.value) + 2
+    if token.type == TokenType.CHAR_LITERAL:
+        return token.offset + 3
+    return token.offset + len(token.value)
+
+
+class _Fenwick:
+    """Prefix sums over a list of non-negative ints (or of shift amounts, see TokenRope) with
+    O(log n) updates: a binary indexed tree."""
+    __slots__ = ("tree",)
+
+    def __init__(self, values: Iterable[int]):
+        tree = [0, *values]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def add(self, index: int, amount: int):
+        tree = self.tree
+        index += 1
+        while index < len(tree):
+            tree[index] += amount
+            index += index & -index
+
+    def prefix(self, index: int) -> int:
+        # sum of values[:index]
+        tree = self.tree
+        total = 0
+        while index > 0:
+            total += tree[index]
+            index &= index - 1
+        return total
+
+    def search(self, target: int) -> tuple[int, int]:
+        # First index whose running total passes `target`, and the sum of the values before it
+        # (len(values) if there is none); empty entries are skipped
+        tree = self.tree
+        index = 0
+        before = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            upper = index + step
+            if upper < len(tree) and before + tree[upper] <= target:
+                index = upper
+                before += tree[upper]
+            step >>= 1
+        return index, before
+
+
+class SourceText:
+    """
+    Text of a document under edit, kept as chunks of about `chunk_size` characters with the
+    length and newline count of each chunk in Fenwick trees. `replace` rewrites only the chunks an
+    edit touches, and `chunks` feeds the text to the chunked scanner from any offset, so neither
+    an edit nor `relex` builds the whole string. `str()` joins it when a full lex is needed.
+    """
+    def __init__(self, text: str, chunk_size = 4096):
+        self.chunk_size = chunk_size
+        self._layout([text[i:i + chunk_size] for i in range(0, len(text), chunk_size)] or [""])
+
+    def _layout(self, chunks: list[str]):
+        self.texts = chunks
+        self.line_counts = [chunk.count("\n") for chunk in chunks]
+        self.lengths = _Fenwick(map(len, chunks))
+        self.newlines = _Fenwick(self.line_counts)
+        self.length = sum(map(len, chunks))
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __str__(self) -> str:
+        return "".join(self.texts)
+
+    def _locate(self, offset: int) -> tuple[int, int]:
+        # (chunk, index in it) of a source offset; the end of the text is past the last chunk
+        chunk, before = self.lengths.search(offset)
+        if chunk == len(self.texts):
+            chunk -= 1
+            before = self.length - len(self.texts[chunk])
+        return chunk, offset - before
+
+    def chunks(self, start = 0) -> Iterator[str]:
+        chunk, index = self._locate(start)
+        if text := self.texts[chunk][index:]:
+            yield text
+        for text in islice(self.texts, chunk + 1, None):
+            if text:
+                yield text
+
+    def line_start(self, line: int) -> int:
+        """Offset of the start of 0-based line `line`; the end of the text past the last line."""
+        if line <= 0:
+            return 0
+        chunk, before = self.newlines.search(line - 1) # the chunk holding the line's newline
+        if chunk == len(self.texts):
+            return self.length
+        text = self.texts[chunk]
+        index = -1
+        for _ in range(line - before):
+            index = text.find("\n", index + 1)
+        return self.lengths.prefix(chunk) + index + 1
+
+    def line(self, line: int) -> str:
+        """Text of 0-based line `line`, without its newline."""
+        parts = []
+        for text in self.chunks(self.line_start(line)):
+            end = text.find("\n")
+            if end != -1:
+                parts.append(text[:end])
+                break
+            parts.append(text)
+        return "".join(parts)
+
+    def replace(self, start: int, stop: int, text: str):
+        """Replaces [start, stop) with `text`."""
+        first, head = self._locate(start)
+        last, tail = self._locate(stop)
+        texts = self.texts
+        merged = texts[first][:head] + text + texts[last][tail:]
+        for chunk in range(first, last + 1): # the chunks in between are left empty
+            new = merged if chunk == first else ""
+            self.lengths.add(chunk, len(new) - len(texts[chunk]))
+            self.newlines.add(chunk, -self.line_counts[chunk])
+            self.line_counts[chunk] = 0
+            texts[chunk] = new
+        self.newlines.add(first, new_lines := merged.count("\n"))
+        self.line_counts[first] = new_lines
+        self.length += len(text) - (stop - start)
+        if len(merged) > 2 * self.chunk_size: # split it, and drop the emptied chunks meanwhile
+            size = self.chunk_size
+            self._layout([piece for chunk in texts if chunk
+                          for piece in ([chunk] if len(chunk) <= 2 * size else
+                                        (chunk[i:i + size] for i in range(0, len(chunk), size)))] or [""])
+
+
+class TokenRope(Sequence[Token]):
+    """
+    Token list for a document under edit, in blocks of about `block_size` tokens. The shift an
+    edit gives the positions of the tokens after it is recorded per block in Fenwick trees (a
+    range add) and only applied to a block's tokens when the block is next read, so `relex` does
+    no per-token work past the block it resynchronises in. A block is read as a whole, so the
+    parser's mostly sequential lookups cost an index check each.
+    """
+    def __init__(self, tokens: Iterable[Token], block_size = 512):
+        self.block_size = block_size
+        tokens = list(tokens)
+        self._layout([tokens[i:i + block_size] for i in range(0, len(tokens), block_size)] or [[]])
+
+    def _layout(self, blocks: list[list[Token]], offset_shifts: list[int] | None = None, line_shifts: list[int] | None = None):
+        # `*_shifts` hold each block's pending shift; stored as differences so a shift of every
+        # block from k on is a single add
+        self.blocks = blocks
+        self.counts = _Fenwick(map(len, blocks))
+        self.offset_shift = _Fenwick(_differences(offset_shifts or [0] * len(blocks)))
+        self.line_shift = _Fenwick(_differences(line_shifts or [0] * len(blocks)))
+        self.length = sum(map(len, blocks))
+        self.edits = 0
+        self.current = [-1] * len(blocks) # `edits` when a block's positions were last brought up to date
+        self._cached = (0, 0, blocks[0])
+
+    def __len__(self) -> int:
+        return self.length
+
+    def _block(self, block: int) -> list[Token]:
+        # A block's tokens with their pending shift applied
+        tokens = self.blocks[block]
+        if self.current[block] != self.edits:
+            self.current[block] = self.edits
+            offset = self.offset_shift.prefix(block + 1)
+            line = self.line_shift.prefix(block + 1)
+            if offset or line:
+                for token in tokens:
+                    token.offset += offset
+                    token.line += line
+                self._shift_from(block, -offset, -line)
+                self._shift_from(block + 1, offset, line)
+        return tokens
+
+    def _shift_from(self, block: int, offset: int, line: int):
+        if block < len(self.blocks):
+            self.offset_shift.add(block, offset)
+            self.line_shift.add(block, line)
+
+    def _locate(self, index: int) -> tuple[int, int]:
+        # (block, index in it) of a token; the end of the list is past the last block
+        block, before = self.counts.search(index)
+        if block == len(self.blocks):
+            block -= 1
+            before = self.length - len(self.blocks[block])
+        return block, index - before
+
+    def __getitem__(self, index: int) -> Token:
+        low, high, tokens = self._cached
+        if low <= index < high:
+            return tokens[index - low]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("token index out of range")
+        block, position = self._locate(index)
+        tokens = self._block(block)
+        self._cached = (index - position, index - position + len(tokens), tokens)
+        return tokens[position]
+
+    def __iter__(self) -> Iterator[Token]:
+        for block in range(len(self.blocks)):
+            yield from self._block(block)
+
+    def bisect(self, offset: int, key, low = 0) -> int:
+        """First index from `low` on whose token has key(token) >= `offset`, for a key that is the
+        token's offset plus a constant; reads no blocks."""
+        high = self.length
+        while low < high:
+            middle = (low + high) // 2
+            block, position = self._locate(middle)
+            token = self.blocks[block][position]
+            pending = 0 if self.current[block] == self.edits else self.offset_shift.prefix(block + 1)
+            if key(token) + pending < offset:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def replace(self, start: int, stop: int, tokens: list[Token], offset_shift = 0, line_shift = 0, column_shift = 0):
+        """Replaces self[start:stop] with `tokens`, and shifts the positions of the tokens after
+        them: columns right away on the line of self[stop], offsets and lines lazily."""
+        if column_shift and stop < self.length:
+            line = self[stop].line
+            for index in range(stop, self.length):
+                if (token := self[index]).line != line:
+                    break
+                token.column += column_shift
+        first, head = self._locate(start)
+        last, tail = self._locate(stop)
+        self._block(first)
+        if offset_shift or line_shift:
+            for token in islice(self._block(last), tail, None):
+                token.offset += offset_shift
+                token.line += line_shift
+            self._shift_from(last + 1, offset_shift, line_shift)
+        blocks = self.blocks
+        merged = blocks[first][:head] + tokens + blocks[last][tail:]
+        for block in range(first, last + 1): # the blocks in between are left empty
+            new = merged if block == first else []
+            self.counts.add(block, len(new) - len(blocks[block]))
+            blocks[block] = new
+        self.length += len(tokens) - (stop - start)
+        self.edits += 1
+        self._cached = (0, 0, blocks[0])
+        if len(merged) > 2 * self.block_size:
+            self._split()
+
+    def _split(self):
+        # Splits oversized blocks and drops empty ones, keeping each block's pending shifts
+        size = self.block_size
+        blocks, offset_shifts, line_shifts = [], [], []
+        for block, tokens in enumerate(self.blocks):
+            if not tokens:
+                continue
+            pieces = [tokens] if len(tokens) <= 2 * size else [tokens[i:i + size] for i in range(0, len(tokens), size)]
+            pending = self.current[block] != self.edits
+            blocks += pieces
+            offset_shifts += [self.offset_shift.prefix(block + 1) if pending else 0] * len(pieces)
+            line_shifts += [self.line_shift.prefix(block + 1) if pending else 0] * len(pieces)
+        self._layout(blocks or [[]], offset_shifts, line_shifts)
+
+
+def _differences(values: list[int]) -> list[int]:
+    return [value - previous for previous, value in zip([0, *values], values)]
+
+
+def relex(tokens: TokenRope, text: SourceText, start: int, old_end: int, new_end: int, lsp_mode = False) -> TokenRope:
+    """
+    Updates `tokens` in place after `text` had its old [start, old_end) replaced by what is now
+    [start, new_end). Lexing restarts at the last token that ends before the edit (the lexer keeps
+    no state between tokens besides line/column), and stops as soon as a new token lands where a
+    token after the edit used to start: from there on the text is unchanged, so the old tokens
+    are kept and only have their positions shifted, lazily (see TokenRope). Nothing is modified
+    if lexing the edit raises.
+    """
+    restart = tokens.bisect(start, _token_end) - 1
+    if restart >= 0:
+        resume = tokens[restart]
+        offset, line_num, col_num = resume.offset, resume.line, resume.column
+    else:
+        restart, offset, line_num, col_num = 0, 0, 1, 1
+    delta = new_end - old_end
+    reuse = tokens.bisect(old_end, _token_offset, restart) # first token after the edit
+    count = len(tokens)
+
+    fresh = []
+    for token in _scan(text.chunks(offset), lsp_mode, line_num, col_num, offset):
+        while reuse < count and tokens[reuse].offset + delta < token.offset:
+            reuse += 1
+        if reuse < count and tokens[reuse].offset + delta == token.offset:
+            break # back in step with the old tokens
+        fresh.append(token)
+    else:
+        tokens.replace(restart, count, fresh)
+        return tokens
+
+    # `token` is tokens[reuse] lexed again; everything after it only moves
+    resync = tokens[reuse]
+    tokens.replace(restart, reuse, fresh, delta, token.line - resync.line, token.column - resync.column)
     return tokens
+
+
+def _token_offset(token: Token) -> int:
+    return token.offset
+
+
+_TYPE_CODES = {token_type: code for code, token_type in enumerate(TokenType)}
+_CODE_TYPES = list(TokenType)
+_QUOTED = (_TYPE_CODES[TokenType.STRING_LITERAL], _TYPE_CODES[TokenType.CHAR_LITERAL])
+
+
+class TokenStream(Sequence[Token]):
+    """
+    Struct-of-arrays token list: one small array per Token field plus the source text, with
+    values sliced out of the source only when a token is looked at. About 17 bytes per token
+    instead of a Token object, its value string and a list slot.
+    """
+    def __init__(self, source: str):
+        self.source = source
+        self.types = array('B')
+        self.offsets = array('i')
+        self.lengths = array('i') # length of the value; -1 for no value (EOF)
+        self.lines = array('i')
+        self.columns = array('i')
+        self._last_index: int | None = None
+        self._last_token: Token | None = None
+
+    def append(self, token: Token):
+        code = _TYPE_CODES[token.type]
+        self.types.append(code)
+        self.offsets.append(token.offset)
+        self.lengths.append(-1 if token.value is None else len(token.value))
+        self.lines.append(token.line)
+        self.columns.append(token.column)
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, index: int) -> Token:
+        # The parser asks for the same token several times in a row, so the last one is kept
+        if index == self._last_index:
+            return self._last_token
+        if index < 0:
+            index += len(self.types)
+        code = self.types[index] # raises IndexError past the end, like a list
+        offset = self.offsets[index]
+        length = self.lengths[index]
+        if length < 0:
+            value = None
+        else:
+            start = offset + 1 if code in _QUOTED else offset
+            value = self.source[start:start + length]
+        token = Token(_CODE_TYPES[code], value, self.lines[index], self.columns[index], offset)
+        self._last_index = index
+        self._last_token = token
+        return token
+
+
+def tokenize_compact(code: str, lsp_mode = False) -> TokenStream:
+    tokens = TokenStream(code)
+    # Same as TokenStream.append, unrolled since this runs once per token
+    types, offsets, lengths, lines, columns = (column.append for column in (
+        tokens.types, tokens.offsets, tokens.lengths, tokens.lines, tokens.columns))
+    type_codes = _TYPE_CODES
+    for token in _scan((code,), lsp_mode):
+        value = token.value
+        types(type_codes[token.type])
+        offsets(token.offset)
+        lengths(-1 if value is None else len(value))
+        lines(token.line)
+        columns(token.column)
+    return tokens
+
+
+LEXERS = {"char": tokenize, "regex": tokenize_regex, "stream": tokenize_iter, "compact": tokenize_compact}
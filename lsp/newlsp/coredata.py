@@ -3,7 +3,7 @@ from enum import Enum
 from typing import TypeAlias, TypedDict
 from lsprotocol.types import Position, Range
 
-from lexing import Token
+from lexing import SourceText, Token
 
 class ParserExceptionLocation(TypedDict):
     line: int
@@ -49,11 +49,15 @@ builtin_fns: list[tuple[str, str, str]] = [
     ("debug_print", "(...val: string) -> null", "Prints the message(s) to stdout, useful for debugging."),
     ("raw_print", "(...val: string) -> null", "Prints the message(s) to stdout without a newline at the end."),
     ("input", "(prompt: string) -> string", "Prompts the user for input and returns it as a string."),
-    ("gravox_heapusage", "() -> number", "Returns the current heap usage in bytes."),
+    ("gravox_heapusage", "(stat: string?) -> any", "Returns the bytes in use on the heap, or the named heap statistic: live, free, top, size, blocks, free_blocks, largest_free, fragmentation, allocations, reused (\"stats\" for all of them)."),
     ("gravox_heapsize", "() -> number", "Returns the total heap size in bytes."),
     ("gravox_dump_heap", "() -> any[]", "Dumps the current heap memory as an array."),
+    ("gravox_load", "(address: int, type: string) -> any", "Reads the value of the given type stored at an address. With --memory=bytes any address can be read; otherwise it must hold a variable."),
+    ("gravox_store", "(address: int, type: string, value: any) -> null", "Writes a value of the given type at an address (see gravox_load)."),
+    ("gravox_memcopy", "(destination: int, source: int, size: int) -> null", "Copies size bytes of memory from source to destination. Without --memory=bytes, the variables in the range are copied instead."),
     ("clear_screen", "() -> null", "Clears the console screen."),
     ("_array_push", "(array: any[], value: any) -> null", "[INTERNAL]: Use `Array.push` from `stdlib`."),
+    ("_array_extend", "(array: any[], items: any[]) -> any[]", "[INTERNAL]: Use `Array.extend` from `stdlib`."),
     ("_file_exec", "(file: string, mode: string, arg: string?) -> any", "[INTERNAL]: Use `fs` from `stdlib`."),
     ("_json_exec", "(op: string, contents: any) -> any", "[INTERNAL]: Use `json` from `stdlib`."),
     ("_get_nth_element", "(array: any[], index: int<any>) -> any", "[INTERNAL]: Use `Array.get` from `stdlib`."),
@@ -79,7 +83,7 @@ builtin_types: list[BuiltinType] = [
     ("float32", "A 32-bit floating-point number."),
     ("float64", "A 64-bit floating-point number."),
     ("char", "A single character."),
-    ("array", "An array of elements of any type."),
+    ("array", "An array of elements of any type. `array<T>` (e.g. `array<int32>`) holds numbers of one type compactly."),
     ("Result", "[Deprecated]: Use `try/catch`. A result type that can be either a success or an error."),
     ("null", "A null value, representing the absence of a value.")
 ]
@@ -88,3 +92,13 @@ def single_range(pos: Position | ParserExceptionLocation):
     if isinstance(pos, dict):
         pos = Position(pos["line"], pos["column"])
     return Range(pos, pos)
+
+
+def position_offset(text: SourceText, pos: Position) -> int:
+    """Index in `text` of an LSP position (line, UTF-16 character)."""
+    line_start = text.line_start(pos.line)
+    line = text.line(pos.line)
+    if line.isascii():
+        return line_start + min(pos.character, len(line))
+    units = line.encode("utf-16-le")[:pos.character * 2]
+    return line_start + len(units.decode("utf-16-le", errors="ignore"))
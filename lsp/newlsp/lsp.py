@@ -6,15 +6,16 @@ from lsprotocol.types import * # type: ignore
 import re
 
 from grvast import ProgramNode
-from lexing import tokenize
+from lexing import SourceText, TokenRope, relex, tokenize_regex
 from lsp.newlsp.analysis import StaticAnalyser
-from lsp.newlsp.coredata import ParserException, RuntimeContext, single_range, builtin_fns, builtin_types
+from lsp.newlsp.coredata import ParserException, RuntimeContext, single_range, builtin_fns, builtin_types, position_offset
 from parser import Parser
 
 class NewLSP(LanguageServer):
     def __init__(self):
         super().__init__("Gravox LSP", "2.0.0")
-        self.files: dict[str, str] = {} # { uri: text }
+        self.files: dict[str, SourceText] = {} # { uri: text }
+        self.tokens: dict[str, TokenRope] = {} # { uri: tokens of files[uri] }, kept up to date by relex
         self.ast: dict[str, ProgramNode] = {} # { uri: program }
         self.data_table: dict[str, RuntimeContext] = {}
 
@@ -22,12 +23,14 @@ class NewLSP(LanguageServer):
         text = self.files.get(uri)
         if not text:
             if fallback:
-                text = fallback
+                text = SourceText(fallback)
                 self.files[uri] = text
             else:
                 raise FileNotFoundError()
         try:
-            parser = Parser(tokenize(text, True), True)
+            if uri not in self.tokens:
+                self.tokens[uri] = TokenRope(tokenize_regex(str(text), True))
+            parser = Parser(self.tokens[uri], True)
         except Exception as e:
             try:
                 error = loads(str(e))
@@ -46,6 +49,21 @@ class NewLSP(LanguageServer):
             error_detail['loc'] = {"column": error_detail['loc']["column"] - 1, "line": error_detail['loc']["line"] - 1}
             self.publish_diagnostics(uri, [Diagnostic(single_range(error_detail["loc"]), f"{error_detail["fn"]}: " + (f"Unexpected {error_detail["got"]} (expected {error_detail["expect"]})" if error_detail["expect"] != "unexpected" else f"Unexpected {error_detail['got']}"))])
     
+    def apply_change(self, uri: str, change: TextDocumentContentChangeEvent):
+        text = self.files.get(uri)
+        if text is None or getattr(change, "range", None) is None: # whole document
+            self.files[uri] = SourceText(change.text)
+            self.tokens.pop(uri, None)
+            return
+        start = position_offset(text, change.range.start)
+        old_end = position_offset(text, change.range.end)
+        text.replace(start, old_end, change.text)
+        if uri in self.tokens:
+            try:
+                relex(self.tokens[uri], text, start, old_end, start + len(change.text), True)
+            except Exception:
+                del self.tokens[uri] # evaluate_ast lexes from scratch and reports the error
+
     def evaluate_runtime(self, uri: str):
         ast = self.ast.get(uri)
         if not ast:
@@ -137,7 +155,7 @@ def on_initialise(ls: NewLSP, _: InitializeParams) -> InitializeResult:
     ls.show_message("[grvlsp] initialised")
     return InitializeResult(
         ServerCapabilities(
-            text_document_sync = TextDocumentSyncKind.Full, 
+            text_document_sync = TextDocumentSyncKind.Incremental, 
             completion_provider = CompletionOptions(
                 resolve_provider=False,
                 trigger_characters=['.']
@@ -149,19 +167,25 @@ def on_initialise(ls: NewLSP, _: InitializeParams) -> InitializeResult:
 def did_open(ls: NewLSP, params: DidOpenTextDocumentParams):
     # ls.text = params.text_document.text
     ls.publish_diagnostics(params.text_document.uri, [])
-    ls.files[params.text_document.uri] = params.text_document.text
+    ls.files[params.text_document.uri] = SourceText(params.text_document.text)
+    ls.tokens.pop(params.text_document.uri, None)
     ls.evaluate_ast(params.text_document.uri, params.text_document.text)
     la = ls.evaluate_runtime(params.text_document.uri)
     ls.publish_diagnostics(params.text_document.uri, la.diagnostics)
 
 @server.feature(TEXT_DOCUMENT_DID_CHANGE)
 def did_change(ls: NewLSP, params: DidChangeTextDocumentParams):
-    doc = ls.workspace.get_text_document(params.text_document.uri)
+    uri = params.text_document.uri
+    doc = ls.workspace.get_text_document(uri)
     full_text = doc.source
     # ls.show_message_log("FT: " + full_text)
-    ls.publish_diagnostics(params.text_document.uri, [])
-    ls.files[params.text_document.uri] = full_text
-    ls.evaluate_ast(params.text_document.uri, full_text)
+    ls.publish_diagnostics(uri, [])
+    for change in params.content_changes:
+        ls.apply_change(uri, change)
+    if len(ls.files[uri]) != len(full_text): # out of sync with the workspace (a length check: comparing the text would cost a full pass); start over
+        ls.files[uri] = SourceText(full_text)
+        ls.tokens.pop(uri, None)
+    ls.evaluate_ast(uri, full_text)
     la = ls.evaluate_runtime(params.text_document.uri)
     ls.publish_diagnostics(params.text_document.uri, la.diagnostics)
 
@@ -0,0 +1,84 @@
+import marshal
+from hashlib import sha256
+from pathlib import Path
+from pickle import HIGHEST_PROTOCOL, PickleError, dumps, loads
+from sys import version_info
+from types import CodeType
+from typing import Any, Callable
+
+from grvast import ProgramNode
+from lexing import tokenize_iter
+from parser import Parser
+
+# Parsed modules are cached next to their source, like __pycache__:
+#   __gravoxcache__/<module>.<tag>.gxc = sha256(source) + pickled ProgramNode
+#   __gravoxcache__/<module>.<tag>.gxp = sha256(source) + marshalled code object (transpiled module)
+CACHE_DIR = "__gravoxcache__"
+# Anything that changes what a module compiles to; the parser embeds enums.EnumMember values in the AST.
+# Optimized ASTs aren't cached (imported modules are run as parsed), so optimizer.py isn't listed.
+_FRONTEND = ("lexing.py", "parser.py", "grvast.py", "enums.py", "transpiler.py")
+_tag: str | None = None
+
+
+def cache_tag() -> str:
+    """Interpreter version the cache entries are valid for: a fingerprint of the lexer, parser, AST,
+    enum member and transpiler sources plus the Python version (pickles and code objects depend on both)."""
+    global _tag
+    if _tag is None:
+        digest = sha256()
+        for name in _FRONTEND:
+            digest.update((Path(__file__).parent / name).read_bytes())
+        _tag = f"gravox-{digest.hexdigest()[:12]}-py{version_info.major}{version_info.minor}"
+    return _tag
+
+
+def cache_path(path: Path, suffix: str = "gxc") -> Path:
+    return path.parent / CACHE_DIR / f"{path.stem}.{cache_tag()}.{suffix}"
+
+
+def load_module(path: Path) -> ProgramNode:
+    """Parses the module at `path`, or loads it from the cache if its source hasn't changed.
+    Unreadable, stale or corrupt entries are ignored and rewritten."""
+    return _load_cached(path, "gxc", lambda source: Parser(tokenize_iter(source)).parse_program(),
+                        lambda program: dumps(program, HIGHEST_PROTOCOL), loads, ProgramNode)
+
+
+def load_code(path: Path, compile_source: Callable[[str], CodeType]) -> CodeType:
+    """Like `load_module`, for the Python code object `compile_source` builds from the module's
+    source (see transpiler.py)."""
+    return _load_cached(path, "gxp", compile_source, marshal.dumps, marshal.loads, CodeType)
+
+
+def _load_cached(path: Path, suffix: str, build: Callable[[str], Any], dump: Callable[[Any], bytes],
+                 load: Callable[[bytes], Any], kind: type) -> Any:
+    source = path.read_text()
+    source_hash = sha256(source.encode()).digest()
+    cached = cache_path(path, suffix)
+    try:
+        data = cached.read_bytes()
+        if data[:len(source_hash)] == source_hash:
+            result = load(data[len(source_hash):])
+            if isinstance(result, kind):
+                return result
+    except (OSError, PickleError, EOFError, AttributeError, ImportError, IndexError, TypeError, ValueError):
+        pass
+    result = build(source)
+    write_cache(cached, source_hash, result, dump)
+    return result
+
+
+def write_cache(cached: Path, source_hash: bytes, result: Any, dump: Callable[[Any], bytes]):
+    try:
+        data = source_hash + dump(result)
+    except (PickleError, RecursionError, ValueError): # pathologically deep programs just don't get cached
+        return
+    try:
+        cached.parent.mkdir(exist_ok=True)
+        for stale in cached.parent.glob(f"{cached.name.split('.', 1)[0]}.*{cached.suffix}"):
+            if stale != cached:
+                stale.unlink(missing_ok=True)
+        partial = cached.with_suffix(cached.suffix + ".tmp")
+        partial.write_bytes(data)
+        partial.replace(cached) # atomic, so a concurrent run never reads half a file
+    except OSError: # read-only location: run uncached
+        pass
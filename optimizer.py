@@ -0,0 +1,267 @@
+from typing import Any
+
+from grvast import ArrayIndexNode, ASTNode, BinaryOpNode, BlockNode, CharLiteralNode, EnumDefNode, FloatLiteralNode, \
+    FreeMemoryNode, FunctionCallNode, FunctionDefNode, IdentifierNode, IfStatementNode, ImportNode, IntLiteralNode, \
+    LetMemoryNode, MethodCallNode, NullLiteralNode, PointerRefNode, ProgramNode, SpawnTaskNode, StringLiteralNode, \
+    StructDefNode, StructFieldAccessNode, TypeCastNode, UnaryOpNode, VarAssignNode, VarDeclarationNode, \
+    WhileLoopNode, walk
+from interpreter import BINARY_OPERATIONS, UNARY_OPERATIONS, ZERO_DIVISION_ERRORS
+from lexing import TokenType
+from typedesc import SCALAR_TYPES
+
+LITERALS = (IntLiteralNode, FloatLiteralNode, StringLiteralNode, CharLiteralNode, NullLiteralNode)
+NOT_CONSTANT = object()
+# Fields that name something rather than hold a value: a constant is never put in their place
+NAME_FIELDS = {
+    FunctionCallNode: ("func_name",),
+    FunctionDefNode: ("func_name",),
+    MethodCallNode: ("instance_expr",),
+    ArrayIndexNode: ("array_name",),
+    StructFieldAccessNode: ("struct_var_name",),
+}
+
+
+def optimize(program: ProgramNode) -> dict[str, int]:
+    """Simplifies a parsed program in place, before it is run, without changing what it does:
+
+    - constant folding: operators on literals, and casts of literals to the scalar types, are
+      worked out once (`60 * 60 * 1000` becomes `3600000`), except where they would fail at run
+      time or give a comparison result (there's no literal for those); a declaration's literal
+      initializer is pre-converted to the variable's scalar type;
+    - dead branches: `if`/`elif` arms whose condition is a constant false are dropped, and so is
+      everything after an arm whose condition is a constant true, which becomes the `else`. An
+      `if` left with only its `else` is replaced by that block, and one left with nothing, or a
+      `while` whose condition is false, is removed;
+    - constant propagation: a global declared once at the top level with a constant value of a
+      scalar or string type, which is never assigned, freed, pointed to or redeclared (not even
+      as a local or parameter) and not followed by an `import`, is read as its value in the
+      statements after its declaration, including the functions defined there.
+
+    Returns how many nodes there were ("nodes") and were removed ("removed"), and how many
+    expressions were folded, branches eliminated and constants propagated."""
+    optimizer = _Optimizer(program)
+    nodes = sum(1 for _ in walk(program))
+    program.statements = optimizer.statements(program.statements, top_level=True)
+    return {"nodes": nodes, "removed": nodes - sum(1 for _ in walk(program)), "folded": optimizer.folded,
+            "branches": optimizer.branches, "propagated": optimizer.propagated}
+
+
+def literal(value: Any, node: ASTNode) -> ASTNode | None:
+    # A literal node for `value`, at `node`'s position; None if no literal has that value
+    if value.__class__ is int:
+        return IntLiteralNode(value, node.line, node.column)
+    if value.__class__ is float:
+        return FloatLiteralNode(value, node.line, node.column)
+    if value.__class__ is str:
+        return StringLiteralNode(value, node.line, node.column)
+    return None
+
+
+def constant_value(node: ASTNode) -> Any:
+    """The value of a literal, or of an operator applied to literals; NOT_CONSTANT if it isn't
+    known before the program runs, or working it out would fail (the failure is left for run time)."""
+    if isinstance(node, LITERALS):
+        return None if isinstance(node, NullLiteralNode) else node.value
+    if isinstance(node, BinaryOpNode) and (operation := BINARY_OPERATIONS.get(node.op)):
+        left, right = constant_value(node.left_expr), constant_value(node.right_expr)
+        if left is NOT_CONSTANT or right is NOT_CONSTANT:
+            return NOT_CONSTANT
+        if node.op in ZERO_DIVISION_ERRORS and right == 0:
+            return NOT_CONSTANT
+        # Don't build huge values ahead of time for code that may never run
+        if node.op == TokenType.MULTIPLY and (left.__class__ is str or right.__class__ is str):
+            return NOT_CONSTANT
+        if node.op == TokenType.LSHIFT and right.__class__ is int and right > 64:
+            return NOT_CONSTANT
+        try:
+            return operation(left, right)
+        except Exception:
+            return NOT_CONSTANT
+    if isinstance(node, UnaryOpNode) and (operation := UNARY_OPERATIONS.get(node.op)):
+        value = constant_value(node.expr)
+        if value is NOT_CONSTANT:
+            return NOT_CONSTANT
+        try:
+            return operation(value)
+        except Exception:
+            return NOT_CONSTANT
+    return NOT_CONSTANT
+
+
+def scalar_literal(data_type: str, value: Any, node: ASTNode) -> ASTNode | None:
+    # `value` cast to the scalar type `data_type` (see typedesc.SCALAR_TYPES) as a literal; None if
+    # it's not a scalar type or the cast would fail
+    if (descriptor := SCALAR_TYPES.get(data_type)) is None or value is None:
+        return None
+    try:
+        value = descriptor.cast(value)
+    except (ValueError, TypeError, OverflowError):
+        return None
+    return CharLiteralNode(value, node.line, node.column) if data_type == "char" else literal(value, node)
+
+
+def constant_candidates(program: ProgramNode) -> set[str]:
+    # Globals that are declared once, at the top level, and never assigned, freed, pointed to or
+    # declared again as a local or parameter
+    top_level = {id(statement) for statement in program.statements}
+    declared: dict[str, int] = {}
+    excluded = {"self", "e"} # `e` is bound by every `catch`
+    for node in walk(program):
+        if isinstance(node, (LetMemoryNode, VarDeclarationNode)):
+            declared[node.var_name] = declared.get(node.var_name, 0) + 1
+            if id(node) not in top_level:
+                excluded.add(node.var_name)
+        elif isinstance(node, (FunctionDefNode, SpawnTaskNode)):
+            excluded.update(name for name, _ in node.params)
+        elif isinstance(node, VarAssignNode):
+            excluded.add(node.var_name.split(".", 1)[0])
+        elif isinstance(node, FreeMemoryNode):
+            excluded.add(node.var_name)
+        elif isinstance(node, UnaryOpNode) and node.op == TokenType.POINTER_REF and isinstance(node.expr, IdentifierNode):
+            excluded.add(node.expr.name)
+        elif isinstance(node, PointerRefNode):
+            excluded.add(str(node.var_name))
+    return {name for name, count in declared.items() if count == 1 and name not in excluded}
+
+
+class _Optimizer:
+    def __init__(self, program: ProgramNode) -> None:
+        self.candidates = constant_candidates(program)
+        # Only top-level `import`s before a declaration leave it a constant (an import brings in
+        # the module's globals); strings only while no struct or enum can be called "string"
+        self.imports = sum(1 for node in walk(program) if isinstance(node, ImportNode))
+        self.string_constants = not self.imports and not any(
+            (node.struct_name if isinstance(node, StructDefNode) else node.enum_name) == "string"
+            for node in walk(program) if isinstance(node, (StructDefNode, EnumDefNode)))
+        self.constants: dict[str, ASTNode] = {} # {global: the literal it's read as}
+        self.folded = self.branches = self.propagated = 0
+        self.visitors = {
+            IdentifierNode: self.identifier,
+            BinaryOpNode: self.expression,
+            UnaryOpNode: self.unary_op,
+            TypeCastNode: self.type_cast,
+            LetMemoryNode: self.declaration,
+            VarDeclarationNode: self.declaration,
+            IfStatementNode: self.if_statement,
+            WhileLoopNode: self.while_loop,
+        }
+
+    def statements(self, statements: list[ASTNode], top_level=False) -> list[ASTNode]:
+        optimized = []
+        for statement in statements:
+            if top_level and isinstance(statement, ImportNode):
+                self.imports -= 1
+            if (statement := self.visit(statement)) is not None:
+                optimized.append(statement)
+            if top_level and isinstance(statement, (LetMemoryNode, VarDeclarationNode)):
+                self.declare_constant(statement)
+        return optimized
+
+    def visit(self, node):
+        if visitor := self.visitors.get(type(node)):
+            return visitor(node)
+        self.children(node)
+        return node
+
+    def children(self, node: ASTNode):
+        # Optimizes the children of `node` in place; statements that are dropped leave their list
+        skipped = NAME_FIELDS.get(type(node), ())
+        for cls in type(node).__mro__[-3::-1]: # as grvast.iter_child_nodes
+            for field in cls.__dict__.get("__slots__", ()):
+                if field in skipped:
+                    continue
+                value = getattr(node, field, None)
+                if isinstance(value, ASTNode):
+                    setattr(node, field, self.visit(value))
+                elif isinstance(value, list) and any(isinstance(item, ASTNode) for item in value):
+                    if isinstance(node, (ProgramNode, BlockNode)):
+                        setattr(node, field, self.statements(value))
+                    else:
+                        setattr(node, field, [self.visit(item) if isinstance(item, ASTNode) else item for item in value])
+
+    def fold(self, node: ASTNode) -> ASTNode:
+        # `node` (its operands already optimized) as a literal, if it has a constant value
+        value = constant_value(node)
+        if value is NOT_CONSTANT or (replacement := literal(value, node)) is None:
+            return node
+        self.folded += 1
+        return replacement
+
+    # --- Expressions ---
+    def identifier(self, node: IdentifierNode) -> ASTNode:
+        if (value := self.constants.get(node.name)) is None:
+            return node
+        self.propagated += 1
+        return type(value)(value.value, node.line, node.column)
+
+    def expression(self, node: BinaryOpNode) -> ASTNode:
+        node.left_expr = self.visit(node.left_expr)
+        node.right_expr = self.visit(node.right_expr)
+        return self.fold(node)
+
+    def unary_op(self, node: UnaryOpNode) -> ASTNode:
+        if node.op not in UNARY_OPERATIONS:
+            return node # pointers: the operand is a variable, not a value
+        node.expr = self.visit(node.expr)
+        return self.fold(node)
+
+    def type_cast(self, node: TypeCastNode) -> ASTNode:
+        node.expression = self.visit(node.expression)
+        value = constant_value(node.expression)
+        if value is NOT_CONSTANT or (replacement := scalar_literal(node.target_type, value, node)) is None:
+            return node
+        self.folded += 1
+        return replacement
+
+    # --- Statements ---
+    def declaration(self, node: LetMemoryNode | VarDeclarationNode) -> ASTNode:
+        if node.value_expr is not None:
+            node.value_expr = self.visit(node.value_expr)
+            if isinstance(node.value_expr, LITERALS) and \
+                    (converted := scalar_literal(node.data_type, node.value_expr.value, node.value_expr)) is not None:
+                node.value_expr = converted # pre-converted to the variable's type
+        return node
+
+    def declare_constant(self, node: LetMemoryNode | VarDeclarationNode):
+        if node.var_name not in self.candidates or self.imports or not isinstance(node.value_expr, LITERALS):
+            return
+        if SCALAR_TYPES.get(node.data_type) is not None:
+            if (value := scalar_literal(node.data_type, node.value_expr.value, node.value_expr)) is not None:
+                self.constants[node.var_name] = value
+        elif node.data_type == "string" and self.string_constants and isinstance(node.value_expr, StringLiteralNode):
+            self.constants[node.var_name] = node.value_expr
+
+    def if_statement(self, node: IfStatementNode) -> ASTNode | None:
+        arms = [] # the arms left, and what's left to run when none of them is taken
+        else_block = node.else_block
+        all_arms = [(node.condition, node.then_block)] + list(node.elif_blocks)
+        for index, (condition, block) in enumerate(all_arms):
+            condition = self.visit(condition)
+            value = constant_value(condition)
+            if value is NOT_CONSTANT:
+                arms.append((condition, block))
+            elif not value:
+                self.branches += 1
+            else: # always taken: it's the `else` now, and the arms after it are never reached
+                self.branches += len(all_arms) - index - 1 + (else_block is not None)
+                else_block = block
+                break
+        for _, block in arms:
+            self.visit(block)
+        if else_block is not None:
+            self.visit(else_block)
+        if not arms:
+            return else_block # None: nothing left to run
+        node.condition, node.then_block = arms[0]
+        node.elif_blocks = arms[1:]
+        node.else_block = else_block
+        return node
+
+    def while_loop(self, node: WhileLoopNode) -> ASTNode | None:
+        node.condition = self.visit(node.condition)
+        value = constant_value(node.condition)
+        if value is not NOT_CONSTANT and not value:
+            self.branches += 1
+            return None
+        self.visit(node.loop_block)
+        return node
@@ -1,3 +1,5 @@
+from collections import deque
+from collections.abc import Iterable, Sequence
 from json import dumps
 from typing import cast
 from grvast import ASTNode, MethodCallNode, StructFieldAccessNode, StringLiteralNode, IdentifierNode, CharLiteralNode, \
@@ -7,17 +9,72 @@ from grvast import ASTNode, MethodCallNode, StructFieldAccessNode, StringLiteral
     ArrayLiteralNode, ArrayIndexNode
 from lexing import Token, TokenType, DATA_TYPES
 
+# Binary operator binding powers, loosest first; every level is left-associative.
+# (MULTIPLY and AND are listed for completeness: the lexer emits '*' and '&' as the pointer operators.)
+BINDING_POWER: dict[TokenType, int] = {
+    TokenType.OR: 1,
+    TokenType.XOR: 2,
+    TokenType.AND: 3,
+    TokenType.EQUAL: 4, TokenType.NOT_EQUAL: 4,
+    TokenType.GREATER_THAN: 5, TokenType.LESS_THAN: 5, TokenType.GREATER_EQUAL: 5, TokenType.LESS_EQUAL: 5,
+    TokenType.LSHIFT: 6, TokenType.RSHIFT: 6,
+    TokenType.PLUS: 7, TokenType.MINUS: 7,
+    TokenType.MULTIPLY: 8, TokenType.DIVIDE: 8, TokenType.MODULO: 8,
+}
+UNARY_OPERATORS = frozenset((TokenType.MINUS, TokenType.BIT_NOT, TokenType.POINTER_DEREF, TokenType.POINTER_REF))
+# `*` and `&` are always lexed as pointer operators; between two operands they multiply and bitwise-and
+INFIX_ALIASES = {TokenType.POINTER_DEREF: TokenType.MULTIPLY, TokenType.POINTER_REF: TokenType.AND}
+
+
+class TokenWindow:
+    """
+    Indexable view over a token iterator that only keeps the last `size` tokens it pulled.
+    The parser looks at most three tokens past the current one (to recognise `array<T>`), so a
+    window of four is enough and a streamed file never has to be lexed into a full list.
+    """
+    def __init__(self, tokens: Iterable[Token], size = 4):
+        self.source = iter(tokens)
+        self.buffer: deque[Token] = deque()
+        self.base = 0 # absolute index of buffer[0]
+        self.size = size
+        self.last: Token | None = None
+        self.exhausted = False
+
+    def __getitem__(self, index: int) -> Token:
+        if index < 0: # tokens[-1]: the EOF token, once the source has run dry
+            if not self.exhausted or self.last is None:
+                raise IndexError("token window only supports [-1] after the last token")
+            return self.last
+        offset = index - self.base
+        if offset < 0:
+            raise LookupError(f"token {index} has already left the lookahead window")
+        buffer = self.buffer
+        while offset >= len(buffer):
+            token = next(self.source, None)
+            if token is None:
+                self.exhausted = True
+                raise IndexError("token index out of range")
+            buffer.append(token)
+            self.last = token
+            if len(buffer) > self.size:
+                buffer.popleft()
+                self.base += 1
+                offset -= 1
+        return buffer[offset]
+
+
 class Parser:
-    def __init__(self, tokens: list[Token], lsp_mode = False):
-        self.tokens = tokens
+    def __init__(self, tokens: Iterable[Token], lsp_mode = False):
+        # Lists and TokenStreams are indexed directly; anything else (e.g. tokenize_iter) is pulled through a window
+        self.tokens = tokens if isinstance(tokens, Sequence) else TokenWindow(tokens)
         self.current_token_index = 0
         self.lsp_mode = lsp_mode
 
     def peek(self, offset=0) -> Token | None:
-        index = self.current_token_index + offset
-        if index < len(self.tokens):
-            return self.tokens[index]
-        return None
+        try:
+            return self.tokens[self.current_token_index + offset]
+        except IndexError:
+            return None
 
     def consume(self, token_type):
         token = self.current_token()
@@ -30,6 +87,8 @@ class Parser:
 
     def consume_data_type(self):
         token = self.current_token()
+        if token.type == TokenType.ARRAY and self.is_array_type(TokenType.GREATER_THAN):
+            return self.consume_array_type(TokenType.GREATER_THAN)
         if token.type in [
             *DATA_TYPES.values(),
             TokenType.IDENTIFIER # Also allow generic IDENTIFIER for custom types
@@ -40,19 +99,33 @@ class Parser:
             raise Exception(dumps({"fn": "consume_data_type", "expect": "datatype", "got": repr(token.type), "loc": {'line': token.line, 'column': token.column}}))
         raise Exception(f"Expected data type, but got {token.type} at {token.line}:{token.column}")
 
+    def is_array_type(self, closing):
+        # At `array<T>` (closed by `closing`): an element-typed array
+        peek = self.peek(1), self.peek(2), self.peek(3)
+        return all(peek) and peek[0].type == TokenType.LESS_THAN and peek[1].type in DATA_TYPES.values() \
+            and peek[2].type == closing
+
+    def consume_array_type(self, closing):
+        # `array<T>` as one data type token, "array<T>"
+        array_token = self.consume(TokenType.ARRAY)
+        self.consume(TokenType.LESS_THAN)
+        element_token = self.consume(self.current_token().type)
+        self.consume(closing)
+        return Token(TokenType.ARRAY, f"array<{element_token.value}>", array_token.line, array_token.column,
+                     array_token.offset)
+
     def current_token(self):
-        if self.current_token_index < len(self.tokens):
+        try:
             return self.tokens[self.current_token_index]
-        return self.tokens[-1] # EOF token
+        except IndexError:
+            return self.tokens[-1] # EOF token
 
     def parse_program(self):
         statements = []
         while self.current_token().type != TokenType.EOF:
             statements.append(self.parse_statement())
-        node = ProgramNode(statements)
-        node.line = statements[0].line if statements else 1 - 1
-        node.column = statements[0].column if statements else 1 - 1
-        return node
+        line, column = (statements[0].line, statements[0].column) if statements else (1 - 1, 1 - 1)
+        return ProgramNode(statements, line, column)
 
     def parse_block(self):
         lbrace = self.consume(TokenType.LBRACE)
@@ -60,19 +133,13 @@ class Parser:
         while self.current_token().type != TokenType.RBRACE:
             statements.append(self.parse_statement())
         self.consume(TokenType.RBRACE)
-        node = BlockNode(statements)
-        node.line = lbrace.line - 1
-        node.column = lbrace.column - 1
-        return node
+        return BlockNode(statements, lbrace.line - 1, lbrace.column - 1)
 
     def parse_import(self):
         import_token = self.consume(TokenType.IMPORT)
         module_name = self.consume(TokenType.IDENTIFIER)
         self.consume(TokenType.SEMICOLON)
-        node = ImportNode(module_name.value)
-        node.line = import_token.line - 1
-        node.column = import_token.column - 1
-        return node
+        return ImportNode(module_name.value, import_token.line - 1, import_token.column - 1)
 
     def parse_statement(self):
         token = self.current_token()
@@ -122,10 +189,7 @@ class Parser:
         if self.current_token().type == TokenType.CATCH:
             self.consume(TokenType.CATCH)
             catch_block = self.parse_block()
-        node = TryNode(try_block, catch_block)
-        node.line = try_token.line - 1
-        node.column = try_token.column - 1
-        return node
+        return TryNode(try_block, catch_block, try_token.line - 1, try_token.column - 1)
 
     def parse_variable_declaration(self):
         let_token = self.consume(TokenType.LET)
@@ -137,29 +201,20 @@ class Parser:
             self.consume(TokenType.ASSIGN)
             value_expr = self.parse_expression()
         self.consume(TokenType.SEMICOLON)
-        node = LetMemoryNode(var_name_token.value, data_type_token.value, value_expr)
-        node.line = let_token.line - 1
-        node.column = let_token.column - 1
-        return node
+        return LetMemoryNode(var_name_token.value, data_type_token.value, value_expr, let_token.line - 1, let_token.column - 1)
 
     def parse_memory_free(self):
         free_token = self.consume(TokenType.FREE)
         var_name_token = self.consume(TokenType.IDENTIFIER)
         self.consume(TokenType.SEMICOLON)
-        node = FreeMemoryNode(var_name_token.value)
-        node.line = free_token.line - 1
-        node.column = free_token.column - 1
-        return node
+        return FreeMemoryNode(var_name_token.value, free_token.line - 1, free_token.column - 1)
 
     def parse_variable_assignment(self):
         var_name_token = self.consume(TokenType.IDENTIFIER)
         assign_token = self.consume(TokenType.ASSIGN)
         value_expr = self.parse_expression()
         self.consume(TokenType.SEMICOLON)
-        node = VarAssignNode(var_name_token.value, value_expr)
-        node.line = var_name_token.line - 1
-        node.column = var_name_token.column - 1
-        return node
+        return VarAssignNode(var_name_token.value, value_expr, var_name_token.line - 1, var_name_token.column - 1)
 
     def parse_function_definition(self):
         def_token = self.consume(TokenType.DEF)
@@ -181,10 +236,7 @@ class Parser:
         self.consume(TokenType.ARROW)
         return_type_token = self.consume_data_type()
         body = self.parse_block()
-        node = FunctionDefNode(func_name_token.value, params, return_type_token.value, body)
-        node.line = def_token.line - 1
-        node.column = def_token.column - 1
-        return node
+        return FunctionDefNode(func_name_token.value, params, return_type_token.value, body, def_token.line - 1, def_token.column - 1)
 
     def parse_function_call_statement(self):  # Function call used as statement (e.g., function());
         func_call = self.parse_postfix_expression()  # This will handle the function call
@@ -196,10 +248,7 @@ class Parser:
         return_token = self.consume(TokenType.RETURN)
         return_expr = self.parse_expression()
         self.consume(TokenType.SEMICOLON)
-        node = ReturnNode(return_expr)
-        node.line = return_token.line - 1
-        node.column = return_token.column - 1
-        return node
+        return ReturnNode(return_expr, return_token.line - 1, return_token.column - 1)
 
     def parse_if_statement(self):
         if_token = self.consume(TokenType.IF)
@@ -215,19 +264,13 @@ class Parser:
         if self.current_token().type == TokenType.ELSE:
             self.consume(TokenType.ELSE)
             else_block = self.parse_block()
-        node = IfStatementNode(condition, then_block, else_block, elif_blocks)
-        node.line = if_token.line - 1
-        node.column = if_token.column - 1
-        return node
+        return IfStatementNode(condition, then_block, else_block, elif_blocks, if_token.line - 1, if_token.column - 1)
 
     def parse_while_loop(self):
         while_token = self.consume(TokenType.WHILE)
         condition = self.parse_expression()
         loop_block = self.parse_block()
-        node = WhileLoopNode(condition, loop_block)
-        node.line = while_token.line - 1
-        node.column = while_token.column - 1
-        return node
+        return WhileLoopNode(condition, loop_block, while_token.line - 1, while_token.column - 1)
 
     def parse_for_loop(self):
         for_token = self.consume(TokenType.FOR)
@@ -238,20 +281,17 @@ class Parser:
         increment_stmt = self.parse_statement()
         self.consume(TokenType.RPAREN)
         loop_block = self.parse_block()
-        node = ForLoopNode(init_stmt, condition_expr, increment_stmt, loop_block)
-        node.line = for_token.line - 1
-        node.column = for_token.column - 1
-        return node
+        return ForLoopNode(init_stmt, condition_expr, increment_stmt, loop_block, for_token.line - 1, for_token.column - 1)
 
     def parse_type_cast(self):
         lt_token = self.consume(TokenType.LESS_THAN)
-        target_type_token = self.consume_data_type()
-        self.consume(TokenType.GREATER_THAN)
+        if self.current_token().type == TokenType.ARRAY and self.is_array_type(TokenType.RSHIFT):
+            target_type_token = self.consume_array_type(TokenType.RSHIFT) # `<array<int32>>x`: `>>` closes both
+        else:
+            target_type_token = self.consume_data_type()
+            self.consume(TokenType.GREATER_THAN)
         expression = self.parse_atom()
-        node = TypeCastNode(target_type_token.value, expression)
-        node.line = lt_token.line - 1
-        node.column = lt_token.column - 1
-        return node
+        return TypeCastNode(target_type_token.value, expression, lt_token.line - 1, lt_token.column - 1)
 
     def parse_struct_definition(self):
         struct_token = self.consume(TokenType.STRUCT)
@@ -269,10 +309,7 @@ class Parser:
                 self.consume(TokenType.SEMICOLON)
                 fields.append((field_name_token.value, field_type_token.value))
         self.consume(TokenType.RBRACE)
-        node = StructDefNode(struct_name_token.value, fields, functions)
-        node.line = struct_token.line - 1
-        node.column = struct_token.column - 1
-        return node
+        return StructDefNode(struct_name_token.value, fields, functions, struct_token.line - 1, struct_token.column - 1)
 
     def parse_enum_definition(self):
         enum_token = self.consume(TokenType.ENUM)
@@ -284,10 +321,7 @@ class Parser:
             self.consume(TokenType.COMMA)
             members.append(member_name_token.value)
         self.consume(TokenType.RBRACE)
-        node = EnumDefNode(enum_name_token.value, members)
-        node.line = enum_token.line - 1
-        node.column = enum_token.column - 1
-        return node
+        return EnumDefNode(enum_name_token.value, members, enum_token.line - 1, enum_token.column - 1)
 
     def parse_spawn_task(self):
         spawn_token = self.consume(TokenType.SPAWN)
@@ -308,111 +342,31 @@ class Parser:
                 params.append((param_name_token.value, param_type_token.value))
         self.consume(TokenType.RPAREN)
         body = self.parse_block()
-        node = SpawnTaskNode(task_name_token.value, params, body)
-        node.line = spawn_token.line - 1
-        node.column = spawn_token.column - 1
-        return node
+        return SpawnTaskNode(task_name_token.value, params, body, spawn_token.line - 1, spawn_token.column - 1)
 
     # --- Expression Parsing (Precedence Climbing) ---
-    def parse_expression(self):
-        return self.parse_bitwise_or()
-
-    def parse_bitwise_or(self):
-        left_expr = self.parse_bitwise_xor()
-        while self.current_token().type == TokenType.OR:
-            op_token = self.consume(TokenType.OR)
-            right_expr = self.parse_bitwise_xor()
-            node = BinaryOpNode(op_token.type, left_expr, right_expr)
-            node.line = op_token.line - 1
-            node.column = op_token.column - 1
-            left_expr = node
-        return left_expr
-
-    def parse_bitwise_xor(self):
-        left_expr = self.parse_bitwise_and()
-        while self.current_token().type == TokenType.XOR:
-            op_token = self.consume(TokenType.XOR)
-            right_expr = self.parse_bitwise_and()
-            node = BinaryOpNode(op_token.type, left_expr, right_expr)
-            node.line = op_token.line - 1
-            node.column = op_token.column - 1
-            left_expr = node
-        return left_expr
-
-    def parse_bitwise_and(self):
-        left_expr = self.parse_equality()
-        while self.current_token().type == TokenType.AND:
-            op_token = self.consume(TokenType.AND)
-            right_expr = self.parse_equality()
-            node = BinaryOpNode(op_token.type, left_expr, right_expr)
-            node.line = op_token.line - 1
-            node.column = op_token.column - 1
-            left_expr = node
-        return left_expr
-
-    def parse_equality(self):
-        left_expr = self.parse_comparison()
-        while self.current_token().type in (TokenType.EQUAL, TokenType.NOT_EQUAL):
-            op_token = self.consume(self.current_token().type)
-            right_expr = self.parse_comparison()
-            node = BinaryOpNode(op_token.type, left_expr, right_expr)
-            node.line = op_token.line - 1
-            node.column = op_token.column - 1
-            left_expr = node
-        return left_expr
-
-    def parse_comparison(self):
-        left_expr = self.parse_shift()
-        while self.current_token().type in (TokenType.GREATER_THAN, TokenType.LESS_THAN, TokenType.GREATER_EQUAL, TokenType.LESS_EQUAL):
-            op_token = self.consume(self.current_token().type)
-            right_expr = self.parse_shift()
-            node = BinaryOpNode(op_token.type, left_expr, right_expr)
-            node.line = op_token.line - 1
-            node.column = op_token.column - 1
-            left_expr = node
-        return left_expr
-
-    def parse_shift(self):
-        left_expr = self.parse_term()
-        while self.current_token().type in (TokenType.LSHIFT, TokenType.RSHIFT):
-            op_token = self.consume(self.current_token().type)
-            right_expr = self.parse_term()
-            node = BinaryOpNode(op_token.type, left_expr, right_expr)
-            node.line = op_token.line - 1
-            node.column = op_token.column - 1
-            left_expr = node
-        return left_expr
-
-    def parse_term(self):
-        left_expr = self.parse_factor()
-        while self.current_token().type in (TokenType.PLUS, TokenType.MINUS):
-            op_token = self.consume(self.current_token().type)
-            right_expr = self.parse_factor()
-            node = BinaryOpNode(op_token.type, left_expr, right_expr)
-            node.line = op_token.line - 1
-            node.column = op_token.column - 1
-            left_expr = node
-        return left_expr
-
-    def parse_factor(self):
-        left_expr = self.parse_unary()
-        while self.current_token().type in (TokenType.MULTIPLY, TokenType.DIVIDE, TokenType.MODULO):
-            op_token = self.consume(self.current_token().type)
-            right_expr = self.parse_unary()
-            node = BinaryOpNode(op_token.type, left_expr, right_expr)
-            node.line = op_token.line - 1
-            node.column = op_token.column - 1
-            left_expr = node
-        return left_expr
+    def parse_expression(self, min_power=0):
+        # Pratt loop: one call per operand plus one loop step per operator, instead of walking a
+        # precedence ladder (one method per level, see bench.LadderParser) for every atom.
+        if self.current_token().type in UNARY_OPERATORS:
+            left_expr = self.parse_unary()
+        else:
+            left_expr = self.parse_postfix_expression()
+        while True:
+            op_token = self.current_token()
+            op_type = INFIX_ALIASES.get(op_token.type, op_token.type)
+            power = BINDING_POWER.get(op_type)
+            if power is None or power <= min_power:
+                return left_expr
+            self.current_token_index += 1
+            right_expr = self.parse_expression(power) # binds tighter operators only: left-associative
+            left_expr = BinaryOpNode(op_type, left_expr, right_expr, op_token.line - 1, op_token.column - 1)
 
     def parse_unary(self):
-        if self.current_token().type in (TokenType.MINUS, TokenType.BIT_NOT, TokenType.POINTER_DEREF, TokenType.POINTER_REF):
+        if self.current_token().type in UNARY_OPERATORS:
             op_token = self.consume(self.current_token().type)
             expr = self.parse_unary() # Apply unary to the result of another unary
-            node = UnaryOpNode(op_token.type, expr)
-            node.line = op_token.line - 1
-            node.column = op_token.column - 1
-            return node
+            return UnaryOpNode(op_token.type, expr, op_token.line - 1, op_token.column - 1)
         return self.parse_postfix_expression()
 
     def parse_struct_field_assignment_or_access(self):
@@ -424,10 +378,7 @@ class Parser:
             assign_token = self.consume(TokenType.ASSIGN)
             value_expr = self.parse_expression()
             self.consume(TokenType.SEMICOLON)
-            node = VarAssignNode(f"{expr.struct_var_name}.{expr.field_name}", value_expr)
-            node.line = assign_token.line - 1
-            node.column = assign_token.column - 1
-            return node
+            return VarAssignNode(f"{expr.struct_var_name}.{expr.field_name}", value_expr, assign_token.line - 1, assign_token.column - 1)
         else:
             # This is either a method call or field access - consume semicolon and return
             self.consume(TokenType.SEMICOLON)
@@ -450,18 +401,12 @@ class Parser:
                         args.append(self.parse_expression())
                 self.consume(TokenType.RPAREN)
                 # 'node' becomes the callee of the function call
-                call_node = FunctionCallNode(cast(IdentifierNode, node), args)
-                call_node.line = lparen.line - 1
-                call_node.column = lparen.column - 1
-                node = call_node
+                node = FunctionCallNode(cast(IdentifierNode, node), args, lparen.line - 1, lparen.column - 1)
             elif self.current_token().type == TokenType.LBRACKET:
                 lbracket = self.consume(TokenType.LBRACKET)
                 index_expr = self.parse_expression()
                 self.consume(TokenType.RBRACKET)
-                index_node = ArrayIndexNode(node, index_expr)
-                index_node.line = lbracket.line - 1
-                index_node.column = lbracket.column - 1
-                node = index_node
+                node = ArrayIndexNode(node, index_expr, lbracket.line - 1, lbracket.column - 1)
             elif self.current_token().type == TokenType.DOT:
                 dot_token = self.consume(TokenType.DOT)
                 if (peek := self.peek()) and peek.type == TokenType.INT_LITERAL:
@@ -477,18 +422,10 @@ class Parser:
                             self.consume(TokenType.COMMA)
                             args.append(self.parse_expression())
                     self.consume(TokenType.RPAREN)
-                    method_node = MethodCallNode(node, member_name_token.value, args)
-                    method_node.line = dot_token.line - 1
-                    method_node.column = dot_token.column - 1
-                    node = method_node
+                    node = MethodCallNode(node, member_name_token.value, args, dot_token.line - 1, dot_token.column - 1)
                 else:
-                    if isinstance(node, IdentifierNode):
-                        field_node = StructFieldAccessNode(node.name, member_name_token.value)
-                    else:
-                        field_node = StructFieldAccessNode(node, member_name_token.value)
-                    field_node.line = dot_token.line - 1
-                    field_node.column = dot_token.column - 1
-                    node = field_node
+                    struct_var = node.name if isinstance(node, IdentifierNode) else node
+                    node = StructFieldAccessNode(struct_var, member_name_token.value, dot_token.line - 1, dot_token.column - 1)
             else:
                 break # No more postfix operators
         return node
@@ -504,40 +441,22 @@ class Parser:
             return expr
         elif token.type == TokenType.INT_LITERAL:
             tok = self.consume(TokenType.INT_LITERAL)
-            node = IntLiteralNode(tok.value)
-            node.line = tok.line - 1
-            node.column = tok.column - 1
-            return node
+            return IntLiteralNode(tok.value, tok.line - 1, tok.column - 1)
         elif token.type == TokenType.FLOAT_LITERAL:
             tok = self.consume(TokenType.FLOAT_LITERAL)
-            node = FloatLiteralNode(tok.value)
-            node.line = tok.line - 1
-            node.column = tok.column - 1
-            return node
+            return FloatLiteralNode(tok.value, tok.line - 1, tok.column - 1)
         elif token.type == TokenType.CHAR_LITERAL:
             tok = self.consume(TokenType.CHAR_LITERAL)
-            node = CharLiteralNode(tok.value)
-            node.line = tok.line - 1
-            node.column = tok.column - 1
-            return node
+            return CharLiteralNode(tok.value, tok.line - 1, tok.column - 1)
         elif token.type == TokenType.STRING_LITERAL:
             tok = self.consume(TokenType.STRING_LITERAL)
-            node = StringLiteralNode(tok.value)
-            node.line = tok.line - 1
-            node.column = tok.column - 1
-            return node
+            return StringLiteralNode(tok.value, tok.line - 1, tok.column - 1)
         elif token.type == TokenType.NULL:
             tok = self.consume(TokenType.NULL)
-            node = NullLiteralNode()
-            node.line = tok.line - 1
-            node.column = tok.column - 1
-            return node
+            return NullLiteralNode(tok.line - 1, tok.column - 1)
         elif token.type == TokenType.IDENTIFIER:
             tok = self.consume(TokenType.IDENTIFIER)
-            node = IdentifierNode(tok.value)
-            node.line = tok.line - 1
-            node.column = tok.column - 1
-            return node
+            return IdentifierNode(tok.value, tok.line - 1, tok.column - 1)
         elif token.type == TokenType.LESS_THAN and (peek := self.peek(1)) and peek.type in DATA_TYPES.values():
             return self.parse_type_cast()
         elif token.type == TokenType.LBRACKET:
@@ -556,7 +475,4 @@ class Parser:
                 self.consume(TokenType.COMMA)
                 elements.append(self.parse_expression())
         self.consume(TokenType.RBRACKET)
-        node = ArrayLiteralNode(elements)
-        node.line = lbracket.line - 1
-        node.column = lbracket.column - 1
-        return node
+        return ArrayLiteralNode(elements, lbracket.line - 1, lbracket.column - 1)
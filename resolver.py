@@ -0,0 +1,208 @@
+from collections.abc import Iterator
+
+from enums import EnumMember, enum_members
+from grvast import ASTNode, BlockNode, EnumDefNode, ForLoopNode, FreeMemoryNode, FunctionDefNode, IdentifierNode, \
+    IfStatementNode, LetMemoryNode, ProgramNode, SpawnTaskNode, StructDefNode, StructFieldAccessNode, TryNode, \
+    UnaryOpNode, VarAssignNode, VarDeclarationNode, WhileLoopNode, iter_child_nodes
+from lexing import TokenType
+
+
+def scope_nodes(statements: list[ASTNode]) -> Iterator[ASTNode]:
+    """Nodes of a function body (or of a module's top level), not descending into the functions
+    and structs defined there, which have scopes of their own."""
+    stack = list(reversed(statements))
+    while stack:
+        node = stack.pop()
+        yield node
+        if not isinstance(node, (FunctionDefNode, StructDefNode)):
+            stack.extend(reversed(list(iter_child_nodes(node))))
+
+
+class Scope:
+    """Variables declared so far in a function body or block, by frame slot. Names it doesn't
+    declare are looked up in `parent`, the enclosing block; the outermost scope of a function (or
+    a block at the module's top level) has none, and beyond it every name is a global. `node` is
+    the block or `for` loop the scope belongs to, None for a function body."""
+    __slots__ = ("slots", "parent", "node")
+
+    def __init__(self, parent: "Scope | None" = None, node: BlockNode | ForLoopNode | None = None) -> None:
+        self.slots: dict[str, int] = {}
+        self.parent = parent
+        self.node = node
+
+    def lookup(self, name: str) -> int:
+        scope = self
+        while scope is not None:
+            if (slot := scope.slots.get(name)) is not None:
+                return slot
+            scope = scope.parent
+        return -1
+
+
+def resolve(program: ProgramNode) -> ProgramNode:
+    """Lexical scope resolution. Every function's locals (`self` for methods, its parameters, then
+    the variables declared in its body and in the blocks nested in it) get slots in its frame,
+    recorded in `FunctionDefNode.local_names`, and every node naming a variable gets the slot it
+    refers to in `node.slot`, or -1 for a global. Globals stay in the interpreter's symbol table.
+
+    Blocks (`if`, `while`, `for`, `try`/`catch`) are scopes: a variable declared in one is visible
+    from its `let` to the end of the block, shadowing any outer variable of the same name, and gets
+    a slot of its own. Variables declared in blocks at the module's top level are locals of the
+    module, in `ProgramNode.local_names`. A function doesn't see its caller's locals.
+
+    The heap storage of parameters and locals belongs to their scope, and is freed when the call
+    or block ends (`owned` declarations, and blocks and `for` loops that `owns_storage`), unless
+    the variable's address is taken with `&` or it is freed by hand: those slots are in
+    `FunctionDefNode.escaping`, and their storage lives until it is freed.
+
+    `Enum.member`, for an enum defined earlier in the module, gets the member it evaluates to in
+    `StructFieldAccessNode.member`, unless a variable could shadow the enum there: a local or
+    parameter in scope, or a variable of that name declared at the module's top level."""
+    module_variables = {node.var_name for node in scope_nodes(program.statements)
+                        if isinstance(node, (LetMemoryNode, VarDeclarationNode))}
+    if any(isinstance(node, TryNode) for node in scope_nodes(program.statements)):
+        module_variables.add("e")
+    _Resolver(program, {}, module_variables).statements(program.statements)
+    return program
+
+
+class _Resolver:
+    def __init__(self, owner: ProgramNode | FunctionDefNode, enums: dict[str, dict[str, EnumMember]],
+                 module_variables: set[str]) -> None:
+        self.owner = owner # whose frame the slots are in
+        self.enums = enums # {enum_name: {member name: EnumMember}} of the enums defined so far
+        self.module_variables = module_variables
+        self.local_names: list[str] = []
+        self.scope: Scope | None = None # None at the module's top level: declarations there are globals
+        self.declarations: list[tuple[LetMemoryNode | VarDeclarationNode, Scope]] = []
+        self.escaping: set[int] = set()
+        self.visitors = {
+            IdentifierNode: self.identifier,
+            LetMemoryNode: self.declaration,
+            VarDeclarationNode: self.declaration,
+            VarAssignNode: self.assignment,
+            FreeMemoryNode: self.free,
+            UnaryOpNode: self.unary_op,
+            StructFieldAccessNode: self.field_access,
+            BlockNode: self.block,
+            IfStatementNode: self.if_statement,
+            WhileLoopNode: self.while_loop,
+            ForLoopNode: self.for_loop,
+            TryNode: self.try_statement,
+            EnumDefNode: self.enum_def,
+            SpawnTaskNode: lambda node: self.block(node.body),
+            FunctionDefNode: lambda node: self.function(node, False),
+            StructDefNode: lambda node: [self.function(method, True) for method in node.functions],
+        }
+
+    def statements(self, statements: list[ASTNode]):
+        for statement in statements:
+            self.visit(statement)
+        self.owner.local_names = tuple(self.local_names)
+        for node, scope in self.declarations:
+            node.owned = node.slot not in self.escaping
+            if node.owned and scope.node is not None:
+                scope.node.owns_storage = True
+        if isinstance(self.owner, FunctionDefNode):
+            self.owner.escaping = frozenset(self.escaping)
+
+    def visit(self, node):
+        if visitor := self.visitors.get(type(node)):
+            visitor(node)
+        else:
+            for child in iter_child_nodes(node):
+                self.visit(child)
+
+    def declare(self, name: str) -> int:
+        if self.scope is None:
+            return -1
+        if (slot := self.scope.slots.get(name)) is None: # declaring it again in the same block rebinds it
+            slot = self.scope.slots[name] = len(self.local_names)
+            self.local_names.append(name)
+        return slot
+
+    def lookup(self, name: str) -> int:
+        return self.scope.lookup(name) if self.scope is not None else -1
+
+    def nested(self, statements: list[ASTNode], scope: Scope):
+        outer = self.scope
+        self.scope = scope
+        for statement in statements:
+            self.visit(statement)
+        self.scope = outer
+
+    def function(self, func_def: FunctionDefNode, is_method: bool):
+        resolver = _Resolver(func_def, self.enums, self.module_variables)
+        scope = resolver.scope = Scope()
+        for name in (["self"] if is_method else []) + [param_name for param_name, _ in func_def.params]:
+            scope.slots[name] = len(resolver.local_names) # a repeated parameter name means the last one
+            resolver.local_names.append(name)
+        resolver.statements(func_def.body.statements) # the body is the function's own scope, not a block in it
+
+    def block(self, node: BlockNode):
+        node.owns_storage = False
+        self.nested(node.statements, Scope(self.scope, node))
+
+    def identifier(self, node: IdentifierNode):
+        node.slot = self.lookup(node.name)
+
+    def declaration(self, node):
+        if node.value_expr is not None:
+            self.visit(node.value_expr) # before the variable exists: `let x = x + 1` reads the outer `x`
+        node.slot = self.declare(node.var_name)
+        node.owned = False
+        if node.slot >= 0:
+            self.declarations.append((node, self.scope))
+
+    def assignment(self, node: VarAssignNode):
+        self.visit(node.value_expr)
+        node.slot = self.lookup(node.var_name.split(".", 1)[0]) # `s.field = ...` assigns to variable `s`
+
+    def free(self, node: FreeMemoryNode):
+        node.slot = self.lookup(node.var_name)
+        if node.slot >= 0:
+            self.escaping.add(node.slot) # freed by hand
+
+    def unary_op(self, node: UnaryOpNode):
+        self.visit(node.expr)
+        if node.op == TokenType.POINTER_REF and isinstance(node.expr, IdentifierNode) and node.expr.slot >= 0:
+            self.escaping.add(node.expr.slot) # the address may outlive the scope
+
+    def field_access(self, node: StructFieldAccessNode):
+        node.member = None
+        if isinstance(node.struct_var_name, str):
+            node.slot = self.lookup(node.struct_var_name)
+            if node.slot < 0 and node.struct_var_name not in self.module_variables \
+                    and (members := self.enums.get(node.struct_var_name)) is not None:
+                node.member = members.get(node.field_name) # None: reported as unknown when it's run
+        else:
+            self.visit(node.struct_var_name)
+
+    def enum_def(self, node: EnumDefNode):
+        self.enums[node.enum_name] = enum_members(node)
+
+    def if_statement(self, node: IfStatementNode):
+        self.visit(node.condition)
+        self.block(node.then_block)
+        for condition, block in node.elif_blocks:
+            self.visit(condition)
+            self.block(block)
+        if node.else_block:
+            self.block(node.else_block)
+
+    def while_loop(self, node: WhileLoopNode):
+        self.visit(node.condition)
+        self.block(node.loop_block)
+
+    def for_loop(self, node: ForLoopNode):
+        # The loop variable is in a scope of its own, around the body's
+        node.owns_storage = False
+        self.nested([node.init_stmt, node.condition_expr, node.loop_block, node.increment_stmt], Scope(self.scope, node))
+
+    def try_statement(self, node: TryNode):
+        self.block(node.try_block)
+        outer = self.scope
+        self.scope = Scope(outer) # the caught error `e` is in a scope around the catch block
+        node.slot = self.declare("e")
+        self.visit(node.catch_block)
+        self.scope = outer
@@ -6,9 +6,32 @@ from typing import TYPE_CHECKING, Any, Callable
 
 from colored import back, fore, style
 
+from arrays import TypedArray, extend_array, writable_array
+from enums import EnumMember
+from structs import GravoxStruct, struct_fields
+
 if TYPE_CHECKING:
     from gravox import Interpreter
 
+# Builtins that change the array passed as their first argument. The engines pass it as taken out
+# of the variable, pointer or struct field holding it (see Interpreter.evaluate_in_place_argument),
+# so a shared array is copied into that holder before it's changed.
+IN_PLACE_BUILTINS = frozenset({"_array_push", "_array_extend"})
+
+def _json_value(value: Any) -> Any:
+    # `value` as json.dumps should see it: struct instances as the {field: value} objects they used
+    # to be, and enum members as their names, which json would otherwise write as their ordinals
+    if value.__class__ is EnumMember:
+        return value.name
+    if isinstance(value, GravoxStruct):
+        value = struct_fields(value)
+    if isinstance(value, dict):
+        return {_json_value(key): _json_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_value(item) for item in value]
+    return value
+
+
 class Stdlib:
     def __init__(self, interpreter: "Interpreter"):
         self.interpreter = interpreter
@@ -31,14 +54,32 @@ class Stdlib:
     def input(args: tuple[str]):
         return input(args[0])
 
-    def gravox_heapusage(self, _):
-        return self.interpreter.next_memory_address
+    def gravox_heapusage(self, args: list[Any]):
+        # Bytes in use, or the named heap statistic (see Heap.stats), or all of them for "stats"
+        heap = self.interpreter.heap
+        if not args:
+            return heap.live_bytes
+        stats = heap.stats()
+        if args[0] == "stats":
+            return stats
+        if args[0] not in stats:
+            raise Exception(f"Unknown heap statistic '{args[0]}'. Expected one of: {', '.join(stats)}")
+        return stats[args[0]]
 
     def gravox_heapsize(self, _):
         return self.interpreter.heap_size
 
     def gravox_dump_heap(self, _):
-        return self.interpreter.memory
+        return {address: cell.value for address, cell in self.interpreter.memory.items()}
+
+    def gravox_load(self, args: tuple[int, str]): # (address, type)
+        return self.interpreter.memory.load(args[1], args[0])
+
+    def gravox_store(self, args: tuple[int, str, Any]): # (address, type, value)
+        self.interpreter.memory.store(args[1], args[0], self.interpreter.cast_value_to_type(args[2], args[1]))
+
+    def gravox_memcopy(self, args: tuple[int, int, int]): # (destination, source, size in bytes)
+        self.interpreter.memory.copy(*args)
 
     @staticmethod
     def clear_screen(_):
@@ -49,11 +90,13 @@ class Stdlib:
 
     @staticmethod
     def _array_push(args: list[Any]):
-        array = args[0]
+        array = writable_array(args[0])
         value = args[1]
         try:
             array.append(value)
         except Exception as e:
+            if isinstance(array, TypedArray): # a value the element type can't hold
+                raise Exception(f"Cannot push '{value}' to an {array.type_name}")
             print(f"info: {value} -> {array}")
             print("tip: you might be trying to create an array using inline assignment\n"
                   "tip: (e.g. 'let x = Array([...]);')\n"
@@ -61,6 +104,15 @@ class Stdlib:
             raise e
         return array
 
+    @staticmethod
+    def _array_extend(args: tuple[list[Any], list[Any]]): # (array, items)
+        array = writable_array(args[0])
+        try:
+            extend_array(array, args[1])
+        except (TypeError, OverflowError):
+            raise Exception(f"Cannot extend {array} with {args[1]}")
+        return array
+
     @staticmethod
     def _file_exec(args: tuple[str, str, str | None]): # (file, mode, arg)
         data = None
@@ -81,7 +133,7 @@ class Stdlib:
     def _json_exec(args: tuple[str, dict | str | None]): # (op, contents)
         match args[0]:
             case "dump":
-                return json.dumps(args[1])
+                return json.dumps(_json_value(args[1]))
             case "load":
                 return json.loads(str(args[1]))
             case _:
@@ -0,0 +1,92 @@
+import keyword
+from typing import Any
+
+from grvast import StructDefNode
+
+
+def field_attribute(field_name: str) -> str:
+    # Python attribute holding a struct field: field names that are Python keywords, would be
+    # name-mangled or could clash with a method get a prefix
+    if keyword.iskeyword(field_name) or field_name.startswith(("__", "m_", "f_")):
+        return "f_" + field_name
+    return field_name
+
+
+class GravoxStruct:
+    """Base of the classes struct instances are made from: the interpreter's (see `struct_class`)
+    and the Python backend's transpiled ones. They are slotted and list their fields and field
+    types in `__fields__`; `__layout__` maps each field to the attribute it's stored in and its
+    type, so a field is read or written without searching the struct's definition.
+
+    Instances print, compare and index like the {field: value} dicts structs used to be, so an
+    instance in an `any` variable or passed to json.dump still works."""
+    __slots__ = ()
+    __fields__: dict[str, str] = {}
+    __layout__: dict[str, tuple[str, str]] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.__layout__ = {name: (field_attribute(name), field_type) for name, field_type in cls.__fields__.items()}
+
+    def __repr__(self):
+        return repr(struct_fields(self))
+
+    def __getitem__(self, field_name: str) -> Any:
+        if (field := self.__layout__.get(field_name)) is None:
+            raise KeyError(field_name)
+        return getattr(self, field[0])
+
+    def __setitem__(self, field_name: str, value: Any):
+        if (field := self.__layout__.get(field_name)) is None:
+            raise KeyError(field_name)
+        setattr(self, field[0], value)
+
+    def __contains__(self, field_name: str) -> bool:
+        return field_name in self.__layout__
+
+    def __len__(self) -> int:
+        return len(self.__layout__)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, GravoxStruct):
+            return struct_fields(self) == struct_fields(other)
+        if isinstance(other, dict):
+            return struct_fields(self) == other
+        return NotImplemented
+
+    __hash__ = None
+
+
+class FieldCell:
+    """A field of a struct instance (a GravoxStruct or a dict), read and written through `value` as
+    a variable's cell is: for code that replaces the value a variable, pointer or field holds (see
+    arrays.own_array)."""
+    __slots__ = ("instance", "field_name")
+
+    def __init__(self, instance: GravoxStruct | dict, field_name: str) -> None:
+        self.instance = instance
+        self.field_name = field_name
+
+    @property
+    def value(self) -> Any:
+        return self.instance[self.field_name]
+
+    @value.setter
+    def value(self, value: Any):
+        self.instance[self.field_name] = value
+
+
+def struct_fields(instance: GravoxStruct) -> dict[str, Any]:
+    # {field: value} of a struct instance
+    return {name: getattr(instance, attribute) for name, (attribute, _) in instance.__layout__.items()}
+
+
+def struct_class(struct_def: StructDefNode) -> type[GravoxStruct]:
+    """The class the interpreter makes instances of `struct_def` from: a slotted GravoxStruct
+    subclass, about a third the size of a dict per instance. A field declared twice keeps its
+    first type, as the interpreter's lookups did."""
+    fields: dict[str, str] = {}
+    for field_name, field_type in struct_def.fields:
+        fields.setdefault(field_name, field_type)
+    return type(struct_def.struct_name, (GravoxStruct,),
+                {"__slots__": tuple(map(field_attribute, fields)), "__fields__": fields})
@@ -0,0 +1,857 @@
+import re
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from traceback import walk_tb
+from types import CodeType
+from typing import Any, Callable
+
+from arrays import TypedArray, element_type
+from enums import enum_members
+from grvast import ArrayIndexNode, ArrayLiteralNode, ASTNode, BinaryOpNode, BlockNode, CharLiteralNode, EnumDefNode, \
+    EnumMemberNode, ErrResultNode, FloatLiteralNode, ForLoopNode, FreeMemoryNode, FunctionCallNode, FunctionDefNode, \
+    IdentifierNode, IfStatementNode, ImportNode, IntLiteralNode, LetMemoryNode, MethodCallNode, NullLiteralNode, \
+    OkResultNode, PrintStatementNode, ProgramNode, ReturnNode, SpawnTaskNode, StringLiteralNode, StructDefNode, \
+    StructFieldAccessNode, StructInstantiationNode, TryNode, TypeCastNode, UnaryOpNode, VarAssignNode, \
+    VarDeclarationNode, WhileLoopNode, walk
+from interpreter import Interpreter
+from lexing import TokenType, tokenize_iter
+from modcache import load_code
+from parser import Parser
+from resolver import resolve, scope_nodes
+from stdlib import IN_PLACE_BUILTINS, Stdlib
+from structs import GravoxStruct, field_attribute
+
+INT_TYPES = frozenset(("int8", "int16", "int32", "int64", "uint8", "uint16", "uint32", "uint64"))
+FLOAT_TYPES = frozenset(("float32", "float64"))
+# Initial value of a `let` without an initializer, as Python source (everything else starts as None)
+DEFAULTS = {**dict.fromkeys(INT_TYPES, "0"), **dict.fromkeys(FLOAT_TYPES, "0.0"), "char": repr("\0")}
+BUILTIN_TYPES = frozenset(("char", "string", "any", "array"))
+
+# Operator token -> Python operator, for BinaryOpNode/UnaryOpNode (see BINARY_OPERATIONS in interpreter.py)
+BINARY_OPERATORS = {
+    TokenType.PLUS: "+",
+    TokenType.MINUS: "-",
+    TokenType.MULTIPLY: "*",
+    TokenType.DIVIDE: "/",
+    TokenType.MODULO: "%",
+    TokenType.EQUAL: "==",
+    TokenType.NOT_EQUAL: "!=",
+    TokenType.GREATER_THAN: ">",
+    TokenType.LESS_THAN: "<",
+    TokenType.GREATER_EQUAL: ">=",
+    TokenType.LESS_EQUAL: "<=",
+    TokenType.AND: "&",
+    TokenType.OR: "|",
+    TokenType.XOR: "^",
+    TokenType.LSHIFT: "<<",
+    TokenType.RSHIFT: ">>",
+}
+COMPARISONS = frozenset((TokenType.EQUAL, TokenType.NOT_EQUAL, TokenType.GREATER_THAN, TokenType.LESS_THAN,
+                         TokenType.GREATER_EQUAL, TokenType.LESS_EQUAL))
+# Gravox's `==` and `!=` compare typed arrays elementwise, so operands that may be arrays go through these
+EQUALITY_FUNCTIONS = {TokenType.EQUAL: "equals", TokenType.NOT_EQUAL: "not_equals"}
+UNARY_OPERATORS = {TokenType.MINUS: "-", TokenType.BIT_NOT: "~"}
+
+PROGRAM_FILE = "<gravox>"
+# A variable, function or type in generated code: `v_x`, or `v_3_x` for a variable renamed after its slot
+GENERATED_NAME = re.compile(r"([vft])_(?:\d+_)?(.+)")
+PRELUDE = """\
+# Generated from {name} by gravox.py --emit-python; runs on a transpiler.PythonRuntime `rt`.
+from arrays import equals, not_equals, own_array, writable_array
+from enums import EnumMember
+from structs import FieldCell, GravoxStruct
+from transpiler import PythonRuntime
+
+if "rt" not in globals(): # run directly, e.g. `python -m cProfile module.py`
+    rt = PythonRuntime(8_000_000)
+memory, cell = rt.memory, rt.memory.cell
+alloc, cast, result, deref, pointee = rt.letate_memory, rt.cast_value_to_type, rt.result, rt.deref, rt.pointee
+owned, own, release = rt.owned, rt.own_memory, rt.release_storage
+new, is_struct, field, set_field, member, index, fail = \\
+    rt.new, rt.is_struct, rt.field, rt.set_field, rt.member, rt.index, rt.fail
+"""
+
+
+def slot_names(owner: ProgramNode | FunctionDefNode) -> tuple[str, ...]:
+    """The name each of `owner`'s frame slots (see resolver.py) goes by in the generated code.
+    Python scopes variables by function, so a local that shadows another one, or a global the
+    function also uses, is named after its slot: the `x` declared in slot 3 becomes `v_3_x`. So are
+    all the variables of the module's top-level blocks, which are Python globals but mustn't be
+    seen by functions."""
+    if isinstance(owner, ProgramNode):
+        return tuple(f"{slot}_{name}" for slot, name in enumerate(owner.local_names))
+    taken = global_names(owner.body.statements)
+    names = []
+    for slot, name in enumerate(owner.local_names):
+        names.append(f"{slot}_{name}" if name in taken else name)
+        taken.add(name)
+    return tuple(names)
+
+
+def global_names(statements: list[ASTNode]) -> set[str]:
+    # Names a function body (or the module's top level) refers to as globals
+    names = set()
+    for node in scope_nodes(statements):
+        if getattr(node, "slot", 0) >= 0:
+            continue
+        if isinstance(node, IdentifierNode):
+            names.add(node.name)
+        elif isinstance(node, (LetMemoryNode, VarDeclarationNode, VarAssignNode, FreeMemoryNode)):
+            names.add(node.var_name.split(".", 1)[0])
+        elif isinstance(node, StructFieldAccessNode) and isinstance(node.struct_var_name, str):
+            names.add(node.struct_var_name)
+        elif isinstance(node, TryNode):
+            names.add("e")
+    return names
+
+
+def binding(names: tuple[str, ...], name: str, slot: int) -> str:
+    # Name of the variable `name` resolved to `slot` in the generated code (see slot_names)
+    return names[slot] if slot >= 0 else name
+
+
+def declarations(statements: list[ASTNode], names: tuple[str, ...]) -> dict[str, str]:
+    """Variables a function body or module declares, by their names in the generated code, with
+    their types."""
+    types = {}
+    for node in scope_nodes(statements):
+        if isinstance(node, (LetMemoryNode, VarDeclarationNode)):
+            types[binding(names, node.var_name, node.slot)] = node.data_type
+        elif isinstance(node, TryNode):
+            types.setdefault(binding(names, "e", node.slot), "any")
+    return types
+
+
+def heap_variables(statements: list[ASTNode], names: tuple[str, ...]) -> set[str]:
+    # Variables that need their heap address at run time: those whose address is taken with `&`,
+    # and those that are freed, which gives the address back to the heap
+    heap_names = set()
+    for node in scope_nodes(statements):
+        if isinstance(node, UnaryOpNode) and node.op == TokenType.POINTER_REF and isinstance(node.expr, IdentifierNode):
+            heap_names.add(binding(names, node.expr.name, node.expr.slot))
+        elif isinstance(node, FreeMemoryNode):
+            heap_names.add(binding(names, node.var_name, node.slot))
+    return heap_names
+
+
+class Scope:
+    """What the generated code knows about the variables in a function (or at module level): their
+    names (see slot_names), Gravox types, and which of them live in `rt.memory` because their
+    address is needed. Function scopes see module variables through `parent`."""
+    __slots__ = ("types", "boxed", "names", "parent", "struct_name", "return_type")
+
+    def __init__(self, types: dict[str, str], boxed: set[str], names: tuple[str, ...] = (),
+                 parent: "Scope | None" = None, struct_name: str | None = None, return_type: str | None = None):
+        self.types = types
+        self.boxed = boxed
+        self.names = names
+        self.parent = parent
+        self.struct_name = struct_name
+        self.return_type = return_type
+
+    def type_of(self, name: str) -> str | None:
+        if name in self.types:
+            return self.types[name]
+        return self.parent.type_of(name) if self.parent else None
+
+    def is_boxed(self, name: str) -> bool:
+        if name in self.types:
+            return name in self.boxed
+        return self.parent is not None and self.parent.is_boxed(name)
+
+
+class PythonTranspiler:
+    """Translates a parsed Gravox module into the source of a Python module.
+
+    Functions become `def`s, structs slotted `GravoxStruct` classes with their methods, enums
+    classes of member names, and stdlib calls direct calls to bound `Stdlib` methods. Variables
+    become Python locals and globals, except those whose address is taken with `&` or that are
+    freed, which are kept in `rt.memory` cells and referred to by address. Casts are inlined where
+    the operand's type is known; everything else calls back into the runtime so values and errors
+    match the interpreter. Python scopes variables by function, so a variable declared in a block
+    that shadows an outer one is renamed after its frame slot (see slot_names)."""
+
+    def __init__(self, program: ProgramNode, name: str = PROGRAM_FILE):
+        self.program = program
+        self.name = name
+        self.lines: list[str] = []
+        self.line_nodes: list[ASTNode | None] = [] # statement each generated line came from
+        self.indent = 0
+        self.structs: dict[str, dict[str, str]] = {}
+        self.enums: set[str] = set()
+        self.functions: set[str] = set()
+        self.builtins: set[str] = set() # stdlib functions called, bound by the prelude
+        self.marks = 0 # storage scopes open around the code being emitted
+        self.scope = Scope({}, set())
+        self.statement_emitters: dict[type, Callable[[Any], None]] = {
+            ProgramNode: self.emit_block,
+            BlockNode: self.emit_block,
+            LetMemoryNode: self.emit_let,
+            VarDeclarationNode: self.emit_let,
+            FreeMemoryNode: self.emit_free,
+            VarAssignNode: self.emit_assignment,
+            FunctionDefNode: self.emit_function_def,
+            ReturnNode: self.emit_return,
+            IfStatementNode: self.emit_if_statement,
+            WhileLoopNode: self.emit_while_loop,
+            ForLoopNode: self.emit_for_loop,
+            StructDefNode: self.emit_struct_def,
+            EnumDefNode: self.emit_enum_def,
+            PrintStatementNode: self.emit_print_statement,
+            StructInstantiationNode: self.emit_pass,
+            SpawnTaskNode: self.emit_spawn_task,
+            ImportNode: self.emit_import,
+            TryNode: self.emit_try,
+        }
+        self.expression_translators: dict[type, Callable[[Any], str]] = {
+            IntLiteralNode: self.translate_literal,
+            FloatLiteralNode: self.translate_literal,
+            CharLiteralNode: self.translate_literal,
+            StringLiteralNode: self.translate_literal,
+            NullLiteralNode: lambda node: "None",
+            ArrayLiteralNode: self.translate_array_literal,
+            IdentifierNode: self.translate_identifier,
+            BinaryOpNode: self.translate_binary_op,
+            UnaryOpNode: self.translate_unary_op,
+            FunctionCallNode: self.translate_function_call,
+            TypeCastNode: lambda node: self.cast(node.expression, node.target_type),
+            StructFieldAccessNode: self.translate_struct_field_access,
+            ArrayIndexNode: self.translate_array_index,
+            OkResultNode: lambda node: f'{{"type": "Ok", "value": {self.expression(node.value_expr)}}}',
+            ErrResultNode: lambda node: f'{{"type": "Err", "error": {self.expression(node.error_expr)}}}',
+            EnumMemberNode: lambda node: f"{self.type_name(node.enum_name)}.{field_attribute(node.member_name)}",
+            MethodCallNode: self.translate_method_call,
+        }
+
+    def transpile(self) -> str:
+        resolve(self.program) # which variables own their storage
+        self.collect_definitions()
+        self.emit_block(self.program)
+        while self.lines and not self.lines[-1]:
+            self.lines.pop()
+            self.line_nodes.pop()
+        prelude = PRELUDE.format(name=self.name).splitlines()
+        prelude += [f"b_{name} = rt.stdlib[{name!r}]" for name in sorted(self.builtins)]
+        prelude.append("")
+        self.line_nodes[:0] = [None] * len(prelude)
+        self.lines[:0] = prelude
+        return "\n".join(self.lines) + "\n"
+
+    def node_at(self, line: int) -> ASTNode | None:
+        return self.line_nodes[line - 1] if 0 < line <= len(self.line_nodes) else None
+
+    def collect_definitions(self):
+        # Whole-program facts the generated code relies on: which names are structs (and their
+        # fields), enums and functions, and which module variables have their address taken
+        methods = set()
+        for node in walk(self.program):
+            if isinstance(node, StructDefNode):
+                self.structs[node.struct_name] = dict(node.fields)
+                methods.update(map(id, node.functions))
+            elif isinstance(node, EnumDefNode):
+                self.enums.add(node.enum_name)
+        module_names = slot_names(self.program)
+        module_types = declarations(self.program.statements, module_names)
+        referenced = heap_variables(self.program.statements, module_names)
+        for node in walk(self.program):
+            if isinstance(node, FunctionDefNode):
+                if id(node) not in methods:
+                    self.functions.add(node.func_name)
+                names = slot_names(node)
+                referenced |= heap_variables(node.body.statements, names) - set(names)
+        self.scope = Scope(module_types, referenced & module_types.keys(), module_names)
+
+    @staticmethod
+    def local_types(node: FunctionDefNode, names: tuple[str, ...], struct_name: str | None = None) -> dict[str, str]:
+        types = {}
+        if struct_name:
+            types[names[0]] = struct_name
+        for slot, (_, param_type) in enumerate(node.params, 1 if struct_name else 0):
+            types[names[slot]] = param_type
+        types.update(declarations(node.body.statements, names))
+        return types
+
+    # --- Output ---
+    def emit(self, line: str, node: ASTNode | None):
+        self.lines.append("    " * self.indent + line if line else "")
+        self.line_nodes.append(node)
+
+    def separate(self):
+        # Blank lines around definitions, as PEP 8 lays them out
+        if not self.lines or self.lines[-1].endswith(":"):
+            return
+        blank_lines = 1 if self.indent else 2
+        while self.lines[-blank_lines:] != [""] * blank_lines:
+            self.emit("", None)
+
+    def emit_body(self, block: BlockNode | None, node: ASTNode):
+        # An indented suite; Python needs at least one statement in it
+        self.indent += 1
+        start = len(self.lines)
+        with self.storage_scope(block, node):
+            for statement in block.statements if block else ():
+                self.emit_statement(statement)
+        if len(self.lines) == start:
+            self.emit("pass", node)
+        self.indent -= 1
+
+    @contextmanager
+    def storage_scope(self, scope: BlockNode | ForLoopNode | None, node: ASTNode):
+        # Code emitted inside is a block (or `for` loop): the storage its variables own is freed
+        # at its end, or when an error leaves it, as in Interpreter.execute_block
+        if scope is None or not scope.owns_storage:
+            yield
+            return
+        mark = f"_mark{self.marks}"
+        self.marks += 1
+        self.emit(f"{mark} = len(owned)", node)
+        self.emit("try:", node)
+        self.indent += 1
+        start = len(self.lines)
+        yield
+        if len(self.lines) == start:
+            self.emit("pass", node)
+        self.indent -= 1
+        self.emit("finally:", node)
+        self.emit(f"    release({mark})", node)
+        self.marks -= 1
+
+    # --- Names ---
+    def variable(self, name: str) -> str:
+        return "self" if name == "self" and self.scope.struct_name else f"v_{name}"
+
+    def binding(self, name: str, slot: int) -> str:
+        return binding(self.scope.names, name, slot)
+
+    def load(self, name: str) -> str:
+        return f"memory[{self.variable(name)}].value" if self.scope.is_boxed(name) else self.variable(name)
+
+    @staticmethod
+    def type_name(name: str) -> str:
+        return f"t_{name}"
+
+    def function(self, name: str) -> str:
+        return f"f_{name}"
+
+    # --- Statements ---
+    def emit_statement(self, node):
+        if emitter := self.statement_emitters.get(type(node)):
+            emitter(node)
+        elif node is not None:
+            self.emit(self.expression(node), node) # Expression statement: value is discarded
+
+    def emit_block(self, node):
+        with self.storage_scope(node if isinstance(node, BlockNode) else None, node):
+            for statement in node.statements:
+                self.emit_statement(statement)
+
+    def emit_pass(self, node):
+        self.emit("pass", node)
+
+    def emit_let(self, node):
+        name, data_type = self.binding(node.var_name, node.slot), node.data_type
+        if data_type in self.structs: # a struct's fields start at their defaults; the initializer is ignored
+            value = f"{self.type_name(data_type)}()"
+        elif data_type in INT_TYPES or data_type in FLOAT_TYPES or data_type in BUILTIN_TYPES or data_type in self.enums \
+                or element_type(data_type):
+            value = self.cast(node.value_expr, data_type) if node.value_expr else DEFAULTS.get(data_type, "None")
+        elif node.value_expr is None:
+            value = f"new({data_type!r})"
+        else: # a struct defined in another module, or not a struct at all
+            value = f"new({data_type!r}) if is_struct({data_type!r}) else {self.cast(node.value_expr, data_type)}"
+        allocate = "own" if node.owned else "alloc"
+        if self.scope.is_boxed(name):
+            self.emit(f"{self.variable(name)} = {allocate}({data_type!r})", node)
+            self.emit(f"memory[{self.variable(name)}] = cell({data_type!r}, {value}, {self.variable(name)})", node)
+        else:
+            self.emit(f"{allocate}({data_type!r})", node)
+            self.emit(f"{self.variable(name)} = {value}", node)
+
+    def emit_free(self, node):
+        name = self.binding(node.var_name, node.slot)
+        if self.scope.type_of(name) is None:
+            self.emit(f"fail({f'Cannot free undeclared variable {node.var_name!r}'!r})", node)
+            return
+        if self.scope.is_boxed(name):
+            self.emit(f"rt.free_memory({self.variable(name)})", node)
+        self.emit(f"del {self.variable(name)}", node)
+
+    def emit_assignment(self, node):
+        name = node.var_name
+        if "." in name: # Struct field assignment e.g., vec.x = 10;
+            struct_var_name, field_name = name.split(".", 1)
+            struct_type = self.scope.type_of(self.binding(struct_var_name, node.slot))
+            instance = self.load(self.binding(struct_var_name, node.slot))
+            if field_name in self.structs.get(struct_type, ()):
+                value = self.cast(node.value_expr, self.structs[struct_type][field_name])
+                self.emit(f"{instance}.{field_attribute(field_name)} = {value}", node)
+            else:
+                self.emit(f"set_field({instance}, {struct_var_name!r}, {field_name!r}, {self.expression(node.value_expr)})", node)
+            return
+        name = self.binding(name, node.slot)
+        declared_type = self.scope.type_of(name)
+        # Variables declared in other modules aren't known here, so they're assigned without a cast
+        value = self.cast(node.value_expr, declared_type) if declared_type else self.expression(node.value_expr)
+        self.emit(f"{self.load(name)} = {value}", node)
+
+    def emit_function_def(self, node, struct_name: str | None = None):
+        names = slot_names(node)
+        types = self.local_types(node, names, struct_name)
+        module_scope = self.scope if self.scope.parent is None else self.scope.parent
+        self.separate()
+        param_slots = range(1 if struct_name else 0, len(node.params) + (1 if struct_name else 0))
+        params = [self.variable(names[slot]) for slot in param_slots]
+        if struct_name:
+            self.emit(f"def m_{node.func_name}({', '.join(['self', *params])}):", node)
+        else:
+            self.emit(f"def {self.function(node.func_name)}({', '.join(params)}):", node)
+        outer_scope = self.scope
+        self.scope = Scope(types, heap_variables(node.body.statements, names) & types.keys(), names, module_scope,
+                           struct_name, node.return_type)
+        self.indent += 1
+        start = len(self.lines)
+        if shared := self.shared_names(node.body.statements):
+            self.emit(f"global {', '.join(shared)}", node)
+        # The storage of the parameters and locals is the call's, freed when it returns (see
+        # Interpreter._execute_callable)
+        owns_storage = any(slot not in node.escaping for slot in param_slots) or any(
+            isinstance(statement, (LetMemoryNode, VarDeclarationNode)) and statement.owned
+            for statement in scope_nodes(node.body.statements))
+        mark = f"_mark{self.marks}"
+        if owns_storage:
+            self.marks += 1
+            self.emit(f"{mark} = len(owned)", node)
+        for (_, param_type), slot in zip(node.params, param_slots):
+            name = names[slot]
+            value = self.cast_name(self.variable(name), param_type)
+            allocate = "alloc" if slot in node.escaping else "own"
+            if self.scope.is_boxed(name):
+                self.emit(f"_value = {value}", node)
+                self.emit(f"{self.variable(name)} = {allocate}({param_type!r})", node)
+                self.emit(f"memory[{self.variable(name)}] = cell({param_type!r}, _value, {self.variable(name)})", node)
+            else:
+                if value != self.variable(name):
+                    self.emit(f"{self.variable(name)} = {value}", node)
+                self.emit(f"{allocate}({param_type!r})", node)
+        if owns_storage:
+            self.emit("try:", node)
+            self.indent += 1
+        body_start = len(self.lines)
+        for statement in node.body.statements:
+            if isinstance(statement, ReturnNode): # Only a `return` directly in the body ends the call
+                self.emit(f"return {self.returned(statement.return_expr)}", statement)
+                break
+            self.emit_statement(statement)
+        if len(self.lines) == (body_start if owns_storage else start):
+            self.emit("pass", node)
+        if owns_storage:
+            self.indent -= 1
+            self.emit("finally:", node)
+            self.emit(f"    release({mark})", node)
+            self.marks -= 1
+        self.indent -= 1
+        self.scope = outer_scope
+        self.separate()
+
+    def shared_names(self, statements: list[ASTNode]) -> list[str]:
+        # Module-level names a function body rebinds: assigned or freed variables that resolve to
+        # globals, and the functions and types it defines (Gravox definitions are global)
+        names = {}
+        for node in scope_nodes(statements):
+            if isinstance(node, VarAssignNode) and "." not in node.var_name and node.slot < 0:
+                names[self.variable(node.var_name)] = None
+            elif isinstance(node, FunctionCallNode) and isinstance(node.func_name, IdentifierNode) \
+                    and node.func_name.name in IN_PLACE_BUILTINS and node.args and isinstance(node.args[0], IdentifierNode) \
+                    and node.args[0].slot < 0: # stores a copy of a shared array back
+                names[self.variable(node.args[0].name)] = None
+            elif isinstance(node, FreeMemoryNode) and node.slot < 0:
+                names[self.variable(node.var_name)] = None
+            elif isinstance(node, FunctionDefNode):
+                names[self.function(node.func_name)] = None
+            elif isinstance(node, (StructDefNode, EnumDefNode)):
+                names[self.type_name(node.struct_name if isinstance(node, StructDefNode) else node.enum_name)] = None
+        names.pop("self", None)
+        return list(names)
+
+    def returned(self, node) -> str:
+        # The interpreter casts a function's result to its return type, unless it is None
+        return_type = self.scope.return_type
+        if return_type == "any" or return_type in self.structs or return_type in self.enums:
+            return self.expression(node)
+        if self.static_type(node) is not None:
+            return self.cast(node, return_type)
+        return f"result({self.expression(node)}, {return_type!r})"
+
+    def emit_return(self, node):
+        self.emit("pass # `return` only ends a function from the top level of its body", node)
+
+    def emit_if_statement(self, node):
+        self.emit(f"if {self.expression(node.condition)}:", node)
+        self.emit_body(node.then_block, node)
+        for condition, block in node.elif_blocks or ():
+            self.emit(f"elif {self.expression(condition)}:", node)
+            self.emit_body(block, node)
+        if node.else_block:
+            self.emit("else:", node)
+            self.emit_body(node.else_block, node)
+
+    def emit_while_loop(self, node):
+        self.emit(f"while {self.expression(node.condition)}:", node)
+        self.emit_body(node.loop_block, node)
+
+    def emit_for_loop(self, node):
+        with self.storage_scope(node, node): # the loop variable's
+            self.emit_statement(node.init_stmt)
+            self.emit(f"while {self.expression(node.condition_expr)}:", node)
+            self.indent += 1
+            with self.storage_scope(node.loop_block, node):
+                for statement in node.loop_block.statements:
+                    self.emit_statement(statement)
+            self.emit_statement(node.increment_stmt)
+            self.indent -= 1
+
+    def emit_struct_def(self, node):
+        name = node.struct_name
+        fields = self.structs[name] = dict(node.fields)
+        self.separate()
+        self.emit(f"class {self.type_name(name)}(GravoxStruct):", node)
+        self.indent += 1
+        self.emit(f"__slots__ = {tuple(map(field_attribute, fields))!r}", node)
+        self.emit(f"__fields__ = {fields!r}", node)
+        self.emit("", node)
+        self.emit("def __init__(self):", node)
+        self.indent += 1
+        for field_name, field_type in fields.items():
+            default = f"{self.type_name(field_type)}()" if field_type in self.structs else DEFAULTS.get(field_type, "None")
+            self.emit(f"self.{field_attribute(field_name)} = {default}", node)
+        if not fields:
+            self.emit("pass", node)
+        self.indent -= 1
+        for method in node.functions:
+            self.emit_function_def(method, name)
+        self.indent -= 1
+        self.emit(f"rt.define_struct({name!r}, {self.type_name(name)})", node)
+        self.separate()
+
+    def emit_enum_def(self, node):
+        self.separate()
+        self.emit(f"class {self.type_name(node.enum_name)}:", node)
+        self.indent += 1
+        self.emit("__slots__ = ()", node)
+        for name, member in enum_members(node).items():
+            self.emit(f"{field_attribute(name)} = EnumMember({int(member)}, {node.enum_name!r}, {name!r})", node)
+        self.indent -= 1
+        self.emit(f"rt.define_enum({node.enum_name!r}, {list(node.members)!r})", node)
+        self.separate()
+
+    def emit_print_statement(self, node):
+        self.emit(f"print({', '.join(map(self.expression, node.expressions))})", node)
+
+    def emit_spawn_task(self, node): # Runs the task body in place, like the interpreter
+        self.emit_statement(node.body)
+
+    def emit_import(self, node):
+        self.emit(f"rt.import_module({node.module_name!r}, globals())", node)
+
+    def emit_try(self, node):
+        self.emit("try:", node)
+        self.emit_body(node.try_block, node)
+        self.emit("except Exception as _error:", node)
+        self.indent += 1
+        self.emit(f"{self.load(self.binding('e', node.slot))} = _error", node)
+        self.indent -= 1
+        self.emit_body(node.catch_block, node)
+
+    # --- Expressions ---
+    def expression(self, node) -> str:
+        if translator := self.expression_translators.get(type(node)):
+            return translator(node)
+        return "None" # Default if not handled, as in Interpreter.evaluate_expression
+
+    def translate_literal(self, node) -> str:
+        return repr(node.value)
+
+    def translate_array_literal(self, node) -> str:
+        return f"[{', '.join(map(self.expression, node.elements))}]"
+
+    def translate_identifier(self, node) -> str:
+        name = self.binding(node.name, node.slot)
+        if self.scope.type_of(name) is None and node.name in self.enums: # Enum names evaluate to themselves
+            return repr(node.name)
+        return self.load(name)
+
+    def translate_binary_op(self, node) -> str:
+        left, right = self.expression(node.left_expr), self.expression(node.right_expr)
+        if (function := EQUALITY_FUNCTIONS.get(node.op)) \
+                and (self.static_type(node.left_expr) is None or self.static_type(node.right_expr) is None):
+            return f"{function}({left}, {right})"
+        if operator := BINARY_OPERATORS.get(node.op):
+            return f"({left} {operator} {right})"
+        return f"({left}, {right}, None)[-1]"
+
+    def translate_unary_op(self, node) -> str:
+        if operator := UNARY_OPERATORS.get(node.op):
+            return f"({operator}{self.expression(node.expr)})"
+        if node.op == TokenType.POINTER_DEREF:
+            return f"deref({self.expression(node.expr)})"
+        if node.op == TokenType.POINTER_REF:
+            if not isinstance(node.expr, IdentifierNode):
+                return "fail(\"Pointer reference '&' can only be applied to variables\")"
+            if self.scope.is_boxed(name := self.binding(node.expr.name, node.expr.slot)):
+                return self.variable(name) # a boxed variable holds its address
+            return f"fail({f'Variable {node.expr.name!r} not declared'!r})"
+        return f"({self.expression(node.expr)}, None)[-1]"
+
+    def translate_function_call(self, node) -> str:
+        if not isinstance(node.func_name, IdentifierNode):
+            return f"fail({f'{type(node.func_name).__name__!r} object has no attribute {"name"!r}'!r})"
+        name = node.func_name.name
+        args = list(map(self.expression, node.args))
+        if name in IN_PLACE_BUILTINS and args:
+            args[0] = self.in_place_argument(node.args[0])
+        args = ", ".join(args)
+        if name not in self.functions and callable(getattr(Stdlib, name, None)):
+            self.builtins.add(name)
+            return f"b_{name}([{args}])"
+        return f"{self.function(name)}({args})"
+
+    def in_place_argument(self, node) -> str:
+        # The array argument of a builtin that changes it, taken out of its holder as
+        # Interpreter.evaluate_in_place_argument does: a shared array is copied into the variable,
+        # pointer or field first
+        if isinstance(node, IdentifierNode) and self.scope.type_of(name := self.binding(node.name, node.slot)) is not None:
+            if self.scope.is_boxed(name):
+                return f"own_array(memory[{self.variable(name)}])"
+            return f"({self.variable(name)} := writable_array({self.variable(name)}))"
+        if isinstance(node, UnaryOpNode) and node.op == TokenType.POINTER_DEREF:
+            return f"own_array(pointee({self.expression(node.expr)}))"
+        if isinstance(node, StructFieldAccessNode) and isinstance(node.struct_var_name, str) \
+                and node.field_name in self.structs.get(self.scope.type_of(name := self.binding(node.struct_var_name, node.slot)), ()):
+            return f"own_array(FieldCell({self.load(name)}, {node.field_name!r}))"
+        return self.expression(node)
+
+    def translate_method_call(self, node) -> str:
+        args = ", ".join(map(self.expression, node.args))
+        return f"{self.expression(node.instance_expr)}.m_{node.method_name}({args})"
+
+    def translate_struct_field_access(self, node) -> str:
+        target, field_name = node.struct_var_name, node.field_name
+        if not isinstance(target, str):
+            return f"field({self.expression(target)}, {field_name!r}, {str(target)!r})"
+        name = self.binding(target, node.slot)
+        var_type = self.scope.type_of(name)
+        if var_type is None: # an enum, or a variable from another module
+            if target in self.enums:
+                return f"{self.type_name(target)}.{field_attribute(field_name)}"
+            return f"member({target!r}, {field_name!r}, globals())"
+        if field_name in self.structs.get(var_type, ()):
+            return f"{self.load(name)}.{field_attribute(field_name)}"
+        if (var_type == "array" or element_type(var_type)) and field_name.isdigit():
+            return f"{self.load(name)}[{int(field_name)}]"
+        return f"field({self.load(name)}, {field_name!r}, {target!r})"
+
+    def translate_array_index(self, node) -> str:
+        array_name = str(node.array_name)
+        if isinstance(node.array_name, IdentifierNode) \
+                and self.scope.type_of(name := self.binding(array_name, node.array_name.slot)) is not None:
+            array = self.load(name)
+        else:
+            array = f"fail({f'Array {array_name!r} not declared'!r})"
+        return f"index({array}, {self.expression(node.index_expr)}, {array_name!r})"
+
+    # --- Types ---
+    def static_type(self, node) -> str | None:
+        """"int", "float", "string" or "bool" when `node` is known to evaluate to one, otherwise None."""
+        match node:
+            case IntLiteralNode():
+                return "int"
+            case FloatLiteralNode():
+                return "float"
+            case StringLiteralNode() | CharLiteralNode():
+                return "string"
+            case IdentifierNode():
+                return self.category(self.scope.type_of(self.binding(node.name, node.slot)))
+            case TypeCastNode():
+                return self.category(node.target_type)
+            case StructFieldAccessNode() if isinstance(node.struct_var_name, str):
+                struct_type = self.scope.type_of(self.binding(node.struct_var_name, node.slot))
+                return self.category(self.structs.get(struct_type, {}).get(node.field_name))
+            case BinaryOpNode():
+                if node.op in COMPARISONS:
+                    return "bool"
+                kinds = {self.static_type(node.left_expr), self.static_type(node.right_expr)}
+                if node.op == TokenType.PLUS and kinds == {"string"}:
+                    return "string"
+                if node.op not in BINARY_OPERATORS or not kinds <= {"int", "float", "bool"}:
+                    return None
+                if node.op == TokenType.DIVIDE or "float" in kinds:
+                    return "float" if node.op in (TokenType.PLUS, TokenType.MINUS, TokenType.MULTIPLY,
+                                                  TokenType.DIVIDE, TokenType.MODULO) else None
+                return "bool" if kinds == {"bool"} and node.op in (TokenType.AND, TokenType.OR, TokenType.XOR) else "int"
+            case UnaryOpNode() if node.op == TokenType.POINTER_REF:
+                return "int" # an address
+            case UnaryOpNode() if node.op in UNARY_OPERATORS:
+                kind = self.static_type(node.expr)
+                return "float" if kind == "float" and node.op == TokenType.MINUS else "int" if kind in ("int", "bool") else None
+        return None
+
+    @staticmethod
+    def category(data_type: str | None) -> str | None:
+        if data_type in INT_TYPES:
+            return "int"
+        if data_type in FLOAT_TYPES:
+            return "float"
+        return "string" if data_type in ("string", "char") else None
+
+    def cast(self, node, target_type: str) -> str:
+        """`node` converted to `target_type` as by Interpreter.cast_value_to_type, inlined when the
+        conversion can't fail."""
+        value = self.expression(node)
+        kind = self.static_type(node)
+        if target_type in INT_TYPES:
+            return value if kind == "int" else f"int({value})" if kind in ("float", "bool") else f"cast({value}, {target_type!r})"
+        if target_type in FLOAT_TYPES:
+            return value if kind == "float" else f"float({value})" if kind in ("int", "bool") else f"cast({value}, {target_type!r})"
+        if target_type == "string":
+            return value if kind == "string" else f"str({value})"
+        if target_type == "any" or target_type in self.structs or target_type in self.enums:
+            return value
+        return f"cast({value}, {target_type!r})"
+
+    def cast_name(self, name: str, target_type: str) -> str:
+        # Parameters: skip the call when the argument already has the right type
+        if target_type in INT_TYPES:
+            return f"{name} if {name}.__class__ is int else cast({name}, {target_type!r})"
+        if target_type in FLOAT_TYPES:
+            return f"{name} if {name}.__class__ is float else cast({name}, {target_type!r})"
+        if target_type == "string":
+            return f"str({name})"
+        if target_type == "any" or target_type in self.structs or target_type in self.enums:
+            return name
+        return f"cast({name}, {target_type!r})"
+
+
+def transpile(program: ProgramNode, name: str = PROGRAM_FILE) -> str:
+    return PythonTranspiler(program, name).transpile()
+
+
+@lru_cache(maxsize=16)
+def compile_program(source: str) -> CodeType:
+    # Generated source -> code: the same program run again in this process (bench.py's repeats)
+    # isn't compiled again, and only the last few programs are kept
+    return compile(source, PROGRAM_FILE, "exec")
+
+
+class PythonRuntime(Interpreter):
+    """Runs programs by transpiling them to Python (see PythonTranspiler) and executing the result.
+    The interpreter's state backs the generated code: its memory and heap accounting, stdlib, casts
+    and struct/enum tables, plus the helpers below for operations too dynamic to inline. Imported
+    modules share the runtime, and their compiled code is cached in __gravoxcache__."""
+
+    def interpret(self, program_node):
+        transpiler = PythonTranspiler(program_node)
+        code = compile_program(transpiler.transpile())
+        try:
+            exec(code, {"__name__": "__gravox__", "rt": self})
+        except Exception as error:
+            for frame, line in walk_tb(error.__traceback__): # innermost statement of the program itself
+                if frame.f_code.co_filename == PROGRAM_FILE:
+                    self.last_node = transpiler.node_at(line)
+            raise self.translate_error(error) from error
+        return None
+
+    @staticmethod
+    def translate_error(error: Exception) -> Exception:
+        # Python's own errors for undefined names and zero division, in the interpreter's words
+        if isinstance(error, NameError) and error.name and (match := GENERATED_NAME.fullmatch(error.name)):
+            kind = {"v": "Variable '{}' not declared", "f": "Function '{}' not defined", "t": "Type '{}' not defined"}
+            return Exception(kind[match[1]].format(match[2]))
+        if isinstance(error, ZeroDivisionError):
+            return Exception("Modulo by zero" if "modulo" in str(error) else "Division by zero")
+        return error
+
+    def import_module(self, module_name: str, namespace: dict[str, Any]):
+        if module_name.endswith('_py'):
+            raise Exception("Native modules are a work-in-progress.")
+        path = Path(module_name + ".grv")
+        if not path.exists():
+            raise Exception(f"Module '{module_name}' not found")
+        code = load_code(path, lambda source: compile(
+            transpile(Parser(tokenize_iter(source)).parse_program(), path.name), f"<gravox:{path.name}>", "exec"))
+        module_namespace = {"__name__": module_name, "rt": self}
+        exec(code, module_namespace)
+        namespace.update((name, value) for name, value in module_namespace.items() if name[:2] in ("v_", "f_", "t_"))
+
+    def define_struct(self, name: str, cls: type[GravoxStruct]):
+        self.struct_definitions[name] = StructDefNode(name, list(cls.__fields__.items()), [])
+        self.struct_classes[name] = cls
+        self.type_descriptors.clear()
+
+    def define_enum(self, name: str, members: list[str]):
+        self.enum_definitions[name] = EnumDefNode(name, members)
+        self.enum_members[name] = enum_members(self.enum_definitions[name])
+        self.type_descriptors.clear()
+
+    # --- Helpers called by generated code ---
+    def new(self, type_name: str):
+        struct_class = self.struct_classes.get(type_name)
+        return struct_class() if struct_class else self.get_default_value_for_type(type_name)
+
+    def is_struct(self, type_name: str) -> bool:
+        return type_name in self.struct_classes
+
+    def result(self, value, return_type: str):
+        return self.cast_value_to_type(value, return_type) if value is not None else None
+
+    def deref(self, address):
+        return self.pointee(address).value
+
+    def pointee(self, address):
+        # The cell at `address`
+        if not isinstance(address, int): # Address should be an integer address
+            raise Exception("Pointer dereference expects a memory address (integer)")
+        if address not in self.memory:
+            raise Exception(f"Invalid memory access at address {address}")
+        return self.memory[address]
+
+    def field(self, instance, field_name: str, var_name: str):
+        if isinstance(instance, GravoxStruct):
+            if (field := instance.__layout__.get(field_name)) is None:
+                raise Exception(f"Struct '{type(instance).__name__[2:]}' does not have field '{field_name}'")
+            return getattr(instance, field[0])
+        if isinstance(instance, list):
+            return instance[int(field_name)]
+        if isinstance(instance, dict):
+            try:
+                return instance[field_name]
+            except KeyError as e:
+                raise KeyError(f"Key not found: {e}")
+        raise Exception(f"'{var_name}' is not a struct variable")
+
+    def member(self, name: str, field_name: str, namespace: dict[str, Any]):
+        # `name.field` where `name` isn't declared in the module: an imported variable or enum
+        if f"v_{name}" in namespace:
+            return self.field(namespace[f"v_{name}"], field_name, name)
+        if name in self.enum_members:
+            return self.enum_member(name, field_name)
+        raise Exception(f"Struct variable '{name}' not declared")
+
+    def set_field(self, instance, var_name: str, field_name: str, value):
+        if not isinstance(instance, GravoxStruct):
+            raise Exception(f"'{var_name}' is not a struct variable")
+        if (field := instance.__layout__.get(field_name)) is None:
+            raise Exception(f"Struct '{type(instance).__name__[2:]}' does not have field '{field_name}'")
+        setattr(instance, field[0], self.cast_value_to_type(value, field[1]))
+
+    def index(self, array, index, array_name: str):
+        try:
+            index = int(index)
+            if isinstance(array, (list, TypedArray)) and 0 <= index < len(array):
+                return array[index]
+            raise Exception(f"Array '{array_name}' index out of range")
+        except ValueError:
+            raise Exception("Array index expression must be an integer literal")
+
+    def fail(self, message: str):
+        raise Exception(message)
@@ -0,0 +1,79 @@
+from functools import partial
+from typing import Any, Callable
+
+from arrays import share_array, typed_array
+
+# Bytes a variable of each type takes on the heap; 4 for any other type
+TYPE_SIZES = {
+    "int8": 1, "uint8": 1, "char": 1,
+    "int16": 2, "uint16": 2,
+    "int32": 4, "uint32": 4, "float32": 4,
+    "int64": 8, "uint64": 8, "float64": 8,
+}
+
+
+class TypeDescriptor:
+    """What the interpreter needs to know about a type name, worked out once per type: `cast`
+    converts a value to the type (raising ValueError, TypeError or OverflowError when it can't),
+    `default` makes the value of a variable declared without one, and `size` is the number of
+    bytes a variable of the type takes on the heap."""
+    __slots__ = ("name", "cast", "default", "size")
+
+    def __init__(self, name: str, cast: Callable[[Any], Any], default: Callable[[], Any]) -> None:
+        self.name = name
+        self.cast = cast
+        self.default = default
+        self.size = TYPE_SIZES.get(name, 4)
+
+    def __repr__(self) -> str:
+        return f"TypeDescriptor({self.name!r})"
+
+
+def same(value):
+    return value
+
+
+def no_default():
+    return None
+
+
+def to_char(value) -> str:
+    text = str(value)
+    return text[0] if text else '\0' # first char, or the null char if empty
+
+
+def deprecated_result(_):
+    # The Result type is more of a return type specifier, not really a type to cast to
+    raise DeprecationWarning("Use try/catch instead.")
+
+
+# Types a struct or enum can't stand in for (the interpreter checks these names first)
+SCALAR_TYPES: dict[str, TypeDescriptor] = {
+    **{name: TypeDescriptor(name, int, int) for name in ("int8", "int16", "int32", "int64")},
+    # Unsigned is treated same as signed for now in casting, needs proper uint handling
+    **{name: TypeDescriptor(name, int, int) for name in ("uint8", "uint16", "uint32", "uint64")},
+    **{name: TypeDescriptor(name, float, float) for name in ("float32", "float64")},
+    "char": TypeDescriptor("char", to_char, lambda: '\0'),
+}
+# The remaining builtin types; array<T> types are added as they are first described
+BUILTIN_TYPES: dict[str, TypeDescriptor] = {
+    "Result": TypeDescriptor("Result", deprecated_result, no_default),
+    "string": TypeDescriptor("string", str, no_default),
+    "any": TypeDescriptor("any", same, no_default),
+    "array": TypeDescriptor("array", share_array, no_default),
+}
+
+
+def builtin_type(name: str) -> TypeDescriptor | None:
+    # The interned descriptor of a builtin type other than the scalars; None for any other name
+    descriptor = BUILTIN_TYPES.get(name)
+    if descriptor is None and name[:6] == "array<":
+        descriptor = BUILTIN_TYPES[name] = TypeDescriptor(name, partial(typed_array, name), no_default)
+    return descriptor
+
+
+def unknown_type(name: str) -> TypeDescriptor:
+    def cast(value):
+        raise Exception(f"Cannot cast value of type '{type(value)}' to type '{name}'")
+
+    return TypeDescriptor(name, cast, no_default)
@@ -0,0 +1,665 @@
+from array import array
+from math import copysign
+from typing import Any
+
+from arrays import TypedArray
+from enums import EnumMember
+from grvast import ASTNode, ArrayIndexNode, ArrayLiteralNode, BinaryOpNode, BlockNode, CharLiteralNode, EnumDefNode, \
+    FloatLiteralNode, ForLoopNode, FreeMemoryNode, FunctionCallNode, FunctionDefNode, IdentifierNode, \
+    IfStatementNode, ImportNode, IntLiteralNode, LetMemoryNode, MethodCallNode, NullLiteralNode, ProgramNode, \
+    ReturnNode, SpawnTaskNode, StringLiteralNode, StructDefNode, StructFieldAccessNode, TryNode, TypeCastNode, \
+    UnaryOpNode, VarAssignNode, VarDeclarationNode, WhileLoopNode
+from interpreter import BINARY_OPERATIONS, UNARY_OPERATIONS, ZERO_DIVISION_ERRORS, Frame, Interpreter, VarCell
+from lexing import TokenType
+from resolver import resolve
+from stdlib import IN_PLACE_BUILTINS
+from structs import GravoxStruct
+
+# --- Instruction set: every instruction is two words in the code array, an opcode and its argument ---
+OPNAMES = [
+    "STMT",              # Mark the start of statement constants[arg] (error reporting, like execute_statement)
+    "LOAD_CONST",        # Push constants[arg]
+    "LOAD_NAME",         # Push the value of global variable names[arg]
+    "STORE_NAME",        # Pop a value and assign it to global variable names[arg]
+    "LOAD_FAST",         # Push the value of the local in frame slot arg
+    "STORE_FAST",        # Pop a value and assign it to the local in frame slot arg
+    "POP_TOP",           # Discard the top of the stack
+    "BINARY_OP",         # Pop right, left; push BINARY_OPERATORS[arg](left, right)
+    "UNARY_OP",          # Pop a value; push UNARY_OPERATORS[arg](value)
+    "CAST",              # Pop a value; push it cast to type constants[arg]
+    "BUILD_ARRAY",       # Pop arg values; push them as an array
+    "CALL_FUNCTION",     # constants[arg] is (name, argc): pop argc arguments, call the function or builtin
+    "LOAD_METHOD",       # Pop an instance; push the method constants[arg].method_name resolves to on it
+    "CALL_METHOD",       # Pop arg arguments and the loaded method; push the result of calling it
+    "RETURN_VALUE",      # Pop a value and return it from the code object
+    "JUMP",              # Continue at instruction arg
+    "POP_JUMP_IF_FALSE", # Pop a value; continue at instruction arg if it's falsy
+    "ENTER_SCOPE",       # Push the mark of a block whose variables own storage (see Interpreter.release_storage)
+    "EXIT_SCOPE",        # Pop a mark; free the storage owned since it
+    "EXEC",              # Execute statement constants[arg] with the tree-walking handler for it
+    "EVAL",              # Push the value of expression constants[arg], from the tree-walking handler for it
+    "INDEX_ARRAY",       # Pop an index; push that element of array variable constants[arg] (name, slot)
+    "ALLOC",             # constants[arg] is (LetMemoryNode, target): push the variable's address; for a struct,
+                         # or without an initializer, also push its initial value and continue at target
+    "DECLARE",           # Pop a value and an address; declare variable constants[arg] (a LetMemoryNode) with them
+    "LOAD_FIELD",        # Push field constants[arg].field_name of struct variable constants[arg]
+    "STORE_FIELD",       # Pop a value; assign it to the struct field constants[arg] is (variable, field, slot) of
+    "SETUP_TRY",         # Catch errors from here on at instruction arg, which starts with the error on the stack
+    "POP_TRY",           # Stop catching errors at the handler SETUP_TRY set up last
+    "BIND_ERROR",        # Pop an error; bind it to the `e` of `try` statement constants[arg]
+    "LOAD_IN_PLACE",     # Push the array argument constants[arg] of a builtin that changes it, from its holder
+                         # (see Interpreter.evaluate_in_place_argument)
+    "DECLARE_VAR",       # Declare `var` constants[arg] (a VarDeclarationNode), popping its value if it has an initializer
+    "FREE",              # Free variable constants[arg] (a FreeMemoryNode) and unbind it
+    "DEREF",             # Pop an address; push the value stored there
+    "ADDRESS_OF",        # Pop the value of the operand of `&` constants[arg] (a UnaryOpNode); push its variable's address
+    "DEFINE_FUNCTION",   # Define function constants[arg]
+    "DEFINE_STRUCT",     # Define struct constants[arg] and its methods
+    "DEFINE_ENUM",       # Define enum constants[arg]
+    "IMPORT",            # Run the module `import` constants[arg] names and take its definitions
+]
+(STMT, LOAD_CONST, LOAD_NAME, STORE_NAME, LOAD_FAST, STORE_FAST, POP_TOP, BINARY_OP, UNARY_OP, CAST, BUILD_ARRAY,
+ CALL_FUNCTION, LOAD_METHOD, CALL_METHOD, RETURN_VALUE, JUMP, POP_JUMP_IF_FALSE, ENTER_SCOPE, EXIT_SCOPE, EXEC, EVAL,
+ INDEX_ARRAY, ALLOC, DECLARE, LOAD_FIELD, STORE_FIELD, SETUP_TRY, POP_TRY, BIND_ERROR, LOAD_IN_PLACE, DECLARE_VAR, FREE,
+ DEREF, ADDRESS_OF, DEFINE_FUNCTION, DEFINE_STRUCT, DEFINE_ENUM, IMPORT) = range(len(OPNAMES))
+# What the argument indexes, for the disassembler
+CONSTANT_ARGS = {STMT, LOAD_CONST, CAST, CALL_FUNCTION, LOAD_METHOD, EXEC, EVAL, INDEX_ARRAY, ALLOC, DECLARE, LOAD_FIELD,
+                 STORE_FIELD, BIND_ERROR, LOAD_IN_PLACE, DECLARE_VAR, FREE, ADDRESS_OF, DEFINE_FUNCTION, DEFINE_STRUCT,
+                 DEFINE_ENUM, IMPORT}
+NAME_ARGS = {LOAD_NAME, STORE_NAME}
+LOCAL_ARGS = {LOAD_FAST, STORE_FAST}
+JUMPS = {JUMP, POP_JUMP_IF_FALSE, SETUP_TRY}
+
+BINARY_OPERATORS = list(BINARY_OPERATIONS)
+UNARY_OPERATORS = list(UNARY_OPERATIONS)
+# BINARY_OP arg -> (implementation, error raised when the right operand is 0)
+_BINARY_TABLE = [(BINARY_OPERATIONS[op], ZERO_DIVISION_ERRORS.get(op)) for op in BINARY_OPERATORS]
+_UNARY_TABLE = [UNARY_OPERATIONS[op] for op in UNARY_OPERATORS]
+
+
+class CodeObject:
+    """A compiled program, function body or snippet: instructions in an `array`, plus the constant
+    pool and the global and local variable names they index into."""
+    __slots__ = ("name", "code", "constants", "names", "stack_size", "local_names")
+
+    def __init__(self, name: str, code: array, constants: list[Any], names: list[str], stack_size: int,
+                 local_names: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.code = code
+        self.constants = constants
+        self.names = names
+        self.stack_size = stack_size # deepest the value stack gets
+        self.local_names = local_names # frame slots: params + variables declared in the body
+
+    def __repr__(self) -> str:
+        return f'<CodeObject {self.name}, {len(self.code) // 2} instructions>'
+
+
+class BytecodeCompiler:
+    """Compiles one code object. Every statement and expression the parser produces has
+    instructions of its own. Other node types with a tree-walking handler (`fallback_statements`:
+    print statements and struct instantiations built by hand) compile to EXEC, and other
+    expressions (`Ok`/`Err` results, `EnumMemberNode`s, field access on an expression) to EVAL."""
+
+    def __init__(self, name: str, fallback_statements) -> None:
+        self.name = name
+        self.fallback_statements = fallback_statements
+        self.code = array("i")
+        self.constants: list[Any] = []
+        self.names: list[str] = []
+        self._constant_index: dict[Any, int] = {}
+        self._name_index: dict[str, int] = {}
+        self._depth = 0
+        self._max_depth = 0
+
+    def finish(self, local_names: tuple[str, ...] = ()) -> CodeObject:
+        return CodeObject(self.name, self.code, self.constants, self.names, self._max_depth, local_names)
+
+    def emit(self, op: int, arg: int = 0) -> int:
+        self.code.append(op)
+        self.code.append(arg)
+        # Statements leave the stack as they found it, so tracking the depth linearly is exact
+        self._depth += self.stack_effect(op, arg)
+        self._max_depth = max(self._max_depth, self._depth)
+        return len(self.code) - 1 # position of the argument, for patch()
+
+    def stack_effect(self, op: int, arg: int) -> int:
+        if op in (LOAD_CONST, LOAD_NAME, LOAD_FAST, EVAL, ENTER_SCOPE, LOAD_FIELD, LOAD_IN_PLACE):
+            return 1
+        if op in (STORE_NAME, STORE_FAST, POP_TOP, BINARY_OP, RETURN_VALUE, POP_JUMP_IF_FALSE, EXIT_SCOPE, STORE_FIELD,
+                  BIND_ERROR):
+            return -1
+        if op == ALLOC: # the address, and the value too where there's no initializer to push it
+            return 1 if self.constants[arg][0].value_expr is not None else 2
+        if op == DECLARE:
+            return -2
+        if op == DECLARE_VAR:
+            return -1 if self.constants[arg].value_expr is not None else 0
+        if op == BUILD_ARRAY:
+            return 1 - arg
+        if op == CALL_FUNCTION:
+            return 1 - self.constants[arg][1]
+        if op == CALL_METHOD:
+            return -arg # the arguments and the method go, the result comes
+        return 0
+
+    def patch(self, position: int, target: int | None = None):
+        self.code[position] = len(self.code) if target is None else target
+
+    def constant(self, value) -> int:
+        key = (type(value), value) # keeps 1, 1.0 and True apart
+        if value.__class__ is float: # ... and 0.0 and -0.0
+            key = (float, value, copysign(1.0, value))
+        elif value.__class__ is EnumMember: # ... and members of different enums with the same ordinal
+            key = (EnumMember, value.enum_name, value.name)
+        if key not in self._constant_index:
+            self._constant_index[key] = len(self.constants)
+            self.constants.append(value)
+        return self._constant_index[key]
+
+    def variable(self, name: str) -> int:
+        if name not in self._name_index:
+            self._name_index[name] = len(self.names)
+            self.names.append(name)
+        return self._name_index[name]
+
+    # --- Statements ---
+    def statement(self, node):
+        # Every statement is preceded by STMT, as every execute_statement call counts one
+        self.emit(STMT, self.constant(node))
+        self.statement_body(node)
+
+    def statement_body(self, node):
+        match node:
+            case BlockNode() if node.owns_storage:
+                self.emit(ENTER_SCOPE)
+                for statement in node.statements:
+                    self.statement(statement)
+                self.emit(EXIT_SCOPE)
+            case ProgramNode() | BlockNode():
+                for statement in node.statements:
+                    self.statement(statement)
+            case VarAssignNode() if "." in node.var_name:
+                self.expression(node.value_expr)
+                struct_var_name, field_name = node.var_name.split(".", 1)
+                self.emit(STORE_FIELD, self.constant((struct_var_name, field_name, node.slot)))
+            case VarAssignNode() if node.slot < 0:
+                self.expression(node.value_expr)
+                self.emit(STORE_NAME, self.variable(node.var_name))
+            case VarAssignNode():
+                self.expression(node.value_expr)
+                self.emit(STORE_FAST, node.slot)
+            case LetMemoryNode():
+                # (node, target) is filled in once the initializer is compiled, to skip it for a struct
+                allocation = len(self.constants)
+                self.constants.append((node, 0))
+                self.emit(ALLOC, allocation)
+                if node.value_expr is not None:
+                    self.expression(node.value_expr)
+                    self.emit(CAST, self.constant(node.data_type))
+                self.constants[allocation] = (node, len(self.code))
+                self.emit(DECLARE, self.constant(node))
+            case TryNode():
+                handler = self.emit(SETUP_TRY)
+                self.statement(node.try_block)
+                self.emit(POP_TRY)
+                end = self.emit(JUMP)
+                self.patch(handler)
+                self._depth += 1 # the error, pushed when it's caught
+                self._max_depth = max(self._max_depth, self._depth)
+                self.emit(BIND_ERROR, self.constant(node))
+                self.statement(node.catch_block)
+                self.patch(end)
+            case ReturnNode():
+                pass # Only ends a function when directly in its body; see function()
+            case IfStatementNode():
+                end_jumps = []
+                next_branch = None
+                for condition, block in [(node.condition, node.then_block), *(node.elif_blocks or ())]:
+                    if next_branch is not None:
+                        self.patch(next_branch)
+                    self.expression(condition)
+                    next_branch = self.emit(POP_JUMP_IF_FALSE)
+                    self.statement(block)
+                    end_jumps.append(self.emit(JUMP))
+                self.patch(next_branch)
+                if node.else_block:
+                    self.statement(node.else_block)
+                for jump in end_jumps:
+                    self.patch(jump)
+            case WhileLoopNode():
+                start = len(self.code)
+                self.expression(node.condition)
+                exit_jump = self.emit(POP_JUMP_IF_FALSE)
+                self.statement(node.loop_block)
+                self.emit(JUMP, start)
+                self.patch(exit_jump)
+            case ForLoopNode():
+                if node.owns_storage:
+                    self.emit(ENTER_SCOPE) # the loop variable's storage
+                self.statement(node.init_stmt)
+                start = len(self.code)
+                self.expression(node.condition_expr)
+                exit_jump = self.emit(POP_JUMP_IF_FALSE)
+                self.statement(node.loop_block)
+                self.statement(node.increment_stmt)
+                self.emit(JUMP, start)
+                self.patch(exit_jump)
+                if node.owns_storage:
+                    self.emit(EXIT_SCOPE)
+            case FunctionCallNode():
+                self.expression(node)
+                self.emit(POP_TOP)
+            case VarDeclarationNode():
+                if node.value_expr is not None:
+                    self.expression(node.value_expr)
+                self.emit(DECLARE_VAR, self.constant(node))
+            case FreeMemoryNode():
+                self.emit(FREE, self.constant(node))
+            case FunctionDefNode():
+                self.emit(DEFINE_FUNCTION, self.constant(node))
+            case StructDefNode():
+                self.emit(DEFINE_STRUCT, self.constant(node))
+            case EnumDefNode():
+                self.emit(DEFINE_ENUM, self.constant(node))
+            case ImportNode():
+                self.emit(IMPORT, self.constant(node))
+            case SpawnTaskNode(): # runs the task body in place, like the interpreter
+                self.statement(node.body)
+            case _ if type(node) in self.fallback_statements:
+                self.emit(EXEC, self.constant(node))
+            case _: # Expression statement: value is discarded
+                self.expression(node)
+                self.emit(POP_TOP)
+
+    # --- Expressions ---
+    def expression(self, node):
+        match node:
+            case IntLiteralNode() | FloatLiteralNode() | CharLiteralNode() | StringLiteralNode():
+                self.emit(LOAD_CONST, self.constant(node.value))
+            case NullLiteralNode():
+                self.emit(LOAD_CONST, self.constant(None))
+            case StructFieldAccessNode() if node.member is not None: # `Enum.member` (see resolver.py)
+                self.emit(LOAD_CONST, self.constant(node.member))
+            case IdentifierNode() if node.slot >= 0:
+                self.emit(LOAD_FAST, node.slot)
+            case IdentifierNode():
+                self.emit(LOAD_NAME, self.variable(node.name))
+            case ArrayLiteralNode():
+                for element in node.elements:
+                    self.expression(element)
+                self.emit(BUILD_ARRAY, len(node.elements))
+            case BinaryOpNode() if node.op in BINARY_OPERATIONS:
+                self.expression(node.left_expr)
+                self.expression(node.right_expr)
+                self.emit(BINARY_OP, BINARY_OPERATORS.index(node.op))
+            case UnaryOpNode() if node.op in UNARY_OPERATIONS:
+                self.expression(node.expr)
+                self.emit(UNARY_OP, UNARY_OPERATORS.index(node.op))
+            case UnaryOpNode() if node.op == TokenType.POINTER_DEREF:
+                self.expression(node.expr)
+                self.emit(DEREF)
+            case UnaryOpNode() if node.op == TokenType.POINTER_REF:
+                self.expression(node.expr) # evaluated first, as in Interpreter.evaluate_unary_op
+                self.emit(ADDRESS_OF, self.constant(node))
+            case TypeCastNode():
+                self.expression(node.expression)
+                self.emit(CAST, self.constant(node.target_type))
+            case FunctionCallNode() if isinstance(node.func_name, IdentifierNode):
+                args = node.args
+                if node.func_name.name in IN_PLACE_BUILTINS and args:
+                    self.emit(LOAD_IN_PLACE, self.constant(args[0]))
+                    args = args[1:]
+                for arg in args:
+                    self.expression(arg)
+                self.emit(CALL_FUNCTION, self.constant((node.func_name.name, len(node.args))))
+            case ArrayIndexNode():
+                self.expression(node.index_expr)
+                slot = node.array_name.slot if isinstance(node.array_name, IdentifierNode) else -1
+                self.emit(INDEX_ARRAY, self.constant((str(node.array_name), slot)))
+            case StructFieldAccessNode() if isinstance(node.struct_var_name, str):
+                self.emit(LOAD_FIELD, self.constant(node))
+            case MethodCallNode():
+                self.expression(node.instance_expr)
+                self.emit(LOAD_METHOD, self.constant(node))
+                for arg in node.args:
+                    self.expression(arg)
+                self.emit(CALL_METHOD, len(node.args))
+            case _: # Results and anything else: the tree-walking handler
+                self.emit(EVAL, self.constant(node))
+
+    # --- Code objects ---
+    def function(self, func_def: FunctionDefNode) -> CodeObject:
+        for statement in func_def.body.statements:
+            self.emit(STMT, self.constant(statement))
+            if isinstance(statement, ReturnNode):
+                self.expression(statement.return_expr)
+                self.emit(RETURN_VALUE)
+            else:
+                self.statement_body(statement)
+        self.emit(LOAD_CONST, self.constant(None))
+        self.emit(RETURN_VALUE)
+        return self.finish(func_def.local_names)
+
+    def program(self, program: ProgramNode) -> CodeObject:
+        for statement in program.statements:
+            self.statement(statement)
+        self.emit(LOAD_CONST, self.constant(None))
+        self.emit(RETURN_VALUE)
+        return self.finish(program.local_names)
+
+
+def _describe(value) -> str:
+    # Nodes repr as their whole subtree; a name and position is enough here
+    if isinstance(value, ASTNode):
+        return f"{type(value).__name__} (line {value.line + 1})"
+    if isinstance(value, tuple):
+        return f"({', '.join(map(_describe, value))})"
+    return repr(value)
+
+
+def disassemble(code: CodeObject) -> str:
+    lines = [f"Disassembly of {code.name} ({len(code.local_names)} locals, {len(code.constants)} constants, {len(code.names)} names):"]
+    jump_targets = {code.code[i + 1] for i in range(0, len(code.code), 2) if code.code[i] in JUMPS}
+    for i in range(0, len(code.code), 2):
+        op, arg = code.code[i], code.code[i + 1]
+        if op in CONSTANT_ARGS:
+            detail = _describe(code.constants[arg])
+        elif op in NAME_ARGS:
+            detail = code.names[arg]
+        elif op in LOCAL_ARGS:
+            detail = code.local_names[arg] if arg < len(code.local_names) else f"slot {arg}"
+        elif op == BINARY_OP:
+            detail = BINARY_OPERATORS[arg].name
+        elif op == UNARY_OP:
+            detail = UNARY_OPERATORS[arg].name
+        elif op in JUMPS:
+            detail = f"to {arg}"
+        else:
+            detail = ""
+        marker = ">>" if i in jump_targets else "  "
+        lines.append(f"{marker} {i:5} {OPNAMES[op]:<18} {arg:<5} {detail}".rstrip())
+    return "\n".join(lines)
+
+
+class VirtualMachine(Interpreter):
+    """Compiles programs and function bodies to bytecode and runs them in a stack-based dispatch
+    loop. Runtime state is shared with `Interpreter`, whose handlers still run the statements and
+    expressions that have no instructions of their own (EXEC/EVAL); anything they evaluate in turn
+    is compiled and run here, so the output matches `Interpreter` exactly.
+
+    Locals are read and written by frame slot (LOAD_FAST/STORE_FAST), as numbered by the resolver;
+    globals are looked up by name."""
+
+    def __init__(self, heap_size=1024, memory_model="dict"):
+        super().__init__(heap_size, memory_model)
+        self.code_objects: dict[Any, CodeObject] = {} # {FunctionDefNode or snippet node: CodeObject}
+        self._snippets: dict[Any, CodeObject] = {}
+
+    def compiler(self, name: str) -> BytecodeCompiler:
+        return BytecodeCompiler(name, self.statement_handlers.keys())
+
+    def compile_program(self, program_node: ProgramNode) -> CodeObject:
+        return self.compiler("<program>").program(program_node)
+
+    def function_code(self, func_def: FunctionDefNode) -> CodeObject:
+        code = self.code_objects.get(func_def)
+        if code is None:
+            code = self.code_objects[func_def] = self.compiler(str(func_def.func_name)).function(func_def)
+        return code
+
+    def interpret(self, program_node):
+        resolve(program_node)
+        self.frame = Frame(program_node)
+        self.run(self.compile_program(program_node))
+        return None
+
+    def disassemble(self, program_node: ProgramNode) -> str:
+        """The program's bytecode, followed by that of the functions and methods it defines."""
+        resolve(program_node)
+        functions = [node for node in program_node.statements if isinstance(node, FunctionDefNode)]
+        functions += [function for node in program_node.statements if isinstance(node, StructDefNode) for function in node.functions]
+        return "\n\n".join(disassemble(code) for code in
+                            [self.compile_program(program_node), *map(self.function_code, functions)])
+
+    # The tree-walking handlers (EXEC/EVAL) call these for their sub-statements and sub-expressions
+    def execute_statement(self, node):
+        code = self._snippets.get(node)
+        if code is None:
+            compiler = self.compiler("<statement>")
+            compiler.statement(node)
+            compiler.emit(LOAD_CONST, compiler.constant(None))
+            compiler.emit(RETURN_VALUE)
+            code = self._snippets[node] = compiler.finish()
+        self.run(code)
+        return node if isinstance(node, ReturnNode) else None
+
+    def evaluate_expression(self, node):
+        code = self._snippets.get(node)
+        if code is None:
+            compiler = self.compiler("<expression>")
+            compiler.expression(node)
+            compiler.emit(RETURN_VALUE)
+            code = self._snippets[node] = compiler.finish()
+        return self.run(code)
+
+    def _run_function_body(self, func_def: FunctionDefNode):
+        return self.run(self.function_code(func_def))
+
+    def run(self, code_object: CodeObject):
+        code = code_object.code.tolist() # list indexing is cheaper than array indexing in the loop
+        constants = code_object.constants
+        names = code_object.names
+        slots = self.frame.slots if self.frame else None # the frame is the same throughout a run
+        stack: list[Any] = [None] * code_object.stack_size
+        sp = 0 # next free stack slot
+        # Opcodes as locals, ordered by how often they run, keep the dispatch chain short
+        (_LOAD_FAST, _LOAD_NAME, _LOAD_CONST, _BINARY_OP, _STMT, _STORE_FAST, _STORE_NAME, _POP_JUMP_IF_FALSE, _JUMP,
+         _CALL_FUNCTION, _POP_TOP, _RETURN_VALUE) = (LOAD_FAST, LOAD_NAME, LOAD_CONST, BINARY_OP, STMT, STORE_FAST,
+                                                     STORE_NAME, POP_JUMP_IF_FALSE, JUMP, CALL_FUNCTION, POP_TOP,
+                                                     RETURN_VALUE)
+        pc = 0
+        handlers: list[tuple[int, int, int]] = [] # (handler, stack depth, storage mark) of the running `try`s
+        while True:
+            try:
+                while True:
+                    op = code[pc]
+                    arg = code[pc + 1]
+                    pc += 2
+                    if op == _LOAD_FAST:
+                        entry = slots[arg]
+                        if entry is not None and self.resolving_context != "pretty":
+                            stack[sp] = entry.value
+                        else: # pretty-printing, or a local whose `let` hasn't run: falls back to the global
+                            stack[sp] = self.evaluate_identifier(IdentifierNode(self.frame.function.local_names[arg]))
+                        sp += 1
+                    elif op == _LOAD_NAME:
+                        name = names[arg]
+                        symbols = self.symbol_table
+                        if name in symbols and self.resolving_context != "pretty":
+                            stack[sp] = symbols[name].value
+                        else: # pretty-printing, enums and errors
+                            stack[sp] = self.evaluate_identifier(IdentifierNode(name))
+                        sp += 1
+                    elif op == _LOAD_CONST:
+                        stack[sp] = constants[arg]
+                        sp += 1
+                    elif op == _BINARY_OP:
+                        sp -= 1
+                        right = stack[sp]
+                        operation, zero_division_error = _BINARY_TABLE[arg]
+                        if zero_division_error and right.__class__ is not TypedArray and right == 0: # arrays check their own
+                            raise Exception(zero_division_error)
+                        stack[sp - 1] = operation(stack[sp - 1], right)
+                    elif op == _STMT:
+                        self.last_updated_index += 1
+                        self.last_node = constants[arg]
+                    elif op == _STORE_FAST:
+                        sp -= 1
+                        self._handle_variable_assignment(self.frame.function.local_names[arg], stack[sp], arg)
+                    elif op == _STORE_NAME:
+                        sp -= 1
+                        self._handle_variable_assignment(names[arg], stack[sp])
+                    elif op == _POP_JUMP_IF_FALSE:
+                        sp -= 1
+                        if not stack[sp]:
+                            pc = arg
+                    elif op == _JUMP:
+                        pc = arg
+                    elif op == _CALL_FUNCTION:
+                        func_name, argc = constants[arg]
+                        sp -= argc
+                        args = stack[sp:sp + argc]
+                        func_def = self.function_table.get(func_name)
+                        if func_def is None:
+                            builtin = self.stdlib[func_name]
+                            if not builtin:
+                                raise Exception(f"Function '{func_name}' not defined")
+                            stack[sp] = builtin(args)
+                        else:
+                            stack[sp] = self._execute_callable(func_def, args)
+                        sp += 1
+                    elif op == _POP_TOP:
+                        sp -= 1
+                    elif op == _RETURN_VALUE:
+                        return stack[sp - 1]
+                    elif op == UNARY_OP:
+                        stack[sp - 1] = _UNARY_TABLE[arg](stack[sp - 1])
+                    elif op == CAST:
+                        stack[sp - 1] = self.cast_value_to_type(stack[sp - 1], constants[arg])
+                    elif op == BUILD_ARRAY:
+                        sp -= arg
+                        stack[sp] = stack[sp:sp + arg]
+                        sp += 1
+                    elif op == LOAD_METHOD:
+                        node = constants[arg]
+                        instance_value = stack[sp - 1]
+                        instance_type = self._get_expression_type(node.instance_expr)
+                        method_def = self.lookup_method(node, instance_type)
+                        stack[sp - 1] = (method_def, VarCell(instance_type, instance_value, -1)) # address is tricky here
+                    elif op == CALL_METHOD:
+                        sp -= arg
+                        args = stack[sp:sp + arg]
+                        method_def, self_context = stack[sp - 1]
+                        stack[sp - 1] = self._execute_callable(method_def, args, self_instance=self_context)
+                    elif op == INDEX_ARRAY:
+                        array_name, slot = constants[arg]
+                        stack[sp - 1] = self._index_array(array_name, stack[sp - 1], slot)
+                    elif op == LOAD_FIELD:
+                        node = constants[arg]
+                        entry = slots[node.slot] if node.slot >= 0 else None
+                        if entry is None:
+                            entry = self.symbol_table.get(node.struct_var_name)
+                        instance = entry.value if entry is not None else None
+                        if isinstance(instance, GravoxStruct) and entry.type in self.struct_definitions \
+                                and (field := instance.__layout__.get(node.field_name)) is not None:
+                            stack[sp] = getattr(instance, field[0])
+                        else: # dicts, arrays, `any` values, imported enums and errors
+                            stack[sp] = self.evaluate_struct_field_access(node)
+                        sp += 1
+                    elif op == STORE_FIELD:
+                        struct_var_name, field_name, slot = constants[arg]
+                        sp -= 1
+                        entry = slots[slot] if slot >= 0 else None
+                        if entry is None:
+                            entry = self.symbol_table.get(struct_var_name)
+                        instance = entry.value if entry is not None else None
+                        if isinstance(instance, GravoxStruct) and entry.type in self.struct_definitions \
+                                and (field := instance.__layout__.get(field_name)) is not None:
+                            setattr(instance, field[0], self.cast_value_to_type(stack[sp], field[1]))
+                            if entry.address not in self.memory:
+                                self.memory[entry.address] = entry
+                        else:
+                            self._handle_variable_assignment(f"{struct_var_name}.{field_name}", stack[sp], slot)
+                    elif op == ALLOC:
+                        node, target = constants[arg]
+                        data_type = node.data_type
+                        stack[sp] = self.own_memory(data_type) if node.owned else self.letate_memory(data_type)
+                        sp += 1
+                        if data_type in self.struct_definitions: # a struct's initializer isn't evaluated
+                            stack[sp] = self.new_struct(data_type)
+                            sp += 1
+                            pc = target
+                        elif node.value_expr is None:
+                            stack[sp] = self.get_default_value_for_type(data_type)
+                            sp += 1
+                    elif op == DECLARE:
+                        node = constants[arg]
+                        sp -= 2
+                        address = stack[sp]
+                        cell = self.memory.cell(node.data_type, stack[sp + 1], address)
+                        self.bind_variable(node.var_name, node.slot, cell)
+                        self.memory[address] = cell
+                    elif op == SETUP_TRY:
+                        handlers.append((arg, sp, len(self.owned)))
+                    elif op == POP_TRY:
+                        handlers.pop()
+                    elif op == BIND_ERROR:
+                        sp -= 1
+                        self.bind_variable("e", constants[arg].slot, VarCell("any", stack[sp], self.heap.top))
+                    elif op == LOAD_IN_PLACE:
+                        stack[sp] = self.evaluate_in_place_argument(constants[arg])
+                        sp += 1
+                    elif op == DEREF:
+                        address = stack[sp - 1]
+                        if not isinstance(address, int): # Address should be an integer address
+                            raise Exception("Pointer dereference expects a memory address (integer)")
+                        if address not in self.memory:
+                            raise Exception(f"Invalid memory access at address {address}")
+                        stack[sp - 1] = self.memory[address].value
+                    elif op == ADDRESS_OF:
+                        operand = constants[arg].expr
+                        if not isinstance(operand, IdentifierNode):
+                            raise Exception("Pointer reference '&' can only be applied to variables")
+                        if (entry := self.lookup_variable(operand.name, operand.slot)) is None:
+                            raise Exception(f"Variable '{operand.name}' not declared")
+                        stack[sp - 1] = entry.address
+                    elif op == DECLARE_VAR:
+                        node = constants[arg]
+                        data_type = node.data_type
+                        if node.value_expr is not None:
+                            sp -= 1
+                            value = stack[sp]
+                        else:
+                            value = self.get_default_value_for_type(data_type)
+                        address = self.own_memory(data_type) if node.owned else self.letate_memory(data_type)
+                        self.bind_variable(node.var_name, node.slot, self.memory.cell(data_type, value, address))
+                        if node.value_expr is not None: # assigned again, to cast it as an assignment does
+                            self._handle_variable_assignment(node.var_name, value, node.slot)
+                    elif op == FREE:
+                        node = constants[arg]
+                        if (entry := self.lookup_variable(node.var_name, node.slot)) is None:
+                            raise Exception(f"Cannot free undeclared variable '{node.var_name}'")
+                        self.free_memory(entry.address)
+                        self.unbind_variable(node.var_name, node.slot)
+                    elif op == DEFINE_FUNCTION:
+                        self.function_table[str(constants[arg].func_name)] = constants[arg]
+                    elif op == DEFINE_STRUCT:
+                        self.execute_struct_def(constants[arg])
+                    elif op == DEFINE_ENUM:
+                        self.execute_enum_def(constants[arg])
+                    elif op == IMPORT:
+                        self.execute_import(constants[arg])
+                    elif op == ENTER_SCOPE:
+                        stack[sp] = len(self.owned)
+                        sp += 1
+                    elif op == EXIT_SCOPE:
+                        sp -= 1
+                        self.release_storage(stack[sp])
+                    elif op == EXEC:
+                        node = constants[arg]
+                        self.statement_handlers[type(node)](node)
+                    elif op == EVAL:
+                        node = constants[arg]
+                        handler = self.expression_handlers.get(type(node))
+                        stack[sp] = handler(node) if handler else None
+                        sp += 1
+                    else:
+                        raise Exception(f"Invalid opcode {op} at {pc - 2} in {code_object.name}")
+            except Exception as error:
+                if not handlers:
+                    raise
+                pc, sp, mark = handlers.pop()
+                self.release_storage(mark) # what the blocks the error left owned
+                stack[sp] = error
+                sp += 1